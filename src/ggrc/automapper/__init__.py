@@ -12,6 +12,7 @@ from ggrc import models
 from ggrc.automapper.rules import rules
 from ggrc.login import get_current_user
 from ggrc.models.relationship import Relationship
+from ggrc.models.relationship import RelationshipNeighbor
 from ggrc.models.comment import Commentable
 from ggrc.models.mixins import ChangeTracked
 from ggrc.rbac.permissions import is_allowed_update
@@ -55,35 +56,21 @@ class AutomapperGenerator(object):
     # results in a few steps. This drastically reduces number of queries.
     stubs = {s for rel in self.queue for s in rel}
     stubs.add(obj)
-    # Union is here to convince mysql to use two separate indices and
-    # merge te results. Just using `or` results in a full-table scan
-    # Manual column list avoids loading the full object which would also try to
-    # load related objects
-    cols = db.session.query(
-        Relationship.source_type, Relationship.source_id,
-        Relationship.destination_type, Relationship.destination_id)
-    relationships = cols.filter(
-        tuple_(Relationship.source_type, Relationship.source_id).in_(
-            [(s.type, s.id) for s in stubs]
-        )
-    ).union_all(
-        cols.filter(
-            tuple_(Relationship.destination_type,
-                   Relationship.destination_id).in_(
-                       [(s.type, s.id) for s in stubs]))
+    # Every relationship is stored from both sides in the neighbors table, so
+    # a single probe returns the complete neighborhood of all queried stubs.
+    neighbors = db.session.query(
+        RelationshipNeighbor.object_type, RelationshipNeighbor.object_id,
+        RelationshipNeighbor.related_type, RelationshipNeighbor.related_id,
+    ).filter(
+        tuple_(RelationshipNeighbor.object_type,
+               RelationshipNeighbor.object_id).in_(
+                   [(s.type, s.id) for s in stubs])
     ).all()
     batch_requests = collections.defaultdict(set)
-    for (src_type, src_id, dst_type, dst_id) in relationships:
-      src = Stub(src_type, src_id)
-      dst = Stub(dst_type, dst_id)
-      # only store a neighbor if we queried for it since this way we know
-      # we'll be storing complete neighborhood by the end of the loop
-      batch_requests[src_type].add(src_id)
-      batch_requests[dst_type].add(dst_id)
-      if src in stubs:
-        self.cache[src].add(dst)
-      if dst in stubs:
-        self.cache[dst].add(src)
+    for (obj_type, obj_id, related_type, related_id) in neighbors:
+      batch_requests[obj_type].add(obj_id)
+      batch_requests[related_type].add(related_id)
+      self.cache[Stub(obj_type, obj_id)].add(Stub(related_type, related_id))
 
     for type_, ids in batch_requests.iteritems():
       model = getattr(models.all_models, type_)
@@ -167,6 +154,8 @@ class AutomapperGenerator(object):
           "automapping_id": parent_relationship.id}
           for src, dst in self.auto_mappings
           if (src, dst) != original]))  # (src, dst) is sorted
+      RelationshipNeighbor.insert_for(
+          Relationship.automapping_id == parent_relationship.id)
       cache = get_cache(create=True)
       if cache:
         # Add inserted relationships into new objects collection of the cache,
@@ -6,10 +6,13 @@
 # pylint: disable=no-name-in-module
 # false positive for RelationshipProperty
 
+import threading
+from collections import OrderedDict
 from datetime import datetime
 from logging import getLogger
 
 from flask import g
+from flask import has_app_context
 import iso8601
 import sqlalchemy
 from sqlalchemy.ext.associationproxy import AssociationProxy
@@ -30,6 +33,11 @@ from ggrc.utils import view_url_for
 
 logger = getLogger(__name__)
 
+# Number of serializers kept by each builder. Inclusions and attribute
+# whitelists come from request parameters, so the least recently used
+# variants are dropped.
+SERIALIZER_CACHE_SIZE = 64
+
 
 def get_json_builder(obj):
   """Instantiate or retrieve a JSON representation builder for the given
@@ -72,9 +80,19 @@ def publish(obj, inclusions=(), inclusion_filter=None,
       return True
   publisher = get_json_builder(obj)
   if publisher and getattr(publisher, '_publish_attrs', []):
-    ret = publish_base_properties(obj)
-    ret.update(publisher.publish_contribution(
-        obj, inclusions, inclusion_filter, attribute_whitelist))
+    ret = PublishedObject(publish_base_properties(obj))
+    if not has_app_context() or hasattr(g, "_lazy_stubs"):
+      # Stubs of nested objects are registered with the outermost object.
+      publisher.publish_contribution(
+          obj, inclusions, inclusion_filter, attribute_whitelist, ret)
+      return ret
+    g._lazy_stubs = LazyStubs()
+    try:
+      publisher.publish_contribution(
+          obj, inclusions, inclusion_filter, attribute_whitelist, ret)
+      ret.lazy_stubs = g._lazy_stubs
+    finally:
+      del g._lazy_stubs
     return ret
   # Otherwise, just return the value itself by default
   return obj
@@ -365,16 +383,10 @@ def build_type_query(type_, result_spec):
       where_clauses.append(
           columns[columns_indexes[keys[0]]].in_([v[0] for v in vals]))
     else:
-      # If multiple keys, build `OR` of multiple `AND` clauses
-      clauses = []
+      # If multiple keys, use `(keyX, keyY) IN ((valX, valY), ...)`
       cols = [columns[columns_indexes[k]] for k in keys]
-      for val in vals:
-        # Now build OR clause with (key, val) pairs
-        clause = []
-        for i, _ in enumerate(val):
-          clause.append(cols[i] == val[i])
-        clauses.append(sqlalchemy.and_(*clause))
-      where_clauses.append(sqlalchemy.or_(*clauses))
+      where_clauses.append(sqlalchemy.tuple_(*cols).in_(
+          [sqlalchemy.tuple_(*val) for val in vals]))
   where_clause = sqlalchemy.or_(*where_clauses)
 
   query = db.session.query(*columns).filter(where_clause)
@@ -437,6 +449,9 @@ def _render_stub_from_match(match, type_columns):
 class LazyStubRepresentation(object):
 
   def __init__(self, type_, conditions):
+    lazy_stubs = _get_lazy_stubs()
+    if lazy_stubs is not None:
+      lazy_stubs.created += 1
     self.type = type_
     if isinstance(conditions, (int, long)):
       conditions = {'id': conditions}
@@ -459,6 +474,101 @@ class LazyStubRepresentation(object):
       return None
 
 
+class LazyStubs(object):
+  """Placements of the lazy stubs of one published object.
+
+  Placements are kept as
+  { type: { condition keys: { condition values: [(container, key), ...] } } }
+  together with the number of stubs created while publishing the object, so
+  that stubs which were never registered can be detected.
+  """
+  # pylint: disable=too-few-public-methods
+
+  def __init__(self):
+    self.placements = {}
+    self.created = 0
+    self.registered = 0
+
+  @property
+  def complete(self):
+    """Whether all created stubs are registered."""
+    return self.created == self.registered
+
+
+class PublishedObject(dict):
+  """JSON dictionary of a published object.
+
+  Attributes:
+    lazy_stubs: LazyStubs placed in the dictionary or None if they were not
+      registered.
+  """
+  def __init__(self, *args, **kwargs):
+    super(PublishedObject, self).__init__(*args, **kwargs)
+    self.lazy_stubs = None
+
+
+def _get_lazy_stubs():
+  """Get LazyStubs of the object being published or None."""
+  if not has_app_context():
+    return None
+  return getattr(g, "_lazy_stubs", None)
+
+
+def register_stubs(container, key, value):
+  """Store ``value`` as ``container[key]`` and remember its lazy stubs.
+
+  ``value`` can be a lazy stub or a list of them, stubs nested deeper are
+  registered when their own containers are filled.
+  """
+  container[key] = value
+  if isinstance(value, LazyStubRepresentation):
+    placements = [(container, key, value)]
+  elif isinstance(value, list):
+    placements = [(value, index, item) for index, item in enumerate(value)
+                  if isinstance(item, LazyStubRepresentation)]
+  else:
+    return
+  lazy_stubs = _get_lazy_stubs()
+  if lazy_stubs is None:
+    return
+  lazy_stubs.registered += len(placements)
+  for stub_container, stub_key, stub in placements:
+    lazy_stubs.placements.setdefault(stub.type, {})\
+        .setdefault(stub.condition_key, {})\
+        .setdefault(stub.condition_val, [])\
+        .append((stub_container, stub_key))
+
+
+def _merge_placements(placements, other):
+  """Add placements of ``other`` to ``placements``."""
+  for type_, result_spec in other.items():
+    type_placements = placements.setdefault(type_, {})
+    for keys, values in result_spec.items():
+      key_placements = type_placements.setdefault(keys, {})
+      for vals, container_keys in values.items():
+        key_placements.setdefault(vals, []).extend(container_keys)
+
+
+def resolve_registered_stubs(placements):
+  """Replace registered lazy stubs with rendered stubs.
+
+  Every type is loaded with a single query with one ``IN`` condition per
+  set of condition keys. Stubs without a matching row are replaced with
+  None.
+  """
+  for type_, result_spec in placements.items():
+    type_columns, query = build_type_query(type_, result_spec)
+    for row in query:
+      for keys, container_keys in result_spec.items():
+        vals = tuple(row[type_columns[k]] for k in keys)
+        for container, key in container_keys.pop(vals, ()):
+          container[key] = _render_stub_from_match(row, type_columns)
+    for container_keys in result_spec.values():
+      for pairs in container_keys.values():
+        for container, key in pairs:
+          container[key] = None
+
+
 def walk_representation(obj):  # noqa
   if isinstance(obj, dict):
     for key, value in obj.items():
@@ -497,7 +607,49 @@ def reify_representation(resource, results, type_columns):
   return resource
 
 
+def _take_registered_stubs(resource):
+  """Take registered stubs of published objects in ``resource``.
+
+  ``resource`` can be a published object or a list or dict of them.
+
+  Returns:
+    placements of all registered stubs and whether ``resource`` can hold
+    stubs that are not registered.
+  """
+  if isinstance(resource, PublishedObject):
+    objs = [resource]
+  elif isinstance(resource, dict):
+    objs = resource.values()
+  elif isinstance(resource, (list, tuple)):
+    objs = resource
+  else:
+    return {}, True
+  placements = {}
+  unregistered = False
+  for obj in objs:
+    lazy_stubs = getattr(obj, "lazy_stubs", None)
+    if lazy_stubs is None:
+      unregistered = unregistered or isinstance(obj, (dict, list, tuple))
+      continue
+    unregistered = unregistered or not lazy_stubs.complete
+    _merge_placements(placements, lazy_stubs.placements)
+    obj.lazy_stubs = LazyStubs()
+  return placements, unregistered
+
+
 def publish_representation(resource):
+  """Replace lazy stubs in ``resource`` with rendered stubs.
+
+  Stubs of objects published in an app context are registered where they
+  are placed, so they are resolved without walking ``resource``. It is only
+  walked if it can hold stubs that were not registered.
+  """
+  placements, unregistered = _take_registered_stubs(resource)
+  if placements:
+    resolve_registered_stubs(placements)
+  if not unregistered:
+    return resource
+
   queries = gather_queries(resource)
 
   if len(queries) == 0:
@@ -516,7 +668,17 @@ def publish_representation(resource):
 
 
 class Builder(AttributeInfo):
-  """JSON Dictionary builder for ggrc.models.* objects and their mixins."""
+  """JSON Dictionary builder for ggrc.models.* objects and their mixins.
+
+  Attributes:
+    _serializers: LRU ordered compiled serializers by (model, inclusions,
+      whitelist)
+  """
+
+  def __init__(self, tgt_class):
+    super(Builder, self).__init__(tgt_class)
+    self._serializers = OrderedDict()
+    self._serializers_lock = threading.Lock()
 
   def generate_link_object_for(
           self, obj, inclusions, include, inclusion_filter):
@@ -535,8 +697,8 @@ class Builder(AttributeInfo):
         attr_name, remaining_path = path[0], path[1:]
       else:
         attr_name, remaining_path = path, ()
-      result[attr_name] = self.publish_attr(
-          obj, attr_name, remaining_path, include, inclusion_filter)
+      register_stubs(result, attr_name, self.publish_attr(
+          obj, attr_name, remaining_path, include, inclusion_filter))
     return result
 
   def publish_link_collection(
@@ -671,12 +833,99 @@ class Builder(AttributeInfo):
 
     return result
 
-  def _publish_attrs_for(
-          self, obj, attrs, json_obj, inclusions=None, inclusion_filter=None,
-          attribute_whitelist=None):
-    if inclusions is None:
-      inclusions = []
-    for attr in attrs:
+  def _compile_association_proxy(self, attr_name, class_attr, inclusions,
+                                 include):
+    """Get a function publishing an association proxy."""
+    if getattr(class_attr, 'publish_raw', False):
+      def publish_raw(obj, _):
+        """Publish a copy of the raw value."""
+        published_attr = getattr(obj, attr_name)
+        if hasattr(published_attr, "copy"):
+          return published_attr.copy()
+        return published_attr
+      return publish_raw
+    return lambda obj, inclusion_filter: self.publish_association_proxy(
+        obj, attr_name, class_attr, inclusions, include, inclusion_filter)
+
+  def _compile_relationship(self, attr_name, class_attr, inclusions,
+                            include):
+    """Get a function publishing a relationship, see publish_relationship."""
+    prop = class_attr.property
+    if prop.uselist:
+      return lambda obj, inclusion_filter: self.publish_link_collection(
+          getattr(obj, attr_name), inclusions, include, inclusion_filter)
+    if include or prop.backref:
+      return lambda obj, inclusion_filter: self.publish_link(
+          obj, attr_name, inclusions, include, inclusion_filter)
+    target_name = list(prop.local_columns)[0].key
+    if prop.mapper.class_.__mapper__.polymorphic_on is not None:
+      target_type = None
+    else:
+      target_type = prop.mapper.class_.__name__
+
+    def publish_stub(obj, _):
+      """Publish a lazy stub of the related object."""
+      if target_type is None:
+        type_ = getattr(obj, attr_name).__class__.__name__
+      else:
+        type_ = target_type
+      attr_value = getattr(obj, target_name)
+      if attr_value is not None:
+        return LazyStubRepresentation(type_, attr_value)
+      return None
+    return publish_stub
+
+  def _compile_attr(self, cls, attr_name, inclusions, include):
+    """Get a function publishing one attribute of objects of ``cls``.
+
+    The returned function takes an object and an inclusion filter and gives
+    the same result as publish_attr, but all decisions that only depend on
+    the class attribute are made once here.
+    """
+    class_attr = getattr(cls, attr_name)
+
+    if attr_name in getattr(cls, "_custom_publish", {}):
+      custom_publish = cls._custom_publish[attr_name]
+      return lambda obj, _: custom_publish(obj)
+    elif isinstance(class_attr, AssociationProxy):
+      return self._compile_association_proxy(
+          attr_name, class_attr, inclusions, include)
+    elif isinstance(class_attr, InstrumentedAttribute) and \
+            isinstance(class_attr.property, RelationshipProperty):
+      return self._compile_relationship(
+          attr_name, class_attr, inclusions, include)
+    elif class_attr.__class__.__name__ == 'property':
+      if not inclusions or include:
+        id_name = '{0}_id'.format(attr_name)
+        type_name = '{0}_type'.format(attr_name)
+
+        def publish_property_stub(obj, _):
+          """Publish a lazy stub of the object the property refers to."""
+          if getattr(obj, id_name):
+            return LazyStubRepresentation(
+                getattr(obj, type_name), getattr(obj, id_name))
+          return None
+        return publish_property_stub
+      return lambda obj, inclusion_filter: self.publish_link(
+          obj, attr_name, inclusions, include, inclusion_filter)
+    return lambda obj, _: getattr(obj, attr_name)
+
+  def _compile_serializer(self, cls, inclusions, attribute_whitelist):
+    """Get (attribute name, publish function) pairs of published attributes.
+
+    Serializers are compiled on first use for every combination of model,
+    inclusions and attribute whitelist and reused afterwards, keeping the
+    SERIALIZER_CACHE_SIZE most recently used ones.
+    """
+    key = (cls, frozenset(inclusions),
+           frozenset(attribute_whitelist) if attribute_whitelist else None)
+    with self._serializers_lock:
+      serializer = self._serializers.pop(key, None)
+      if serializer is not None:
+        self._serializers[key] = serializer
+        return serializer
+    serializer = []
+    for attr in self._publish_attrs:
       if hasattr(attr, '__call__'):
         attr_name = attr.attr_name
       else:
@@ -688,9 +937,13 @@ class Builder(AttributeInfo):
           break
       if attribute_whitelist and attr_name not in attribute_whitelist:
         continue
-      json_obj[attr_name] = self.publish_attr(
-          obj, attr_name, local_inclusion[1:], len(local_inclusion) > 0,
-          inclusion_filter)
+      serializer.append((attr_name, self._compile_attr(
+          cls, attr_name, local_inclusion[1:], len(local_inclusion) > 0)))
+    with self._serializers_lock:
+      self._serializers[key] = serializer
+      while len(self._serializers) > SERIALIZER_CACHE_SIZE:
+        self._serializers.popitem(last=False)
+    return serializer
 
   def publish_attrs(self, obj, json_obj, extra_inclusions, inclusion_filter,
                     attribute_whitelist):
@@ -711,9 +964,10 @@ class Builder(AttributeInfo):
     """
     inclusions = tuple((attr,) for attr in self._include_links)
     inclusions = tuple(set(inclusions).union(set(extra_inclusions)))
-    return self._publish_attrs_for(
-        obj, self._publish_attrs, json_obj, inclusions, inclusion_filter,
-        attribute_whitelist)
+    serializer = self._compile_serializer(
+        obj.__class__, inclusions, attribute_whitelist)
+    for attr_name, publish_attr in serializer:
+      register_stubs(json_obj, attr_name, publish_attr(obj, inclusion_filter))
 
   @classmethod
   def do_update_attrs(cls, obj, json_obj, attrs):
@@ -725,9 +979,14 @@ class Builder(AttributeInfo):
       UpdateAttrHandler.do_update_attr(obj, json_obj, attr_name)
 
   def publish_contribution(self, obj, inclusions, inclusion_filter,
-                           attribute_whitelist):
-    """Translate the state represented by ``obj`` into a JSON dictionary"""
-    json_obj = {}
+                           attribute_whitelist, json_obj=None):
+    """Translate the state represented by ``obj`` into a JSON dictionary.
+
+    Attributes are added to ``json_obj`` if it is given, so that registered
+    lazy stubs are placed in the dictionary that is returned to the caller.
+    """
+    if json_obj is None:
+      json_obj = {}
     self.publish_attrs(obj, json_obj, inclusions, inclusion_filter,
                        attribute_whitelist)
     return json_obj
@@ -2,6 +2,9 @@
 # Licensed under http://www.apache.org/licenses/LICENSE-2.0 <see LICENSE file>
 
 
+from .backends import get_cache_backend
 from .localcache import LocalCache
 from .memcache import MemCache
 from .cachemanager import CacheManager
+from .lrucache import LRUCache, get_local_cache
+from .tieredcache import TieredCache
@@ -0,0 +1,299 @@
+# Copyright (C) 2017 Google Inc.
+# Licensed under http://www.apache.org/licenses/LICENSE-2.0 <see LICENSE file>
+
+"""
+Backends provide the memcache clients used by MemCache
+
+A backend is selected with the CACHE_BACKEND setting and created once per
+process. Every MemCache asks it for a client, which implements the subset of
+the App Engine memcache.Client API used by ggrc: get, gets, set, add, cas,
+delete and their _multi variants, and flush_all.
+
+  AppEngineBackend  - App Engine memcache, the default
+  MemcachedBackend  - memcached servers from MEMCACHED_SERVERS, through the
+                      python-memcached package
+  InProcessBackend  - dictionary shared by all requests of the process, for
+                      development, tests and local benchmarks
+"""
+
+from __future__ import absolute_import
+
+import cPickle
+import threading
+import time
+
+from flask import g
+from flask import has_app_context
+
+from ggrc.extensions import get_extension_instance
+
+
+# Return values of the App Engine memcache client
+DELETE_NETWORK_FAILURE = 0
+DELETE_ITEM_MISSING = 1
+DELETE_SUCCESSFUL = 2
+STORED = 1
+
+# Expiration times longer than this are absolute unix timestamps
+MAX_RELATIVE_EXPIRATION = 60 * 60 * 24 * 30
+
+
+def get_cache_backend():
+  """ Get the cache backend configured in settings """
+  return get_extension_instance(
+      'CACHE_BACKEND', 'ggrc.cache.backends.AppEngineBackend')
+
+
+class AppEngineBackend(object):
+  """ Backend creating App Engine memcache clients """
+
+  def __init__(self, settings):
+    # pylint: disable=unused-argument
+    from google.appengine.api import memcache
+    self.memcache = memcache
+
+  def client(self):
+    return self.memcache.Client()
+
+
+class MemcachedBackend(object):
+  """ Backend talking to memcached servers with the text protocol """
+
+  def __init__(self, settings):
+    from ggrc.cache import memcached
+    # python-memcached clients are thread local, so one client is shared by
+    # all requests.
+    self.memcache_client = memcached.Client(settings.MEMCACHED_SERVERS,
+                                            cache_cas=True)
+
+  def client(self):
+    # Several MemCache instances of a request share the thread local client,
+    # so cas ids of earlier requests are forgotten only once per request.
+    if has_app_context() and not getattr(g, "memcached_cas_reset", False):
+      self.memcache_client.reset_cas()
+      g.memcached_cas_reset = True
+    return MemcachedClient(self.memcache_client)
+
+
+class MemcachedClient(object):
+  """ App Engine style client on top of a python-memcached client
+
+  memcached can not lock keys for adds on delete, so the seconds argument of
+  delete and delete_multi is ignored.
+  """
+
+  def __init__(self, client):
+    self.client = client
+
+  def get(self, key):
+    return self.client.get(key)
+
+  def gets(self, key):
+    return self.client.gets(key)
+
+  def get_multi(self, keys, key_prefix='', namespace=None, for_cas=False):
+    # pylint: disable=unused-argument
+    if not for_cas:
+      return self.client.get_multi(keys, key_prefix=key_prefix)
+    return self.client.gets_multi(keys, key_prefix)
+
+  def set(self, key, value, time=0):
+    # pylint: disable=redefined-outer-name
+    return bool(self.client.set(key, value, time))
+
+  def set_multi(self, mapping, time=0):
+    # pylint: disable=redefined-outer-name
+    return self.client.set_multi(mapping, time)
+
+  def add(self, key, value, time=0):
+    # pylint: disable=redefined-outer-name
+    return bool(self.client.add(key, value, time))
+
+  def add_multi(self, mapping, time=0):
+    # pylint: disable=redefined-outer-name
+    return [key for key, value in mapping.iteritems()
+            if not self.client.add(key, value, time)]
+
+  def cas(self, key, value, time=0):
+    # pylint: disable=redefined-outer-name
+    return bool(self.client.cas(key, value, time))
+
+  def cas_multi(self, mapping, time=0):
+    # pylint: disable=redefined-outer-name
+    return [key for key, value in mapping.iteritems()
+            if not self.client.cas(key, value, time)]
+
+  def delete(self, key, seconds=0):
+    # pylint: disable=unused-argument
+    # python-memcached does not tell missing keys from deleted ones
+    if self.client.delete(key):
+      return DELETE_SUCCESSFUL
+    return DELETE_NETWORK_FAILURE
+
+  def delete_multi(self, keys, seconds=0):
+    # pylint: disable=unused-argument
+    return bool(self.client.delete_multi(list(keys)))
+
+  def flush_all(self):
+    self.client.flush_all()
+    return True
+
+
+class InProcessBackend(object):
+  """ Backend keeping entries in a dictionary of the process
+
+      Attributes:
+        entries: dictionary of keys and (expires_at, version, pickled value)
+        locked: dictionary of keys and the time until adds are rejected
+  """
+
+  def __init__(self, settings):
+    # pylint: disable=unused-argument
+    self.entries = {}
+    self.locked = {}
+    self.version = 0
+    self.lock = threading.RLock()
+    self.hits = 0
+    self.misses = 0
+
+  def client(self):
+    return InProcessClient(self)
+
+
+def _expires_at(expiration):
+  """ Get the unix time of an App Engine style expiration or 0 for never """
+  if not expiration:
+    return 0
+  if expiration > MAX_RELATIVE_EXPIRATION:
+    return expiration
+  return time.time() + expiration
+
+
+class InProcessClient(object):
+  """ App Engine style client of an InProcessBackend
+
+  Values are pickled, so every get returns a fresh copy like memcache does.
+  Cas ids of gets calls are kept per client like in App Engine.
+  """
+
+  def __init__(self, backend):
+    self.backend = backend
+    self.cas_ids = {}
+
+  def _entry(self, key):
+    """ Get the entry of a key that has not expired """
+    entry = self.backend.entries.get(key)
+    if entry is not None and entry[0] and entry[0] <= time.time():
+      del self.backend.entries[key]
+      entry = None
+    return entry
+
+  def _set(self, key, value, time_):
+    """ Store a value under a new version """
+    self.backend.version += 1
+    pickled = cPickle.dumps(value, cPickle.HIGHEST_PROTOCOL)
+    self.backend.entries[key] = (_expires_at(time_), self.backend.version,
+                                 pickled)
+    return True
+
+  def _add(self, key, value, time_):
+    """ Store a value if the key is not in cache nor locked by a delete """
+    if self._entry(key) is not None:
+      return False
+    if self.backend.locked.get(key, 0) > time.time():
+      return False
+    self.backend.locked.pop(key, None)
+    return self._set(key, value, time_)
+
+  def _cas(self, key, value, time_):
+    """ Store a value if it did not change since it was read with gets """
+    entry = self._entry(key)
+    if entry is None or self.cas_ids.get(key) != entry[1]:
+      return False
+    return self._set(key, value, time_)
+
+  def _delete(self, key, seconds):
+    """ Delete a key and reject adds to it for the given seconds """
+    if seconds:
+      self.backend.locked[key] = _expires_at(seconds)
+    if self._entry(key) is None:
+      return DELETE_ITEM_MISSING
+    del self.backend.entries[key]
+    return DELETE_SUCCESSFUL
+
+  def get_multi(self, keys, key_prefix='', namespace=None, for_cas=False):
+    # pylint: disable=unused-argument
+    result = {}
+    with self.backend.lock:
+      for key in keys:
+        entry = self._entry(key_prefix + key)
+        if entry is None:
+          self.backend.misses += 1
+          continue
+        self.backend.hits += 1
+        if for_cas:
+          self.cas_ids[key_prefix + key] = entry[1]
+        result[key] = cPickle.loads(entry[2])
+    return result
+
+  def get(self, key):
+    return self.get_multi([key]).get(key)
+
+  def gets(self, key):
+    return self.get_multi([key], for_cas=True).get(key)
+
+  def set_multi(self, mapping, time=0):
+    # pylint: disable=redefined-outer-name
+    with self.backend.lock:
+      return [key for key, value in mapping.iteritems()
+              if not self._set(key, value, time)]
+
+  def set(self, key, value, time=0):
+    # pylint: disable=redefined-outer-name
+    return not self.set_multi({key: value}, time)
+
+  def add_multi(self, mapping, time=0):
+    # pylint: disable=redefined-outer-name
+    with self.backend.lock:
+      return [key for key, value in mapping.iteritems()
+              if not self._add(key, value, time)]
+
+  def add(self, key, value, time=0):
+    # pylint: disable=redefined-outer-name
+    return not self.add_multi({key: value}, time)
+
+  def cas_multi(self, mapping, time=0):
+    # pylint: disable=redefined-outer-name
+    with self.backend.lock:
+      return [key for key, value in mapping.iteritems()
+              if not self._cas(key, value, time)]
+
+  def cas(self, key, value, time=0):
+    # pylint: disable=redefined-outer-name
+    return not self.cas_multi({key: value}, time)
+
+  def delete(self, key, seconds=0):
+    with self.backend.lock:
+      return self._delete(key, seconds)
+
+  def delete_multi(self, keys, seconds=0):
+    with self.backend.lock:
+      for key in keys:
+        self._delete(key, seconds)
+    return True
+
+  def flush_all(self):
+    with self.backend.lock:
+      self.backend.entries.clear()
+      self.backend.locked.clear()
+    return True
+
+  def get_stats(self):
+    with self.backend.lock:
+      return {
+          "hits": self.backend.hits,
+          "misses": self.backend.misses,
+          "items": len(self.backend.entries),
+          "bytes": sum(len(entry[2])
+                       for entry in self.backend.entries.values()),
+      }
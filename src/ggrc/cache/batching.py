@@ -0,0 +1,114 @@
+# Copyright (C) 2017 Google Inc.
+# Licensed under http://www.apache.org/licenses/LICENSE-2.0 <see LICENSE file>
+
+"""Memcache client issuing multi operations in parallel batches.
+
+Collection GETs read and write thousands of cache entries. Sending them in
+small sequential get_multi and add_multi calls makes the request wait for one
+round trip per slice. BatchedClient splits the keys into batches of
+MEMCACHE_BATCH_SIZE and starts the asynchronous RPCs of all batches before
+waiting for any of them, so a call takes about as long as its slowest batch.
+
+Clients without asynchronous methods run the batches one after another.
+Number of keys, batches and time spent waiting on memcache are summed for
+every request in flask.g.memcache_stats.
+"""
+
+import logging
+import time
+from collections import defaultdict
+
+from flask import g
+from flask import has_request_context
+
+from ggrc.cache.backends import STORED
+
+
+logger = logging.getLogger(__name__)  # pylint: disable=invalid-name
+
+
+def get_request_stats():
+  """Get memcache stats of the current request."""
+  if not has_request_context():
+    return None
+  if not hasattr(g, "memcache_stats"):
+    g.memcache_stats = defaultdict(float)
+  return g.memcache_stats
+
+
+class BatchedClient(object):
+  """Wrapper of a memcache client sending multi operations in batches."""
+
+  def __init__(self, client, batch_size):
+    self.client = client
+    self.batch_size = max(batch_size, 1)
+
+  def _split(self, keys):
+    """Split a list of keys into batches."""
+    return [keys[start:start + self.batch_size]
+            for start in range(0, len(keys), self.batch_size)]
+
+  def _record(self, operation, keys, batches, start):
+    """Add a finished operation to the request stats."""
+    duration = time.time() - start
+    logger.debug("%.4f memcache %s: %s keys in %s batches",
+                 duration, operation, keys, batches)
+    stats = get_request_stats()
+    if stats is None:
+      return
+    stats[operation + "_calls"] += 1
+    stats[operation + "_keys"] += keys
+    stats[operation + "_batches"] += batches
+    stats[operation + "_seconds"] += duration
+
+  def _run(self, operation, batches, *args):
+    """Run a multi operation for all batches and collect the results."""
+    async_method = getattr(self.client, operation + "_async", None)
+    if async_method is None:
+      method = getattr(self.client, operation)
+      return [method(batch, *args) for batch in batches]
+    rpcs = [async_method(batch, *args) for batch in batches]
+    return [rpc.get_result() for rpc in rpcs]
+
+  def get_multi(self, keys):
+    """Get values of all keys found in the cache.
+
+    Returns:
+      dict with values of found keys.
+    """
+    keys = list(keys)
+    if not keys:
+      return {}
+    start = time.time()
+    batches = self._split(keys)
+    result = {}
+    for batch_result in self._run("get_multi", batches):
+      result.update(batch_result or {})
+    self._record("get_multi", len(keys), len(batches), start)
+    return result
+
+  def add_multi(self, mapping, time_=0):
+    """Add values of keys that are not in the cache yet.
+
+    Returns:
+      list of keys that were not added.
+    """
+    if not mapping:
+      return []
+    start = time.time()
+    batches = [{key: mapping[key] for key in batch}
+               for batch in self._split(mapping.keys())]
+    not_added = []
+    results = self._run("add_multi", batches, time_)
+    for batch, batch_result in zip(batches, results):
+      if batch_result is None:
+        # Asynchronous adds return None on network errors.
+        not_added.extend(batch)
+      elif isinstance(batch_result, dict):
+        # Asynchronous adds return the status of every key.
+        not_added.extend(key for key, status in batch_result.iteritems()
+                         if status != STORED)
+      else:
+        not_added.extend(batch_result)
+    self._record("add_multi", len(mapping), len(batches), start)
+    return not_added
@@ -164,6 +164,9 @@ class Cache:
   def get(self, *_):
     return None
 
+  def get_partial(self, *_):
+    return None
+
   def add(self, *_):
     return None
 
@@ -179,6 +182,12 @@ class Cache:
   def add_multi(self, *_):
     return None
 
+  def local_get_multi(self, *_):
+    return {}
+
+  def local_set_multi(self, *_):
+    return None
+
   def update_multi(self, *_):
     return None
 
@@ -7,6 +7,8 @@
     for resource collection.
 
 """
+from collections import OrderedDict
+
 from cache import all_cache_entries, all_mapping_entries
 
 
@@ -24,6 +26,8 @@ class CacheManager:
                          before and after flush
     marked_for_<op>: dictionaries used in session event listeners after flush,
                      before and after commit
+    marked_permission_changes: set of cached permission fragments to
+                               invalidate after commit, None for all
 
   Returns:
     None
@@ -52,14 +56,20 @@ class CacheManager:
     self.marked_for_add = {}
     self.marked_for_update = {}
     self.marked_for_delete = []
+    self.marked_permission_changes = set()
 
-  def get_collection(self, category, resource, filter):
+  def get_collection(self, category, resource, filter, load_missing=None):
     """Get collection from cache.
 
     Args:
       category: collection or stub
       resource: regulation, controls, etc.
       filter: dictionary containing ids and optional attrs
+      load_missing: optional function loading items with ids that are not in
+                    cache, it gets the list of missing ids and returns a
+                    dictionary of their ids and attrs. Loaded items are added
+                    to cache. Without it, None is returned if any of the
+                    items is not in cache.
 
     Returns:
       JSON string representation
@@ -67,9 +77,42 @@ class CacheManager:
     if not self.is_caching_supported(category, resource, filter,
                                      'get_collection'):
       return None
-    ret = self.cache_object.get(category, resource, filter)
+    if load_missing is None:
+      return self.cache_object.get(category, resource, filter)
+    result = self.get_collection_partial(category, resource, filter)
+    if result is None:
+      return None
+    data, missing_ids = result
+    if not missing_ids:
+      return data
+    loaded = load_missing(missing_ids) or {}
+    if loaded:
+      self.add_collection(category, resource, loaded)
+    ret = OrderedDict()
+    for id_ in filter.get('ids'):
+      if id_ in data:
+        ret[id_] = data[id_]
+      elif id_ in loaded:
+        ret[id_] = loaded[id_]
     return ret
 
+  def get_collection_partial(self, category, resource, filter):
+    """Get items of a collection that are in cache.
+
+    Args:
+      category: collection or stub
+      resource: regulation, controls, etc.
+      filter: dictionary containing ids and optional attrs
+
+    Returns:
+      None if the collection is not cached, otherwise a tuple of an ordered
+      mapping of found ids to their attrs and a list of missing ids.
+    """
+    if not self.is_caching_supported(category, resource, filter,
+                                     'get_collection'):
+      return None
+    return self.cache_object.get_partial(category, resource, filter)
+
   def add_collection(self, category, resource, data, expiration_time=0):
     """Add collection in cache.
 
@@ -202,3 +245,4 @@ class CacheManager:
     self.marked_for_add = {}
     self.marked_for_update = {}
     self.marked_for_delete = []
+    self.marked_permission_changes = set()
@@ -69,6 +69,35 @@ class LocalCache(Cache):
       else:
         return self.get_data(ids, entries, attrs)
 
+  def get_partial(self, category, resource, filter):
+    """ Get data found in local cache for the specified filter
+
+    Args:
+      category: collection or stub
+      resource: regulation, controls, etc.
+      filter: dictionary containing ids and optional attrs
+
+    Returns:
+      None on any errors
+      otherwise a tuple of mapping of found ids to their attrs and a list of
+      ids that are not in cache
+    """
+    if not self.is_caching_supported(category, resource):
+      return None
+
+    cache_key = self.get_key(category, resource)
+    if cache_key is None:
+      return None
+
+    ids, attrs = self.parse_filter(filter)
+    if ids is None:
+      return None
+
+    entries = self.cache_entries.get(cache_key) or {}
+    found_ids = [key for key in ids if key in entries]
+    missing_ids = [key for key in ids if key not in entries]
+    return self.get_data(found_ids, entries, attrs), missing_ids
+
   def add(self, category, resource, data, expiration_time=0):
     """ Add data to local cache for the specified data
 
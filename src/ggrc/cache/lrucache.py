@@ -0,0 +1,253 @@
+# Copyright (C) 2017 Google Inc.
+# Licensed under http://www.apache.org/licenses/LICENSE-2.0 <see LICENSE file>
+
+"""
+LRUCache implements a bounded in-process cache
+
+Entries are kept pickled, so that every get returns a fresh copy like
+memcache does and the size of an entry is known. The cache holds at most
+max_entries entries and max_bytes bytes of pickled values, evicting the
+least recently used entries first. Entries expire ttl seconds after they
+were stored.
+
+The cache is meant as a first tier in front of memcache, see TieredCache.
+Other instances of the application do not invalidate it, so the ttl bounds
+how long it can return values that were changed elsewhere.
+"""
+
+import cPickle
+import threading
+import time
+from collections import OrderedDict
+
+from cache import Cache
+from ggrc import settings
+
+
+class LRUCache(Cache):
+  """ Thread safe in-process cache with LRU eviction and expiration
+
+      Attributes:
+        entries: ordered dictionary of cache keys and (expires_at, pickled
+        value) pairs, the most recently used key is the last one
+  """
+
+  def __init__(self, max_entries, max_bytes=0, ttl=0):
+    self.name = 'lru'
+    self.max_entries = max_entries
+    self.max_bytes = max_bytes
+    self.ttl = ttl
+    self.entries = OrderedDict()
+    self.size = 0
+    self.lock = threading.RLock()
+    self.hits = 0
+    self.misses = 0
+    self.evictions = 0
+    self.expirations = 0
+
+  def get_name(self):
+    return self.name
+
+  def is_caching_supported(self, category, resource):
+    return category == 'collection'
+
+  def get_stats(self):
+    """ Get hit, miss, eviction and expiration counters of the cache """
+    with self.lock:
+      return {
+          "hits": self.hits,
+          "misses": self.misses,
+          "evictions": self.evictions,
+          "expirations": self.expirations,
+          "entries": len(self.entries),
+          "bytes": self.size,
+      }
+
+  def _pop(self, key):
+    """ Remove an entry and return its (expires_at, pickled value) pair """
+    entry = self.entries.pop(key, None)
+    if entry is not None:
+      self.size -= len(entry[1])
+    return entry
+
+  def _get(self, key):
+    """ Get a value, counting the lookup """
+    entry = self._pop(key)
+    if entry is not None and entry[0] and entry[0] < time.time():
+      self.expirations += 1
+      entry = None
+    if entry is None:
+      self.misses += 1
+      return None
+    self.hits += 1
+    self.entries[key] = entry
+    self.size += len(entry[1])
+    return cPickle.loads(entry[1])
+
+  def _set(self, key, value, expiration_time=0):
+    """ Store a value, evicting least recently used entries if needed """
+    self._pop(key)
+    pickled = cPickle.dumps(value, cPickle.HIGHEST_PROTOCOL)
+    if self.max_bytes and len(pickled) > self.max_bytes:
+      return False
+    ttls = [ttl for ttl in (self.ttl, expiration_time) if ttl]
+    expires_at = time.time() + min(ttls) if ttls else 0
+    self.entries[key] = (expires_at, pickled)
+    self.size += len(pickled)
+    while (len(self.entries) > self.max_entries or
+           self.max_bytes and self.size > self.max_bytes):
+      self._pop(next(iter(self.entries)))
+      self.evictions += 1
+    return True
+
+  def get_multi(self, keys):
+    """ Get values of keys found in cache
+
+    Returns:
+      dictionary of found keys and their values
+    """
+    result = {}
+    with self.lock:
+      for key in keys:
+        value = self._get(key)
+        if value is not None:
+          result[key] = value
+    return result
+
+  def set_multi(self, data, expiration_time=0):
+    """ Store values of all keys in data
+
+    Returns:
+      list of keys that were not stored
+    """
+    with self.lock:
+      return [key for key, value in data.items()
+              if not self._set(key, value, expiration_time)]
+
+  def add_multi(self, data, expiration_time=0):
+    """ Store values of keys in data that are not in cache yet
+
+    Returns:
+      list of keys that were not stored
+    """
+    not_added = []
+    with self.lock:
+      for key, value in data.items():
+        entry = self.entries.get(key)
+        if entry is not None and not (entry[0] and entry[0] < time.time()):
+          not_added.append(key)
+        elif not self._set(key, value, expiration_time):
+          not_added.append(key)
+    return not_added
+
+  def update_multi(self, data, expiration_time=0):
+    """ Replace values of keys in data that are in cache
+
+    Returns:
+      list of keys that were not updated
+    """
+    not_updated = []
+    with self.lock:
+      for key, value in data.items():
+        if key not in self.entries or not self._set(key, value,
+                                                    expiration_time):
+          not_updated.append(key)
+    return not_updated
+
+  def remove_multi(self, keys, lockadd_seconds=0):
+    """ Remove all keys from cache """
+    with self.lock:
+      for key in keys:
+        self._pop(key)
+    return True
+
+  def get(self, category, resource, filter):
+    """ Get items from cache for the specified filter
+
+    Returns:
+      None if any of the items is not in cache
+      otherwise mapping of ids to their attrs
+    """
+    result = self.get_partial(category, resource, filter)
+    if result is None or result[1]:
+      return None
+    return result[0]
+
+  def get_partial(self, category, resource, filter):
+    """ Get items found in cache for the specified filter
+
+    Returns:
+      None on any errors
+      otherwise a tuple of an ordered mapping of found ids to their attrs and
+      a list of ids that are not in cache
+    """
+    if not self.is_caching_supported(category, resource):
+      return None
+    ids, attrs = self.parse_filter(filter)
+    if ids is None:
+      return None
+    cache_key = self.get_key(category, resource)
+    values = self.get_multi([cache_key + ":" + str(id_) for id_ in ids])
+    data = OrderedDict()
+    missing_ids = []
+    for id_ in ids:
+      attrvalues = values.get(cache_key + ":" + str(id_))
+      if attrvalues is None:
+        missing_ids.append(id_)
+      elif attrs is None:
+        data[id_] = attrvalues
+      else:
+        data[id_] = OrderedDict(
+            (attr, attrvalues[attr]) for attr in attrs if attr in attrvalues)
+    return data, missing_ids
+
+  def _keys_for(self, category, resource, data):
+    """ Get cache keys of items in data """
+    cache_key = self.get_key(category, resource)
+    return {cache_key + ":" + str(id_): value for id_, value in data.items()}
+
+  def add(self, category, resource, data, expiration_time=0):
+    """ Store items in cache for the specified data """
+    if not self.is_caching_supported(category, resource):
+      return None
+    self.set_multi(self._keys_for(category, resource, data), expiration_time)
+    return data
+
+  def update(self, category, resource, data, expiration_time=0):
+    """ Replace items in cache for the specified data """
+    if not self.is_caching_supported(category, resource):
+      return None
+    self.update_multi(self._keys_for(category, resource, data),
+                      expiration_time)
+    return data
+
+  def remove(self, category, resource, data, lockadd_seconds=0):
+    """ Remove items from cache for the specified data """
+    if not self.is_caching_supported(category, resource):
+      return None
+    self.remove_multi(self._keys_for(category, resource, data).keys())
+    return data
+
+  def clean(self):
+    """ Remove all entries """
+    with self.lock:
+      self.entries.clear()
+      self.size = 0
+    return True
+
+
+_local_cache = None
+_local_cache_lock = threading.Lock()
+
+
+def get_local_cache():
+  """ Get the process wide LRUCache or None if it is disabled in settings """
+  global _local_cache  # pylint: disable=global-statement
+  if not settings.LOCAL_CACHE_MAX_ENTRIES:
+    return None
+  with _local_cache_lock:
+    if _local_cache is None:
+      _local_cache = LRUCache(settings.LOCAL_CACHE_MAX_ENTRIES,
+                              settings.LOCAL_CACHE_MAX_BYTES,
+                              settings.LOCAL_CACHE_TTL)
+    return _local_cache
@@ -2,7 +2,7 @@
 # Licensed under http://www.apache.org/licenses/LICENSE-2.0 <see LICENSE file>
 
 
-from google.appengine.api import memcache
+from backends import get_cache_backend
 from cache import Cache
 from cache import all_cache_entries
 from collections import OrderedDict
@@ -11,6 +11,8 @@ from copy import deepcopy
 """
     Memcache implements the remote AppEngine Memcache mechanism
 
+    The memcache client is provided by the backend set in CACHE_BACKEND.
+
 """
 class MemCache(Cache):
   def __init__(self):
@@ -20,7 +22,7 @@ class MemCache(Cache):
     for cache_entry in all_cache_entries():
       if cache_entry.cache_type is self.name:
         self.supported_resources[cache_entry.model_plural]=cache_entry.class_name
-        self.memcache_client = memcache.Client()
+        self.memcache_client = get_cache_backend().client()
 
   def get_name(self):
     return self.name
@@ -38,37 +40,58 @@ class MemCache(Cache):
       None on any errors
       otherwise returns JSON string representation
     """
+    result = self.get_partial(category, resource, filter)
+    if result is None:
+      return None
+    data, missing_ids = result
+    if missing_ids:
+      # All or None policy is enforced, if one of the objects is not available
+      # in cache, then we return empty
+      return None
+    return data
+
+  def get_partial(self, category, resource, filter):
+    """ get items found in mem cache for specified filter
+
+    All items are fetched with a single get_multi call.
+
+    Args:
+      category: collection or stub
+      resource: regulation, controls, etc.
+      filter: dictionary containing ids and optional attrs
 
+    Returns:
+      None on any errors
+      otherwise a tuple of an ordered mapping of found ids to their attrs and
+      a list of ids that are not in cache
+    """
     if not self.is_caching_supported(category, resource):
       return None
-    # TODO(dan): use memcache.Client.get_multi() instead of gets()
-    #
-    data = OrderedDict()
     cache_key = self.get_key(category, resource)
     if cache_key is None:
-      return  None
+      return None
     ids, attrs = self.parse_filter(filter)
-    if ids is None and attrs is None:
+    if ids is None:
       return None
-    else:
-      if ids is None:
-        return None
-    for id in ids:
-      attrvalues= self.memcache_client.gets(cache_key + ":" + str(id))
-      if attrvalues is not None:
-        if attrs is None:
-          data[id] = attrvalues
-        else:
-          attr_dict = OrderedDict()
-          for attr in attrs:
-            if attrvalues.has_key(attr):
-              attr_dict[attr] = deepcopy(attrvalues.get(attr))
-          data[id] = attr_dict
+    keys = [cache_key + ":" + str(id) for id in ids]
+    # TODO(dan): cannot distinguish network failures vs id not found in
+    # memcache, both scenarios return missing ids
+    values = self.memcache_client.get_multi(keys, '', None, True) or {}
+    data = OrderedDict()
+    missing_ids = []
+    for id, key in zip(ids, keys):
+      attrvalues = values.get(key)
+      if attrvalues is None:
+        missing_ids.append(id)
+      elif attrs is None:
+        data[id] = attrvalues
       else:
-        # All or None policy is enforced, if one of the objects is not available in cache, then we return empty
-        # TODO(dan): cannot distinguish network failures vs id not found in memcache, both scenarios return empty list
-        return None
-    return data
+        attr_dict = OrderedDict()
+        for attr in attrs:
+          if attr in attrvalues:
+            attr_dict[attr] = deepcopy(attrvalues.get(attr))
+        data[id] = attr_dict
+    return data, missing_ids
 
   def add(self, category, resource, data, expiration_time=0):
     """ add data to mem cache
@@ -0,0 +1,43 @@
+# Copyright (C) 2017 Google Inc.
+# Licensed under http://www.apache.org/licenses/LICENSE-2.0 <see LICENSE file>
+
+"""
+python-memcached client with gets_multi
+
+Imported by MemcachedBackend only, as python-memcached is not needed by the
+other backends.
+"""
+
+from __future__ import absolute_import
+
+import socket
+
+import memcache
+
+
+class Client(memcache.Client):
+  """ python-memcached client that can read many values for cas at once """
+
+  def gets_multi(self, keys, key_prefix=''):
+    """ Get values and remember their cas ids with one command per server
+
+    python-memcached has no gets_multi, so this sends the gets command the
+    way get_multi of python-memcached 1.58 sends get.
+    """
+    server_keys, prefixed_to_orig_key = self._map_and_prefix_keys(
+        keys, key_prefix)
+    result = {}
+    for server, server_key_list in server_keys.iteritems():
+      try:
+        server.send_cmd(b"gets " + b" ".join(server_key_list))
+        line = server.readline()
+        while line and line != b"END":
+          rkey, flags, rlen, cas_id = self._expect_cas_value(server, line)
+          if rkey is not None:
+            value = self._recv_value(server, flags, rlen)
+            self.cas_ids[rkey] = cas_id
+            result[prefixed_to_orig_key[rkey]] = value
+          line = server.readline()
+      except (socket.error, ValueError) as exc:
+        server.mark_dead(exc)
+    return result
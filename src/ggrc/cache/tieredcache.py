@@ -0,0 +1,138 @@
+# Copyright (C) 2017 Google Inc.
+# Licensed under http://www.apache.org/licenses/LICENSE-2.0 <see LICENSE file>
+
+"""
+TieredCache puts an in-process LRUCache in front of another cache
+
+Reads are served from the local cache first and only the missing items are
+read from the remote cache, after which they are stored locally. Writes and
+removals go to both caches. Code that skips right to memcache through
+memcache_client only uses the remote cache.
+"""
+
+from collections import OrderedDict
+
+from cache import Cache
+
+
+class TieredCache(Cache):
+  """ Cache with a local first tier and a remote second tier
+
+      Attributes:
+        local: LRUCache shared by all requests of the process
+        remote: cache used by all instances, e.g. MemCache
+  """
+
+  def __init__(self, local, remote):
+    self.local = local
+    self.remote = remote
+    self.name = remote.get_name()
+    self.memcache_client = getattr(remote, 'memcache_client', None)
+
+  def get_name(self):
+    return self.name
+
+  def is_caching_supported(self, category, resource):
+    return self.remote.is_caching_supported(category, resource)
+
+  def get(self, category, resource, filter):
+    """ Get items for the specified filter, All or None policy is applied """
+    result = self.get_partial(category, resource, filter)
+    if result is None or result[1]:
+      return None
+    return result[0]
+
+  def get_partial(self, category, resource, filter):
+    """ Get items found in either tier for the specified filter
+
+    Returns:
+      None on any errors
+      otherwise a tuple of an ordered mapping of found ids to their attrs and
+      a list of ids that are not in cache
+    """
+    if not self.is_caching_supported(category, resource):
+      return None
+    ids, attrs = self.parse_filter(filter)
+    local_result = self.local.get_partial(
+        category, resource, {'ids': ids})
+    if local_result is None:
+      return self.remote.get_partial(category, resource, filter)
+    local_data, missing_ids = local_result
+    remote_data = OrderedDict()
+    if missing_ids:
+      remote_result = self.remote.get_partial(
+          category, resource, {'ids': missing_ids})
+      if remote_result is None:
+        return None
+      remote_data, missing_ids = remote_result
+      if remote_data:
+        self.local.add(category, resource, remote_data)
+    data = OrderedDict()
+    for id_ in ids:
+      attrvalues = local_data.get(id_, remote_data.get(id_))
+      if attrvalues is None:
+        continue
+      if attrs is not None:
+        attrvalues = OrderedDict(
+            (attr, attrvalues[attr]) for attr in attrs if attr in attrvalues)
+      data[id_] = attrvalues
+    return data, missing_ids
+
+  def add(self, category, resource, data, expiration_time=0):
+    ret = self.remote.add(category, resource, data, expiration_time)
+    if ret is not None:
+      self.local.add(category, resource, data, expiration_time)
+    else:
+      self.local.remove(category, resource, data)
+    return ret
+
+  def update(self, category, resource, data, expiration_time=0):
+    ret = self.remote.update(category, resource, data, expiration_time)
+    if ret is not None:
+      self.local.update(category, resource, data, expiration_time)
+    else:
+      self.local.remove(category, resource, data)
+    return ret
+
+  def remove(self, category, resource, data, lockadd_seconds=0):
+    self.local.remove(category, resource, data)
+    return self.remote.remove(category, resource, data, lockadd_seconds)
+
+  def get_multi(self, data):
+    """ Get values of keys from the local tier, then from the remote one """
+    result = self.local.get_multi(data)
+    missing_keys = [key for key in data if key not in result]
+    if missing_keys:
+      remote_result = self.remote.get_multi(missing_keys) or {}
+      self.local.set_multi(remote_result)
+      result.update(remote_result)
+    return result
+
+  def add_multi(self, data, expiration_time=0):
+    not_added = self.remote.add_multi(data, expiration_time)
+    if not_added is None:
+      not_added = data.keys()
+    not_added = set(not_added)
+    self.local.remove_multi(not_added)
+    self.local.set_multi(
+        {key: value for key, value in data.items() if key not in not_added},
+        expiration_time)
+    return list(not_added)
+
+  def update_multi(self, data, expiration_time=0):
+    self.local.remove_multi(data.keys())
+    return self.remote.update_multi(data, expiration_time)
+
+  def remove_multi(self, data, lockadd_seconds):
+    self.local.remove_multi(data)
+    return self.remote.remove_multi(data, lockadd_seconds)
+
+  def local_get_multi(self, keys):
+    return self.local.get_multi(keys)
+
+  def local_set_multi(self, data):
+    self.local.set_multi(data)
+
+  def clean(self):
+    self.local.clean()
+    return self.remote.clean()
@@ -4,6 +4,7 @@
 """Base objects for csv file converters."""
 
 from collections import defaultdict
+from itertools import chain
 
 from ggrc import settings
 from ggrc.utils import benchmark
@@ -58,6 +59,10 @@ class Converter(object):
     self.dry_run = kwargs.get("dry_run", True)
     self.csv_data = kwargs.get("csv_data", [])
     self.ids_by_type = kwargs.get("ids_by_type", [])
+    # Number of rows committed together on import, all rows of a block are
+    # committed at once if not set.
+    self.batch_size = kwargs.get("batch_size")
+    self.progress_callback = kwargs.get("progress_callback")
     self.block_converters = []
     self.new_objects = defaultdict(structures.CaseInsensitiveDict)
     self.shared_state = {}
@@ -91,6 +96,33 @@ class Converter(object):
       csv_data.extend(block_data)
     return csv_data
 
+  def iter_block_array(self):
+    """Generate csv lines for all exported blocks.
+
+    This is the streaming counterpart of to_array. Objects are loaded and
+    converted in chunks of ids, so memory usage does not grow with the size of
+    the export. Rows are padded to the width of their own block instead of the
+    widest block in the file.
+
+    Yields:
+      list of strings for each line in the csv file.
+    """
+    with benchmark("Create block converters"):
+      self.block_converters_from_ids(load_rows=False)
+    for block_converter in self.block_converters:
+      csv_header, csv_body = block_converter.iter_array()
+      width = max([len(line) for line in csv_header] or [0])
+      two_empty_lines = [[], []]
+      lines = chain(csv_header, csv_body, two_empty_lines)
+      for index, line in enumerate(lines):
+        if index == 0:
+          first_cell = "Object type"
+        elif index == 1:
+          first_cell = block_converter.name
+        else:
+          first_cell = ""
+        yield [first_cell] + line + [""] * (width - len(line))
+
   def import_csv(self):
     self.block_converters_from_csv()
     self.row_converters_from_csv()
@@ -112,10 +144,14 @@ class Converter(object):
     for converter in self.block_converters:
       converter.row_converters_from_csv()
 
-  def block_converters_from_ids(self):
+  def block_converters_from_ids(self, load_rows=True):
     """ fill the block_converters class variable
 
     Generate block converters from a list of tuples with an object name and ids
+
+    Args:
+      load_rows (bool): create row converters for all objects in the block.
+        Streamed exports load rows later in chunks and skip this step.
     """
     object_map = {o.__name__: o for o in self.exportable.values()}
     for object_data in self.ids_by_type:
@@ -131,7 +167,8 @@ class Converter(object):
                                          fields=fields, object_ids=object_ids,
                                          class_name=class_name)
         block_converter.check_block_restrictions()
-        block_converter.row_converters_from_ids()
+        if load_rows:
+          block_converter.row_converters_from_ids()
         self.block_converters.append(block_converter)
 
   def block_converters_from_csv(self):
@@ -170,6 +207,21 @@ class Converter(object):
       self.response_data.append(converter.get_info())
     return self.response_data
 
+  def get_progress(self):
+    """Get number of imported rows and errors found so far."""
+    progress = {"rows": 0, "processed_rows": 0, "errors": 0}
+    for converter in self.block_converters:
+      progress["rows"] += len(converter.rows)
+      progress["processed_rows"] += converter.processed_rows
+      progress["errors"] += (len(converter.block_errors) +
+                             len(converter.row_errors))
+    return progress
+
+  def report_progress(self):
+    """Pass the current import progress to the progress callback."""
+    if self.progress_callback:
+      self.progress_callback(self.get_progress())
+
   def get_object_names(self):
     return [c.name for c in self.block_converters]
 
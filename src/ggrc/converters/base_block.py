@@ -15,6 +15,7 @@ from collections import Counter
 from sqlalchemy import exc
 from sqlalchemy import or_
 from sqlalchemy import and_
+from sqlalchemy import inspect
 from sqlalchemy.orm.exc import UnmappedInstanceError
 
 from ggrc import db
@@ -43,6 +44,13 @@ logger = getLogger(__name__)
 
 CACHE_EXPIRY_IMPORT = 600
 
+# Number of objects loaded at once when streaming an export.
+EXPORT_CHUNK_SIZE = 1000
+
+# Number of imported rows flushed together. Rows of a batch that fails to
+# flush are flushed one by one to find the failing rows.
+IMPORT_FLUSH_BATCH_SIZE = 100
+
 
 class BlockConverter(object):
   # pylint: disable=too-many-public-methods
@@ -111,6 +119,7 @@ class BlockConverter(object):
     self.row_errors = []
     self.row_warnings = []
     self.row_converters = []
+    self.processed_rows = 0
     self.ignore = False
     self._has_non_importable_columns = False
     # For import contains model name from csv file.
@@ -349,6 +358,54 @@ class BlockConverter(object):
     csv_body = self.generate_csv_body()
     return csv_header, csv_body
 
+  def _clear_row_caches(self):
+    """Drop caches that are built from the current row converters."""
+    self._mapping_cache = None
+    self._owners_cache = None
+    self._user_roles_cache = None
+
+  def generate_csv_body_chunks(self, chunk_size=None):
+    """Generate CSV body lines by loading objects in chunks of ids.
+
+    Row converters and all caches that depend on them are rebuilt for each
+    chunk, so only chunk_size objects are held in memory at any time.
+
+    Args:
+      chunk_size (int): number of objects to load with a single query,
+        EXPORT_CHUNK_SIZE by default.
+
+    Yields:
+      list of strings for each exported object.
+    """
+    if self.ignore:
+      return
+    chunk_size = chunk_size or EXPORT_CHUNK_SIZE
+    object_ids = self.object_ids
+    try:
+      for start in range(0, len(object_ids), chunk_size):
+        self._clear_row_caches()
+        self.object_ids = object_ids[start:start + chunk_size]
+        chunk_name = "Export chunk of {} {}".format(
+            len(self.object_ids), self.object_class.__name__)
+        with benchmark(chunk_name):
+          self.row_converters_from_ids()
+          for row_converter in self.row_converters:
+            row_converter.handle_row_data()
+          chunk = self.generate_csv_body()
+        for line in chunk:
+          yield line
+    finally:
+      self.object_ids = object_ids
+      self.row_converters = []
+      self._clear_row_caches()
+
+  def iter_array(self):
+    """Get CSV header and a generator of CSV body lines.
+
+    This is the streaming counterpart of to_array.
+    """
+    return self.generate_csv_header(), self.generate_csv_body_chunks()
+
   def get_header_names(self):
     """ Get all posible user column names for current object """
     header_names = {
@@ -472,68 +529,207 @@ class BlockConverter(object):
 
     return info
 
+  def get_row_batches(self):
+    """Split row converters into batches that are committed together.
+
+    Returns:
+      list of row converter lists. All rows are in a single batch unless the
+      converter has a batch size set.
+    """
+    batch_size = self.converter.batch_size or len(self.row_converters) or 1
+    return [self.row_converters[start:start + batch_size]
+            for start in range(0, len(self.row_converters), batch_size)]
+
   def import_secondary_objects(self, slugs_dict):
     for row_converter in self.row_converters:
       row_converter.setup_secondary_objects(slugs_dict)
 
     if not self.converter.dry_run:
-      for row_converter in self.row_converters:
-        try:
-          row_converter.insert_secondary_objects()
-        except exc.SQLAlchemyError as err:
-          db.session.rollback()
-          logger.exception("Import failed with: %s", err.message)
-          row_converter.add_error(errors.UNKNOWN_ERROR)
-      self.save_import()
-
-  def _import_objects_prepare(self):
+      for row_batch in self.get_row_batches():
+        for row_converter in row_batch:
+          try:
+            row_converter.insert_secondary_objects()
+          except exc.SQLAlchemyError as err:
+            db.session.rollback()
+            logger.exception("Import failed with: %s", err.message)
+            row_converter.add_error(errors.UNKNOWN_ERROR)
+        self.save_import()
+
+  def _import_objects_prepare(self, row_converters):
     """Setup all objects and do pre-commit checks for them."""
-    for row_converter in self.row_converters:
+    for row_converter in row_converters:
       row_converter.setup_object()
 
-    for row_converter in self.row_converters:
+    for row_converter in row_converters:
       self._check_object(row_converter)
 
-    self.clean_session_from_ignored_objs()
+    self.clean_session_from_ignored_objs(row_converters)
 
   def import_objects(self):
     """Add all objects to the database.
 
     This function flushes all objects to the database if the dry_run flag is
     not set and all signals for the imported objects get sent.
+
+    If the converter has a batch size set, rows are set up and committed in
+    batches of that size, so that row locks are released between batches.
+    The converter is notified about the progress after each batch.
     """
     if self.ignore:
       return
 
-    self._import_objects_prepare()
+    if self.converter.dry_run:
+      self._import_objects_prepare(self.row_converters)
+      self.processed_rows = len(self.row_converters)
+      self.converter.report_progress()
+      return
 
-    if not self.converter.dry_run:
-      new_objects = []
-      for row_converter in self.row_converters:
+    for row_batch in self.get_row_batches():
+      self._import_objects_prepare(row_batch)
+      self._import_row_batch(row_batch)
+      self.processed_rows += len(row_batch)
+      self.converter.report_progress()
+
+  def _import_row_batch(self, row_converters):
+    """Flush and commit objects of the given rows."""
+    for row_converter in row_converters:
+      row_converter.send_pre_commit_signals()
+    if self._flush_row_changes(row_converters):
+      for start in range(0, len(row_converters), IMPORT_FLUSH_BATCH_SIZE):
+        flush_batch = row_converters[start:start + IMPORT_FLUSH_BATCH_SIZE]
+        if not self._insert_flush_batch(flush_batch):
+          for row_converter in flush_batch:
+            self._insert_row(row_converter)
+    else:
+      for row_converter in row_converters:
+        self._insert_row(row_converter, setup=True)
+    new_objects = [row_converter.obj for row_converter in row_converters
+                   if row_converter.is_new and not row_converter.ignore]
+    self.send_collection_post_signals(new_objects)
+    import_event = self.save_import()
+    for row_converter in row_converters:
+      row_converter.send_post_commit_signals(event=import_event)
+
+  def _flush_row_changes(self, row_converters):
+    """Flush changes made to objects by setting up the rows.
+
+    If the flush fails, the changes are rolled back so that every row can be
+    set up and inserted again on its own.
+
+    Returns:
+      True if the changes were flushed.
+    """
+    pending = set(db.session.new)
+    db.session.begin_nested()
+    try:
+      db.session.flush()
+    except exc.SQLAlchemyError as err:
+      db.session.rollback()
+      self._discard_rolled_back(row_converters, pending)
+      logger.info("Flushing changes of %s import rows failed, inserting them "
+                  "one by one: %s", len(row_converters), err.message)
+      return False
+    db.session.commit()
+    return True
+
+  @staticmethod
+  def _get_handler_states(row_converters):
+    """Get dry run flags that handlers change when inserting objects."""
+    return [(handler, handler.dry_run)
+            for row_converter in row_converters
+            for handler in row_converter.attrs.values()]
+
+  @staticmethod
+  def _discard_rolled_back(row_converters, pending):
+    """Remove objects discarded by a rollback from row objects.
+
+    Objects created in a rolled back savepoint are expunged from the session,
+    but they are still held by the collections of row objects that are not
+    persistent. Such objects would be added to the session again together
+    with the row objects, so they are removed from the collections.
+
+    Args:
+      row_converters: rows whose objects are inserted again.
+      pending: objects that were added to the session in the savepoint.
+    """
+    row_objects = {id(row_converter.obj) for row_converter in row_converters}
+    discarded = {id(obj) for obj in pending if id(obj) not in row_objects}
+    if not discarded:
+      return
+    for row_converter in row_converters:
+      if row_converter.obj is None:
+        continue
+      state = inspect(row_converter.obj)
+      for relationship in state.mapper.relationships:
+        collection = state.dict.get(relationship.key)
+        if not relationship.uselist or not hasattr(collection, "remove"):
+          continue
+        for obj in list(collection):
+          if id(obj) in discarded:
+            collection.remove(obj)
+
+  def _insert_flush_batch(self, row_converters):
+    """Insert objects of rows and flush them together.
+
+    The batch is inserted in a savepoint. If the flush fails, the savepoint is
+    rolled back together with the handler flags and the objects created for
+    the batch, so that the rows can be inserted again one by one.
+
+    Returns:
+      True if all rows were flushed.
+    """
+    handler_states = self._get_handler_states(row_converters)
+    # Releasing the savepoint runs the before_commit hooks, so full text
+    # records of the batch are written together with its objects.
+    db.session.begin_nested()
+    try:
+      for row_converter in row_converters:
+        row_converter.insert_object()
+      db.session.flush()
+    except exc.SQLAlchemyError as err:
+      pending = set(db.session.new)
+      db.session.rollback()
+      for handler, dry_run in handler_states:
+        handler.dry_run = dry_run
+      self._discard_rolled_back(row_converters, pending)
+      logger.info("Flushing %s import rows failed, inserting them one by "
+                  "one: %s", len(row_converters), err.message)
+      return False
+    db.session.commit()
+    return True
+
+  def _insert_row(self, row_converter, setup=False):
+    """Insert and flush objects of a single row in a savepoint.
+
+    Args:
+      row_converter: row to insert.
+      setup: set up the row object and send its pre commit signals again,
+        because its earlier changes were rolled back.
+    """
+    if row_converter.ignore:
+      return
+    db.session.begin_nested()
+    try:
+      if setup:
+        row_converter.setup_object()
         row_converter.send_pre_commit_signals()
-      for row_converter in self.row_converters:
-        try:
-          row_converter.insert_object()
-          db.session.flush()
-        except exc.SQLAlchemyError as err:
-          db.session.rollback()
-          logger.exception("Import failed with: %s", err.message)
-          row_converter.add_error(errors.UNKNOWN_ERROR)
-        else:
-          if row_converter.is_new and not row_converter.ignore:
-            new_objects.append(row_converter.obj)
-      self.send_collection_post_signals(new_objects)
-      import_event = self.save_import()
-      for row_converter in self.row_converters:
-        row_converter.send_post_commit_signals(event=import_event)
-
-  def clean_session_from_ignored_objs(self):
+      row_converter.insert_object()
+      db.session.flush()
+    except exc.SQLAlchemyError as err:
+      db.session.rollback()
+      logger.exception("Import failed with: %s", err.message)
+      row_converter.add_error(errors.UNKNOWN_ERROR)
+    else:
+      db.session.commit()
+
+  @staticmethod
+  def clean_session_from_ignored_objs(row_converters):
     """Clean DB session from ignored objects.
 
     This function expunges objects from 'db.session' which are in rows that
     marked as 'ignored' before commit.
     """
-    for row_converter in self.row_converters:
+    for row_converter in row_converters:
       obj = row_converter.obj
       try:
         if row_converter.ignore and obj in db.session:
@@ -9,16 +9,17 @@ import functools
 
 import flask
 import sqlalchemy
-from sqlalchemy.orm import load_only
 
 from ggrc import db
 from ggrc import models
 from ggrc.converters import autocast
 from ggrc.converters.exceptions import BadQueryException
+from ggrc.fulltext import typed_properties
 from ggrc.fulltext.mysql import MysqlRecordProperty as Record
 from ggrc.login import is_creator
 from ggrc.models import inflector
 from ggrc.models import relationship_helper
+from ggrc.models.relationship import RelationshipNeighbor
 from ggrc.snapshotter import rules
 from ggrc.utils import query_helpers
 from ggrc_basic_permissions import UserRole
@@ -68,6 +69,10 @@ def build_op_shortcut(predicate):
       return filter_by(lambda x: predicate(x, exp['right']))
     if key in GETATTR_WHITELIST:
       return predicate(getattr(object_class, key, None), exp['right'])
+    typed_filter = typed_properties.get_filter(
+        object_class, key, predicate, exp['right'])
+    if typed_filter is not None:
+      return typed_filter
     return object_class.id.in_(
         db.session.query(Record.key).filter(
             Record.type == object_class.__name__,
@@ -103,6 +108,9 @@ def is_filter(exp, object_class, target_class, query):
         u"Invalid operator near 'is': {}".format(exp['right']))
   left = exp['left'].lower()
   left, _ = target_class.attributes_map().get(left, (left, None))
+  typed_filter = typed_properties.get_empty_filter(object_class, left)
+  if typed_filter is not None:
+    return typed_filter
   subquery = db.session.query(Record.key).filter(
       Record.type == object_class.__name__,
       Record.property == left,
@@ -283,32 +291,18 @@ def relevant(exp, object_class, target_class, query):
             ids,
         )
     )
-  snapshot_qs = models.Snapshot.query.filter(
+  snapshot_ids = db.session.query(models.Snapshot.id).filter(
       models.Snapshot.parent_type == models.Audit.__name__,
       models.Snapshot.child_type == object_name,
       models.Snapshot.child_id.in_(ids),
-  ).options(
-      load_only(models.Snapshot.id),
-  ).distinct(
-  ).subquery(
-      "snapshot"
   )
-  dest_qs = models.Relationship.query.filter(
-      models.Relationship.destination_id == snapshot_qs.c.id,
-      models.Relationship.destination_type == models.Snapshot.__name__,
-      models.Relationship.source_type == object_class.__name__,
-  ).options(
-      load_only("source_id")
-  ).distinct()
-  source_qs = models.Relationship.query.filter(
-      models.Relationship.source_id == snapshot_qs.c.id,
-      models.Relationship.source_type == models.Snapshot.__name__,
-      models.Relationship.destination_type == object_class.__name__,
-  ).options(
-      load_only("destination_id")
-  ).distinct()
-  ids_qs = dest_qs.union(source_qs).distinct().subquery("ids")
-  return object_class.id == ids_qs.c.relationships_source_id
+  neighbor = RelationshipNeighbor
+  ids_qs = db.session.query(neighbor.related_id).filter(
+      neighbor.object_type == models.Snapshot.__name__,
+      neighbor.object_id.in_(snapshot_ids),
+      neighbor.related_type == object_class.__name__,
+  )
+  return object_class.id.in_(ids_qs)
 
 
 def build_expression(exp, object_class, target_class, query):
@@ -467,7 +467,6 @@ class MappingColumnHandler(ColumnHandler):
         db.session.add(mapping)
       elif self.unmap and mapping:
         db.session.delete(mapping)
-    db.session.flush()
     # it is safe to reuse this automapper since no other objects will be
     # created while creating automappings and cache reuse yields significant
     # performance boost
@@ -695,7 +694,6 @@ class ObjectPersonColumnHandler(UserColumnHandler):
           context=self.row_converter.obj.context
       )
       db.session.add(object_person)
-      db.session.flush()
     self.dry_run = True
 
 
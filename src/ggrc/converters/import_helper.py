@@ -9,6 +9,10 @@ from ggrc.converters.column_handlers import model_column_handlers
 from ggrc.converters.handlers import handlers
 
 
+# Minimal size in bytes of a single part of a streamed csv file.
+CSV_STREAM_BUFFER_SIZE = 64 * 1024
+
+
 def get_object_column_definitions(object_class):
   """Attach additional info to attribute definitions.
 
@@ -68,6 +72,27 @@ def generate_csv_string(csv_data):
   return body
 
 
+def generate_csv_chunks(csv_lines, buffer_size=CSV_STREAM_BUFFER_SIZE):
+  """Generate parts of a csv file from an iterable of string lists.
+
+  Lines are encoded and written as they are consumed and the output is
+  yielded whenever at least buffer_size bytes have been collected. Unlike
+  generate_csv_string, rows are not padded to the same length.
+  """
+  output_buffer = StringIO()
+  writer = csv.writer(output_buffer)
+  for line in csv_lines:
+    writer.writerow([val.encode("utf-8") for val in line])
+    if output_buffer.tell() >= buffer_size:
+      yield output_buffer.getvalue()
+      output_buffer.seek(0)
+      output_buffer.truncate()
+  body = output_buffer.getvalue()
+  output_buffer.close()
+  if body:
+    yield body
+
+
 def extract_relevant_data(csv_data):
   """ Split csv data into data and metadata """
   striped_data = [[unicode.strip(c) for c in line]
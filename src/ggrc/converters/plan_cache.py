@@ -0,0 +1,348 @@
+# Copyright (C) 2017 Google Inc.
+# Licensed under http://www.apache.org/licenses/LICENSE-2.0 <see LICENSE file>
+
+"""Cache of filters built from /query API expression trees.
+
+Tree views send the same filter expressions over and over, with only ids and
+values changing. The plan cache stores the filter built for each expression
+shape - the operators, attribute names and object types of the expression -
+together with the bind parameters that hold its values. A cached filter is
+reused by binding the values of the current expression instead of building
+the filter again.
+
+Expressions are autocast before their shape is computed, because autocasting
+can change the structure of an expression depending on its values. The types
+of all values are part of the shape, and so is the decision whether each
+compared property is a custom attribute stored in the typed value tables,
+which depends on the custom attribute definitions in the database. Only
+operators that build the filter from the expression alone are cached.
+Operators that run queries while building the filter (owned, similar,
+related_people and relevant filters on previous results) are always built
+from scratch.
+
+A new plan is checked by binding the current values and comparing the
+compiled filter with the filter built from the original expression. Shapes
+whose filter does not depend on the values in a way the plan can reproduce
+are remembered as uncacheable.
+"""
+
+import collections
+import copy
+import threading
+
+from sqlalchemy.sql.elements import BindParameter
+from sqlalchemy.sql.visitors import iterate
+from sqlalchemy.sql.visitors import replacement_traverse
+
+from ggrc import db
+from ggrc import settings
+from ggrc.converters import autocast
+from ggrc.converters import custom_operators
+from ggrc.converters.exceptions import BadQueryException
+from ggrc.fulltext import typed_properties
+
+
+CACHEABLE_OPERATORS = {
+    "AND", "OR", "=", "!=", "~", "!~", "<", ">", "<=", ">=", "is",
+    "relevant", "text_search",
+}
+
+# Keys of expression nodes that do not affect the built filter.
+IGNORED_KEYS = {"slugs"}
+
+# Keys of expression nodes whose values are part of the shape.
+STRUCTURAL_KEYS = {"op", "object_name", "is_autocasted"}
+
+# Operators that filter properties without a getattr or attributes_map
+# filter through the typed value tables or full text records.
+STORED_VALUE_OPERATORS = {"=", "!=", "~", "!~", "<", ">", "<=", ">=", "is"}
+
+# Sentinel integers are far below any object id and have the same number of
+# digits, so that the text of one sentinel never contains another.
+INT_SENTINEL_BASE = -10 ** 15
+
+UNCACHEABLE = object()
+
+
+def _get_operator(exp):
+  """Get the operator name of an expression node."""
+  return exp.get("op", {}).get("name")
+
+
+def is_cacheable(exp):
+  """Check if the filter of an expression can be cached."""
+  if not isinstance(exp, dict):
+    return True
+  operator = _get_operator(exp)
+  if operator not in CACHEABLE_OPERATORS:
+    return False
+  if operator == "relevant" and exp.get("object_name") == "__previous__":
+    return False
+  return is_cacheable(exp.get("left")) and is_cacheable(exp.get("right"))
+
+
+def get_stored_value_keys(exp, target_class):
+  """Get properties of an expression filtered through stored values.
+
+  Filters of these properties depend on whether they are indexed in the
+  typed value tables, see custom_operators.build_op_shortcut.
+  """
+  if not isinstance(exp, dict):
+    return set()
+  operator = _get_operator(exp)
+  if operator in ("AND", "OR"):
+    return (get_stored_value_keys(exp.get("left"), target_class) |
+            get_stored_value_keys(exp.get("right"), target_class))
+  left = exp.get("left")
+  if operator not in STORED_VALUE_OPERATORS or \
+          not isinstance(left, basestring):
+    return set()
+  key = left.lower()
+  key, filter_by = target_class.attributes_map().get(key, (key, None))
+  if operator != "is" and (
+          callable(filter_by) or key in custom_operators.GETATTR_WHITELIST):
+    return set()
+  return {key}
+
+
+def autocast_expression(exp, target_class):
+  """Autocast all nodes of an expression the way build_expression does."""
+  if not isinstance(exp, dict) or not exp:
+    return exp
+  if autocast.is_autocast_required_for(exp):
+    exp = custom_operators.validate("left", "right")(autocast.autocast)(
+        exp, target_class)
+    if not exp:
+      raise BadQueryException("Invalid filter data")
+  if _get_operator(exp) in ("AND", "OR"):
+    exp["left"] = autocast_expression(exp.get("left"), target_class)
+    exp["right"] = autocast_expression(exp.get("right"), target_class)
+  return exp
+
+
+class Parameters(object):
+  """Values of an expression replaced with sentinels in its template."""
+
+  def __init__(self):
+    self.values = []
+    self.sentinels = []
+
+  def add(self, value):
+    """Store a value and get the sentinel that replaces it."""
+    index = len(self.values)
+    if isinstance(value, basestring):
+      sentinel = u"\x00qp{}\x00".format(index)
+    else:
+      sentinel = INT_SENTINEL_BASE - index
+    self.values.append(value)
+    self.sentinels.append(sentinel)
+    return sentinel
+
+  @staticmethod
+  def is_parameter(value):
+    """Check if a value can be replaced with a sentinel."""
+    if isinstance(value, bool) or not value:
+      return False
+    return isinstance(value, (basestring, int, long))
+
+
+def parameterize(exp, params):
+  """Get the shape and the template of an expression.
+
+  Args:
+    exp: autocast expression.
+    params: Parameters collecting values replaced in the template.
+
+  Returns:
+    hashable shape of the expression and a copy of the expression with all
+    values replaced by sentinels.
+  """
+  if not isinstance(exp, dict):
+    if Parameters.is_parameter(exp):
+      return type(exp).__name__, params.add(exp)
+    return repr(exp), exp
+  shape = []
+  template = {}
+  operator = _get_operator(exp)
+  for key in sorted(exp):
+    value = exp[key]
+    if key in IGNORED_KEYS:
+      continue
+    if key in STRUCTURAL_KEYS or key == "left" and not isinstance(value, dict):
+      value_shape, template[key] = repr(value), value
+    elif key == "right" and operator == "is":
+      value_shape, template[key] = repr(value), value
+    elif key == "ids" and isinstance(value, list):
+      template[key] = [params.add(id_) if Parameters.is_parameter(id_)
+                       else id_ for id_ in value]
+      value_shape = ("ids", tuple(
+          type(id_).__name__ if Parameters.is_parameter(id_) else id_
+          for id_ in value))
+    else:
+      value_shape, template[key] = parameterize(value, params)
+    shape.append((key, value_shape))
+  return tuple(shape), template
+
+
+class Plan(object):
+  """Filter template with the bind parameters holding expression values."""
+
+  def __init__(self, template, sentinels):
+    self.template = template
+    self.bindings = {}
+    texts = [(index, unicode(sentinel))
+             for index, sentinel in enumerate(sentinels)]
+    used = set()
+    for element in iterate(template, {}):
+      if not isinstance(element, BindParameter):
+        continue
+      value = element.value
+      for index, sentinel in enumerate(sentinels):
+        if type(value) is type(sentinel) and value == sentinel:
+          self.bindings[element.key] = (index, None)
+          used.add(index)
+          break
+      else:
+        if isinstance(value, basestring):
+          parts = [(index, text) for index, text in texts if text in value]
+          if parts:
+            self.bindings[element.key] = (None, (value, parts))
+            used.update(index for index, _ in parts)
+    self.complete = len(used) == len(sentinels)
+
+  def bind(self, values):
+    """Get a copy of the template filter with the given values."""
+    def replace(element):
+      """Replace bind parameters holding expression values."""
+      if not isinstance(element, BindParameter):
+        return None
+      binding = self.bindings.get(element.key)
+      if binding is None:
+        return None
+      index, text = binding
+      if index is not None:
+        value = values[index]
+      else:
+        value, parts = text
+        for part_index, sentinel in parts:
+          value = value.replace(sentinel, unicode(values[part_index]))
+      return element._with_value(value)  # pylint: disable=protected-access
+    return replacement_traverse(self.template, {}, replace)
+
+
+def _compile(clause):
+  """Compile a filter to SQL text and parameters for comparison."""
+  compiled = clause.compile(dialect=db.engine.dialect)
+  return unicode(compiled), compiled.params
+
+
+class PlanCache(object):
+  """LRU cache of filter plans keyed by expression shape."""
+
+  def __init__(self, size):
+    self.size = size
+    self.plans = collections.OrderedDict()
+    self.lock = threading.Lock()
+    self.hits = 0
+    self.misses = 0
+    self.bypassed = 0
+
+  def get_stats(self):
+    """Get hit and miss counters of the cache."""
+    with self.lock:
+      return {
+          "hits": self.hits,
+          "misses": self.misses,
+          "bypassed": self.bypassed,
+          "size": len(self.plans),
+      }
+
+  def clear(self):
+    """Remove all plans and reset the counters."""
+    with self.lock:
+      self.plans.clear()
+      self.hits = self.misses = self.bypassed = 0
+
+  def _get(self, key):
+    """Get a plan and count the lookup."""
+    with self.lock:
+      plan = self.plans.pop(key, None)
+      if plan is None:
+        self.misses += 1
+        return None
+      self.plans[key] = plan
+      if plan is UNCACHEABLE:
+        self.bypassed += 1
+      else:
+        self.hits += 1
+      return plan
+
+  def _set(self, key, plan):
+    """Store a plan, evicting the least recently used one if needed."""
+    with self.lock:
+      self.plans.pop(key, None)
+      self.plans[key] = plan
+      while len(self.plans) > self.size:
+        self.plans.popitem(last=False)
+
+  def build_expression(self, exp, object_class, target_class, query):
+    """Get the filter of an expression, reusing a cached plan if possible.
+
+    Takes the same arguments as custom_operators.build_expression.
+    """
+    if not self.size or not exp or not is_cacheable(exp):
+      with self.lock:
+        self.bypassed += 1
+      return custom_operators.build_expression(
+          exp, object_class, target_class, query)
+
+    exp = autocast_expression(copy.deepcopy(exp), target_class)
+    params = Parameters()
+    shape, template_exp = parameterize(exp, params)
+    indexed = tuple(sorted(
+        (key, typed_properties.is_indexed(object_class, key))
+        for key in get_stored_value_keys(exp, target_class)))
+    key = (object_class.__name__, target_class.__name__, shape, indexed)
+
+    plan = self._get(key)
+    if plan is UNCACHEABLE:
+      return custom_operators.build_expression(
+          exp, object_class, target_class, query)
+    if plan is not None:
+      return plan.bind(params.values)
+
+    clause = custom_operators.build_expression(
+        exp, object_class, target_class, query)
+    self._set(key, self._get_plan(template_exp, params, clause,
+                                  object_class, target_class, query))
+    return clause
+
+  @staticmethod
+  def _get_plan(template_exp, params, clause, object_class, target_class,
+                query):
+    """Build a plan and check that it reproduces the given filter."""
+    # pylint: disable=too-many-arguments
+    try:
+      template = custom_operators.build_expression(
+          template_exp, object_class, target_class, query)
+    except Exception:  # pylint: disable=broad-except
+      # Sentinels can be rejected by operators that validate values.
+      return UNCACHEABLE
+    plan = Plan(template, params.sentinels)
+    if (not plan.complete or
+            _compile(plan.bind(params.values)) != _compile(clause)):
+      return UNCACHEABLE
+    return plan
+
+
+PLAN_CACHE = PlanCache(settings.QUERY_PLAN_CACHE_SIZE)
+
+
+def build_expression(exp, object_class, target_class, query):
+  """Get the filter of an expression using the global plan cache."""
+  return PLAN_CACHE.build_expression(exp, object_class, target_class, query)
+
+
+def get_stats():
+  """Get hit and miss counters of the global plan cache."""
+  return PLAN_CACHE.get_stats()
@@ -6,20 +6,89 @@
 # flake8: noqa
 import collections
 import datetime
+import hashlib
+import threading
+import time
 
 import flask
 import sqlalchemy as sa
 
 from ggrc import db
 from ggrc import models
+from ggrc import settings
 from ggrc.fulltext.mysql import MysqlRecordProperty as Record
+from ggrc.login import get_current_user_id
 from ggrc.models import inflector
 from ggrc.rbac import context_query_filter
+from ggrc.rbac import permitted_objects
 from ggrc.utils import query_helpers, benchmark
 from ggrc.converters import custom_operators
+from ggrc.converters import plan_cache
 from ggrc.converters.exceptions import BadQueryException
 
 
+class TotalCache(object):
+  """Short lived cache of total counts of filter queries.
+
+  Totals are kept for QUERY_TOTAL_CACHE_TTL seconds, so that paging through a
+  result set does not count the filtered objects for every page. Any flush in
+  this process clears the cache; changes made by other processes show up once
+  the totals expire.
+  """
+
+  MAX_SIZE = 1000
+
+  def __init__(self, ttl):
+    self.ttl = ttl
+    self.totals = {}
+    self.lock = threading.Lock()
+
+  @staticmethod
+  def get_key(query):
+    """Get cache key of the total count of a query for the current user."""
+    compiled = query.statement.compile(dialect=db.engine.dialect)
+    return hashlib.sha1(repr((
+        unicode(compiled),
+        sorted(compiled.params.items()),
+        get_current_user_id(),
+    ))).hexdigest()
+
+  def get(self, key):
+    """Get a cached total or None if it is missing or expired."""
+    with self.lock:
+      expires_at, total = self.totals.get(key, (0, None))
+      if expires_at < time.time():
+        return None
+      return total
+
+  def set(self, key, total):
+    """Store a total, dropping expired totals if the cache is full."""
+    if not self.ttl:
+      return
+    now = time.time()
+    with self.lock:
+      if len(self.totals) >= self.MAX_SIZE:
+        self.totals = {k: v for k, v in self.totals.iteritems() if v[0] > now}
+        if len(self.totals) >= self.MAX_SIZE:
+          self.totals.clear()
+      self.totals[key] = (now + self.ttl, total)
+
+  def clear(self):
+    """Remove all cached totals."""
+    with self.lock:
+      self.totals.clear()
+
+
+TOTAL_CACHE = TotalCache(settings.QUERY_TOTAL_CACHE_TTL)
+
+
+@sa.event.listens_for(db.session.__class__, "after_flush")
+def clear_total_cache(session, flush_context):
+  """Drop cached totals that might have changed with the flushed objects."""
+  # pylint: disable=unused-argument
+  TOTAL_CACHE.clear()
+
+
 # pylint: disable=too-few-public-methods
 
 class QueryHelper(object):
@@ -41,6 +110,8 @@ class QueryHelper(object):
         }
       ]
       limit: [from, to] - limit the result list to a slice result[from, to]
+      after: optional id of the last object of the previous page, reads the
+             page with keyset paging; can not be combined with order_by
       filters: {
         relevant_filters:
           these filters will return all ids of the "search class name" object
@@ -220,7 +291,10 @@ class QueryHelper(object):
     )
 
     if contexts is not None:
-      if resources:
+      if permission_type == "read":
+        resource_sql = permitted_objects.get_resource_filter(
+            model.__name__, model.id, resources)
+      elif resources:
         resource_sql = model.id.in_(resources)
       else:
         resource_sql = sa.sql.false()
@@ -272,7 +346,7 @@ class QueryHelper(object):
       if type_query is not None:
         query = query.filter(type_query)
     with benchmark("Parse filter query: _get_ids > _build_expression"):
-      filter_expression = custom_operators.build_expression(
+      filter_expression = plan_cache.build_expression(
           expression,
           object_class,
           tgt_class,
@@ -290,8 +364,9 @@ class QueryHelper(object):
         )
     with benchmark("Apply limit"):
       limit = object_query.get("limit")
+      after = self._get_after_id(object_query)
       if limit:
-        ids, total = self._apply_limit(query, limit)
+        ids, total = self._apply_limit(query, limit, object_class.id, after)
       else:
         ids = [obj.id for obj in query]
         total = len(ids)
@@ -305,13 +380,36 @@ class QueryHelper(object):
     return ids
 
   @staticmethod
-  def _apply_limit(query, limit):
+  def _get_after_id(object_query):
+    """Get the id after which a keyset paged query starts."""
+    after = object_query.get("after")
+    if after is None:
+      return None
+    if object_query.get("order_by"):
+      raise BadQueryException("`after` can not be combined with `order_by`.")
+    if not object_query.get("limit"):
+      raise BadQueryException("`after` requires `limit`.")
+    try:
+      return int(after)
+    except (ValueError, TypeError):
+      raise BadQueryException("Invalid after operator. Integer expected.")
+
+  @staticmethod
+  def _apply_limit(query, limit, id_column=None, after=None):
     """Apply limits for pagination.
 
+    The page and the total count are read with a single execution of the
+    filter query. Totals are cached for a short time, so that paging through
+    the same result set does not count the filtered objects again.
+
     Args:
       query: filter query;
       limit: a tuple of indexes in format (from, to); objects is sliced to
             objects[from, to].
+      id_column: id column of the filtered objects.
+      after: id of the last object of the previous page. If set, the page
+            is read ordered by id with `id > after` instead of OFFSET and
+            `from` is ignored.
 
     Returns:
       matched objects ids and total count.
@@ -328,18 +426,36 @@ class QueryHelper(object):
       raise BadQueryException("Limit start should be smaller than end.")
     else:
       page_size = last - first
+      # Ordering and paging don't change the total, so all pages of a result
+      # set share the cached total.
+      unpaged = query.order_by(None)
+      total_key = TOTAL_CACHE.get_key(unpaged)
+      total = TOTAL_CACHE.get(total_key)
+      # Note: limit request syntax is limit:[0,10]. We are counting
+      # offset from 0 as the offset of the initial row for sql is 0 (not 1).
+      if after is not None:
+        page_query = query.filter(id_column > after).order_by(
+            id_column).limit(page_size)
+      else:
+        page_query = query.limit(page_size).offset(first)
+      # FOUND_ROWS only counts the unpaged query for OFFSET pages.
+      found_rows = (total is None and after is None and
+                    db.engine.dialect.name == "mysql")
+      if found_rows:
+        page_query = page_query.prefix_with("SQL_CALC_FOUND_ROWS")
       with benchmark("Apply limit: _apply_limit > query_limit"):
-        # Note: limit request syntax is limit:[0,10]. We are counting
-        # offset from 0 as the offset of the initial row for sql is 0 (not 1).
-        ids = [obj.id for obj in query.limit(page_size).offset(first)]
+        ids = [obj.id for obj in page_query]
       with benchmark("Apply limit: _apply_limit > query_count"):
-        if len(ids) < page_size:
+        if after is None and len(ids) < page_size:
           total = len(ids) + first
-        else:
+        elif found_rows:
+          total = db.session.execute("SELECT FOUND_ROWS()").scalar()
+        elif total is None:
           # Note: using func.count() as query.count() is generating additional
           # subquery
-          count_q = query.statement.with_only_columns([sa.func.count()])
+          count_q = unpaged.statement.with_only_columns([sa.func.count()])
           total = db.session.execute(count_q).scalar()
+      TOTAL_CACHE.set(total_key, total)
 
     return ids, total
 
@@ -306,3 +306,12 @@ class SnapshotBlockConverter(object):
   def to_array(self):
     """Get 2D list representing the CSV file."""
     return self._header_list, self._body_list
+
+  def iter_array(self):
+    """Get CSV header and an iterator over CSV body lines.
+
+    The snapshot header contains custom attributes from all snapshot
+    revisions, so the whole block has to be loaded before the first line can
+    be generated.
+    """
+    return self._header_list, iter(self._body_list)
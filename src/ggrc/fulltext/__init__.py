@@ -42,6 +42,10 @@ class Indexer(object):
   def delete_record(self, key):
     raise NotImplementedError()
 
+  def records_updated(self, type_name, keys):
+    """Notify the indexer about changed records of objects of one type."""
+    pass
+
   def search(self, terms):
     raise NotImplementedError()
 
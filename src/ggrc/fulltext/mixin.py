@@ -5,7 +5,10 @@
 import itertools
 from collections import namedtuple
 
+from sqlalchemy import bindparam
 from sqlalchemy import inspect, orm
+from sqlalchemy.sql.expression import select
+from sqlalchemy.sql.expression import tuple_
 
 from ggrc import db
 
@@ -25,6 +28,9 @@ class Indexed(object):
 
   PROPERTY_TEMPLATE = u"{}"
 
+  # Full text record columns that are compared on incremental index updates.
+  UPDATED_COLUMNS = ("content", "context_id", "tags")
+
   def delete_record(self):
     fulltext.get_indexer().delete_record(
         self.id,
@@ -47,39 +53,101 @@ class Indexed(object):
     return (self.__class__.__name__, self.id)
 
   @classmethod
-  def get_insert_query_for(cls, ids):
-    """Return insert class record query. It will return None, if it's empty."""
-    if not ids:
-      return
+  def get_record_values_for(cls, ids):
+    """Return a list of full text record values for objects with given ids."""
     instances = cls.indexed_query().filter(cls.id.in_(ids))
     indexer = fulltext.get_indexer()
     keys = inspect(indexer.record_type).c
     records = (indexer.fts_record_for(i) for i in instances)
     rows = itertools.chain(*[indexer.records_generator(i) for i in records])
-    values = [{c.name: getattr(r, a) for a, c in keys.items()} for r in rows]
-    if values:
-      return indexer.record_type.__table__.insert().values(values)
+    return [{c.name: getattr(r, a) for a, c in keys.items()} for r in rows]
 
   @classmethod
-  def get_delete_query_for(cls, ids):
-    """Return delete class record query. If ids are empty, will return None."""
-    if not ids:
-      return
-    indexer = fulltext.get_indexer()
-    return indexer.record_type.__table__.delete().where(
-        indexer.record_type.type == cls.__name__
-    ).where(
-        indexer.record_type.key.in_(ids)
+  def _get_stored_records_for(cls, ids):
+    """Return stored full text records for objects with given ids."""
+    table = fulltext.get_indexer().record_type.__table__
+    return db.session.execute(
+        select([
+            table.c.key,
+            table.c.property,
+            table.c.subproperty,
+            table.c.content,
+            table.c.context_id,
+            table.c.tags,
+        ]).where(
+            table.c.type == cls.__name__
+        ).where(
+            table.c.key.in_(ids)
+        )
     )
 
+  @classmethod
+  def get_record_changes_for(cls, ids):
+    """Compare new full text records with the stored ones.
+
+    Records are identified by object key, property and subproperty. Stored
+    records that are equal to the new ones are left out of the result.
+
+    Returns:
+      tuple of lists with record values to insert, record values to update and
+      (key, property, subproperty) tuples of records to delete.
+    """
+    new_records = {
+        (values["key"], values["property"], values["subproperty"]): values
+        for values in cls.get_record_values_for(ids)
+    }
+    updates = []
+    deletes = []
+    for row in cls._get_stored_records_for(ids):
+      record_id = (row["key"], row["property"], row["subproperty"])
+      values = new_records.pop(record_id, None)
+      if values is None:
+        deletes.append(record_id)
+      elif any(row[name] != values[name] for name in cls.UPDATED_COLUMNS):
+        updates.append(values)
+    return new_records.values(), updates, deletes
+
   @classmethod
   def bulk_record_update_for(cls, ids):
-    """Bulky update index records for current class"""
-    delete_query = cls.get_delete_query_for(ids)
-    insert_query = cls.get_insert_query_for(ids)
-    for query in [delete_query, insert_query]:
-      if query is not None:
-        db.session.execute(query)
+    """Bulky update index records for current class
+
+    Only records that have actually changed are written. Each property and
+    subproperty of an object is a separate record, so a change of a single
+    attribute results in a single UPDATE instead of deleting and inserting all
+    records of the object.
+    """
+    if not ids:
+      return
+    inserts, updates, deletes = cls.get_record_changes_for(ids)
+    indexer = fulltext.get_indexer()
+    table = indexer.record_type.__table__
+    if deletes:
+      db.session.execute(table.delete().where(
+          table.c.type == cls.__name__
+      ).where(
+          tuple_(table.c.key, table.c.property, table.c.subproperty).in_(
+              deletes)
+      ))
+    if updates:
+      db.session.execute(
+          table.update().where(
+              table.c.type == bindparam("_type")
+          ).where(
+              table.c.key == bindparam("_key")
+          ).where(
+              table.c.property == bindparam("_property")
+          ).where(
+              table.c.subproperty == bindparam("_subproperty")
+          ).values({
+              name: bindparam("_" + name) for name in cls.UPDATED_COLUMNS
+          }),
+          [{"_" + name: value for name, value in values.items()}
+           for values in updates],
+      )
+    if inserts:
+      db.session.execute(table.insert().values(inserts))
+    if inserts or updates or deletes:
+      indexer.records_updated(cls.__name__, ids)
 
   @classmethod
   def indexed_query(cls):
@@ -17,14 +17,23 @@ from sqlalchemy.sql.expression import select
 from sqlalchemy import event
 
 from ggrc import db
+from ggrc.extensions import get_extension_instance
+from ggrc.fulltext import get_indexer
 from ggrc.login import is_creator
 from ggrc.models import all_models
 from ggrc.models.inflector import get_model
 from ggrc.utils import query_helpers
 from ggrc.rbac import context_query_filter
+from ggrc.rbac import permitted_objects
+from ggrc.fulltext import typed_properties
 from ggrc.fulltext.sql import SqlIndexer
 
 
+# Properties matched by global search.
+SEARCHED_PROPERTIES = [
+    'title', 'name', 'email', 'notes', 'description', 'slug']
+
+
 class MysqlRecordProperty(db.Model):
   """ Db model for collect fulltext index records"""
   __tablename__ = 'fulltext_record_properties'
@@ -50,16 +59,44 @@ class MysqlRecordProperty(db.Model):
 class MysqlIndexer(SqlIndexer):
   record_type = MysqlRecordProperty
 
-  @staticmethod
-  def _get_filter_query(terms):
+  @property
+  def search_backend(self):
+    """Get the configured search backend, see ggrc.fulltext.search_backends.
+    """
+    return get_extension_instance(
+        'FULLTEXT_SEARCH_BACKEND',
+        'ggrc.fulltext.search_backends.LikeSearchBackend')
+
+  def records_updated(self, type_name, keys):
+    typed_properties.refresh(type_name, keys)
+    self.search_backend.records_updated(type_name, keys)
+
+  def create_record(self, record, commit=True):
+    typed_properties.add_pending(record.type, record.key)
+    super(MysqlIndexer, self).create_record(record, commit=commit)
+
+  def delete_record(self, key, type, commit=True):
+    # pylint: disable=redefined-builtin
+    typed_properties.add_pending(type, key)
+    super(MysqlIndexer, self).delete_record(key, type, commit=commit)
+
+  def delete_all_records(self, commit=True):
+    typed_properties.delete_all()
+    super(MysqlIndexer, self).delete_all_records(commit=commit)
+
+  def delete_records_by_type(self, type, commit=True):
+    # pylint: disable=redefined-builtin
+    typed_properties.delete_all(type)
+    super(MysqlIndexer, self).delete_records_by_type(type, commit=commit)
+
+  def _get_filter_query(self, terms):
     """Get the whitelist of fields to filter in full text table."""
-    whitelist = MysqlRecordProperty.property.in_(
-        ['title', 'name', 'email', 'notes', 'description', 'slug'])
+    whitelist = MysqlRecordProperty.property.in_(SEARCHED_PROPERTIES)
 
     if not terms:
       return whitelist
     elif terms:
-      return and_(whitelist, MysqlRecordProperty.content.contains(terms))
+      return and_(whitelist, self.search_backend.get_filter(terms))
 
   @staticmethod
   def get_permissions_query(model_names, permission_type='read',
@@ -75,7 +112,12 @@ class MysqlIndexer(SqlIndexer):
           permission_model=permission_model
       )
       if contexts is not None:
-        if resources:
+        if resources and permission_type == 'read' and not permission_model:
+          resource_sql = and_(
+              MysqlRecordProperty.type == model_name,
+              permitted_objects.get_resource_filter(
+                  model_name, MysqlRecordProperty.key, resources))
+        elif resources:
           resource_sql = and_(
               MysqlRecordProperty.type == model_name,
               MysqlRecordProperty.key.in_(resources))
@@ -116,22 +158,32 @@ class MysqlIndexer(SqlIndexer):
             union_query.c.type == MysqlRecordProperty.type),
     )
 
-  def _add_extra_params_query(self, query, type_name, extra_param):
-    """Prepare the query for handling extra params."""
+  def _get_extra_params_filter(self, type_name, extra_param):
+    """Get filter for records of objects matching extra params.
+
+    Returns None if there are no extra params or no model named type_name.
+    """
     if not extra_param:
-      return query
+      return None
 
     models = [m for m in all_models.all_models if m.__name__ == type_name]
 
     if len(models) == 0:
-      return query
+      return None
     model_klass = models[0]
 
-    return query.filter(self.record_type.key.in_(
+    return self.record_type.key.in_(
         db.session.query(
             model_klass.id.label('id')
         ).filter_by(**extra_param)
-    ))
+    )
+
+  def _add_extra_params_query(self, query, type_name, extra_param):
+    """Prepare the query for handling extra params."""
+    extra_filter = self._get_extra_params_filter(type_name, extra_param)
+    if extra_filter is None:
+      return query
+    return query.filter(extra_filter)
 
   @staticmethod
   def _get_grouped_types(types=None, extra_params=None):
@@ -192,38 +244,57 @@ class MysqlIndexer(SqlIndexer):
   def counts(self, terms, types=None, contact_id=None,
              extra_params=None, extra_columns=None):
     """Prepare the search query, but return only count for each of
-     the requested objects."""
+     the requested objects.
+
+    All counts are computed by a single grouped query with a conditional
+    count for each requested column, so the permission and search filters
+    are evaluated once regardless of the number of extra columns.
+
+    Returns:
+      list of (type, count, column) tuples for non zero counts, where column
+      is an empty string for the plain count of a type and the extra column
+      name otherwise.
+    """
     extra_params = extra_params or {}
     extra_columns = extra_columns or {}
     model_names = self._get_grouped_types(types, extra_params)
-    query = db.session.query(
-        self.record_type.type, func.count(distinct(
-            self.record_type.key)), literal(""))
-    query = query.filter(self.get_permissions_query(model_names))
-    query = query.filter(self._get_filter_query(terms))
-    query = self.search_get_owner_query(query, types, contact_id)
-    query = query.group_by(self.record_type.type)
     all_extra_columns = dict(extra_columns.items() +
                              [(p, p) for p in extra_params
                               if p not in extra_columns])
-    if not all_extra_columns:
-      return query.all()
 
-    # Add extra_params and extra_colums:
+    column_filters = []
+    if model_names:
+      column_filters.append(("", self.record_type.type.in_(model_names)))
     for key, value in all_extra_columns.iteritems():
-      extra_q = db.session.query(self.record_type.type,
-                                 func.count(distinct(self.record_type.key)),
-                                 literal(key))
-      extra_q = extra_q.filter(self.get_permissions_query([value]))
-      extra_q = extra_q.filter(self._get_filter_query(terms))
-      extra_q = self.search_get_owner_query(extra_q, [value], contact_id)
-      extra_q = self._add_extra_params_query(extra_q,
-                                             value,
-                                             extra_params.get(key, None))
-      extra_q = extra_q.group_by(self.record_type.type)
-      query = query.union(extra_q)
-    return query.all()
+      column_filter = self.record_type.type == value
+      extra_filter = self._get_extra_params_filter(
+          value, extra_params.get(key, None))
+      if extra_filter is not None:
+        column_filter = and_(column_filter, extra_filter)
+      column_filters.append((key, column_filter))
+    if not column_filters:
+      return []
+
+    counted_types = sorted(set(model_names) | set(all_extra_columns.values()))
+    owner_types = None
+    if types is not None:
+      owner_types = sorted(set(types) | set(all_extra_columns.values()))
+
+    query = db.session.query(self.record_type.type, *[
+        func.count(distinct(case([(column_filter, self.record_type.key)])))
+        for _, column_filter in column_filters
+    ])
+    query = query.filter(self.get_permissions_query(counted_types))
+    query = query.filter(self._get_filter_query(terms))
+    query = self.search_get_owner_query(query, owner_types, contact_id)
+    query = query.group_by(self.record_type.type)
 
+    results = []
+    for row in query:
+      for (key, _), count in zip(column_filters, row[1:]):
+        if count:
+          results.append((row[0], count, key))
+    return results
 
 Indexer = MysqlIndexer
 
@@ -244,6 +315,10 @@ def update_indexer(session):  # pylint:disable=unused-argument
   db.session.reindex_set = set()
   for model_name, ids in models_ids_to_reindex.iteritems():
     get_model(model_name).bulk_record_update_for(ids)
+  # Records written with create_record and delete_record
+  indexer = get_indexer()
+  for type_name, keys in typed_properties.pop_pending().iteritems():
+    indexer.records_updated(type_name, keys)
 
 
 # pylint:disable=unused-argument
@@ -0,0 +1,321 @@
+# Copyright (C) 2017 Google Inc.
+# Licensed under http://www.apache.org/licenses/LICENSE-2.0 <see LICENSE file>
+
+"""Partitioned and resumable full text reindex.
+
+A reindex run splits all indexed objects into partitions of at most
+REINDEX_PARTITION_SIZE ids of a single model and stores them in the
+reindex_partitions table. Partitions are processed independently, either
+sequentially or by a pool of worker processes, and each one is marked as
+successful once all its records are committed. If a run is interrupted, the
+next reindex continues with its pending partitions and with running ones that
+were not updated for REINDEX_PARTITION_TIMEOUT seconds. A run with failed
+partitions fails its task and is not resumed; the next reindex starts over.
+"""
+
+import logging
+import multiprocessing
+import time
+from collections import defaultdict
+
+from sqlalchemy import or_
+
+from ggrc import db
+from ggrc import settings
+from ggrc.fulltext import get_indexer
+from ggrc.fulltext import get_indexed_model_names
+from ggrc.fulltext import mixin
+from ggrc.models import all_models
+from ggrc.models.inflector import get_model
+from ggrc.snapshotter import indexer as snapshot_indexer
+from ggrc.utils import benchmark
+from ggrc.utils import generate_id_ranges
+from ggrc.utils import generate_query_chunks
+
+
+logger = logging.getLogger(__name__)  # pylint: disable=invalid-name
+
+# Number of objects indexed and committed together inside a partition.
+CHUNK_SIZE = 1000
+
+SNAPSHOT_MODEL = "Snapshot"
+
+
+def get_reindexed_model_names():
+  """Get names of all models handled by a full reindex."""
+  return sorted(get_indexed_model_names()) + [SNAPSHOT_MODEL]
+
+
+def prepare_indexer_cache():
+  """Load shared data needed by record builders of all models."""
+  indexer = get_indexer()
+  people = db.session.query(all_models.Person.id, all_models.Person.name,
+                            all_models.Person.email)
+  indexer.cache["people_map"] = {p.id: (p.name, p.email) for p in people}
+  indexer.cache["ac_role_map"] = dict(db.session.query(
+      all_models.AccessControlRole.id,
+      all_models.AccessControlRole.name,
+  ))
+
+
+class ReindexError(Exception):
+  """Raised when some partitions of a reindex run have failed."""
+
+
+def _claimable_filter():
+  """Get filter for partitions that are not processed by any run."""
+  partition = all_models.ReindexPartition
+  stale_before = db.func.timestampadd(
+      db.text("SECOND"), -settings.REINDEX_PARTITION_TIMEOUT, db.func.now())
+  return or_(
+      partition.status == "Pending",
+      (partition.status == "Running") & (partition.updated_at < stale_before),
+  )
+
+
+def _unfinished_partitions():
+  """Get partitions of an interrupted reindex run that can be resumed.
+
+  Returns:
+    list of pending and stale running partitions, or None if a new run must
+    be started because the previous one has finished or failed.
+  """
+  partition = all_models.ReindexPartition
+  statuses = {status for status, in db.session.query(
+      partition.status).distinct()}
+  active = partition.query.filter(
+      partition.status == "Running",
+      ~_claimable_filter(),
+  ).count()
+  resumable = "Failure" not in statuses and statuses & {"Pending", "Running"}
+  if not active and not resumable:
+    return None
+  return partition.query.filter(_claimable_filter()).order_by(
+      partition.id).all()
+
+
+def create_partitions(task=None):
+  """Split all indexed objects into partitions for a new reindex run.
+
+  Partitions of previous runs are removed, since all of them have been
+  finished or failed. Records of models without the Indexed mixin are
+  removed too, so that records of deleted objects outside the reindexed id
+  ranges do not remain.
+
+  Args:
+    task: BackgroundTask running the reindex, if any.
+
+  Returns:
+    list of newly created ReindexPartition objects.
+  """
+  partition_size = settings.REINDEX_PARTITION_SIZE
+  partition = all_models.ReindexPartition
+  partition.query.delete()
+  indexer = get_indexer()
+  partitions = []
+  for model_name in get_reindexed_model_names():
+    model = get_model(model_name)
+    if model_name != SNAPSHOT_MODEL and not issubclass(model, mixin.Indexed):
+      indexer.delete_records_by_type(model_name, commit=False)
+    id_ranges = generate_id_ranges(db.session.query(model.id), partition_size)
+    for first_id, last_id in id_ranges:
+      partitions.append(partition(
+          background_task_id=task.id if task else None,
+          model_name=model_name,
+          first_id=first_id,
+          last_id=last_id,
+      ))
+  db.session.add_all(partitions)
+  db.session.commit()
+  return partitions
+
+
+def _reindex_indexed_model(model, ids_query):
+  """Reindex objects of a model with the Indexed mixin."""
+  for query_chunk in generate_query_chunks(ids_query, CHUNK_SIZE):
+    model.bulk_record_update_for([i.id for i in query_chunk])
+    db.session.commit()
+
+
+def _reindex_other_model(model, first_id, last_id):
+  """Reindex objects of a model without the Indexed mixin.
+
+  Records of the partition are removed first, so that a resumed partition
+  does not insert them twice.
+  """
+  # pylint: disable=protected-access
+  logger.warning(
+      "Try to index model that not inherited from Indexed mixin: %s",
+      model.__name__
+  )
+  indexer = get_indexer()
+  db.session.query(indexer.record_type).filter(
+      indexer.record_type.type == model.__name__,
+      indexer.record_type.key.between(first_id, last_id),
+  ).delete(synchronize_session=False)
+  mapper_class = model._sa_class_manager.mapper.base_mapper.class_
+  query = model.query.options(
+      db.undefer_group(mapper_class.__name__ + '_complete'),
+  ).filter(model.id.between(first_id, last_id))
+  for query_chunk in generate_query_chunks(query, CHUNK_SIZE):
+    for instance in query_chunk:
+      indexer.create_record(indexer.fts_record_for(instance), False)
+    db.session.commit()
+
+
+def reindex_partition(partition_id):
+  """Reindex all objects in a single partition.
+
+  Args:
+    partition_id: id of the ReindexPartition to process.
+
+  Returns:
+    tuple of model name, number of reindexed objects, duration in seconds and
+    the partition status, or None if the partition was claimed by another
+    run.
+  """
+  partition = all_models.ReindexPartition
+  claimed = partition.query.filter(
+      partition.id == partition_id,
+      _claimable_filter(),
+  ).update({"status": "Running"}, synchronize_session=False)
+  db.session.commit()
+  if not claimed:
+    return None
+  partition = partition.query.get(partition_id)
+  model_name = partition.model_name
+  first_id, last_id = partition.first_id, partition.last_id
+
+  start = time.time()
+  try:
+    model = get_model(model_name)
+    ids_query = db.session.query(model.id).filter(
+        model.id.between(first_id, last_id))
+    object_count = ids_query.count()
+    if model_name == SNAPSHOT_MODEL:
+      snapshot_indexer.reindex_snapshots([i.id for i in ids_query])
+    elif issubclass(model, mixin.Indexed):
+      _reindex_indexed_model(model, ids_query)
+    else:
+      _reindex_other_model(model, first_id, last_id)
+  except Exception:  # pylint: disable=broad-except
+    logger.exception("Failed to reindex %s with ids %s - %s",
+                     model_name, first_id, last_id)
+    db.session.rollback()
+    duration = time.time() - start
+    partition = all_models.ReindexPartition.query.get(partition_id)
+    partition.finish("Failure", duration=duration)
+    return model_name, 0, duration, "Failure"
+
+  duration = time.time() - start
+  partition = all_models.ReindexPartition.query.get(partition_id)
+  partition.finish("Success", object_count, duration)
+  return model_name, object_count, duration, "Success"
+
+
+def _init_worker():
+  """Set up a worker process for reindexing partitions."""
+  from ggrc.app import app
+  app.app_context().push()
+  prepare_indexer_cache()
+
+
+def _run_sequential(partition_ids):
+  """Reindex partitions one after another in the current process."""
+  prepare_indexer_cache()
+  for partition_id in partition_ids:
+    yield reindex_partition(partition_id)
+
+
+def _run_parallel(partition_ids, processes):
+  """Reindex partitions in a pool of worker processes."""
+  # Forked workers must not share database connections with this process.
+  db.session.remove()
+  db.engine.dispose()
+  pool = multiprocessing.Pool(processes, initializer=_init_worker)
+  try:
+    for result in pool.imap_unordered(reindex_partition, partition_ids):
+      yield result
+  finally:
+    pool.close()
+    pool.join()
+
+
+def get_throughput(results):
+  """Summarize partition results per model.
+
+  Args:
+    results: iterable of results of reindex_partition.
+
+  Returns:
+    dict with object count, processing time, objects per second and number
+    of failed partitions for each model name. Processing time is summed over
+    all partitions of a model, so with multiple worker processes it can be
+    longer than the reindex itself.
+  """
+  report = defaultdict(lambda: {"objects": 0, "seconds": 0.0,
+                                "failed_partitions": 0})
+  for result in results:
+    if result is None:
+      continue
+    model_name, object_count, duration, status = result
+    report[model_name]["objects"] += object_count
+    report[model_name]["seconds"] += duration
+    if status == "Failure":
+      report[model_name]["failed_partitions"] += 1
+  for stats in report.values():
+    stats["objects_per_second"] = (
+        stats["objects"] / stats["seconds"] if stats["seconds"] else 0.0)
+  return dict(report)
+
+
+def reindex(task=None, processes=None):
+  """Reindex all indexed objects, resuming an interrupted run if possible.
+
+  Args:
+    task: BackgroundTask running the reindex, if any.
+    processes: number of worker processes. Defaults to the
+      REINDEX_PROCESSES setting. Worker processes are not available on App
+      Engine, where partitions are always processed sequentially.
+
+  Returns:
+    dict with reindex throughput for each model, see get_throughput.
+
+  Raises:
+    ReindexError: if some partitions have failed.
+  """
+  if processes is None:
+    processes = settings.REINDEX_PROCESSES
+  if getattr(settings, "APP_ENGINE", False):
+    processes = 1
+
+  partitions = _unfinished_partitions()
+  if partitions is not None:
+    logger.info("Resuming reindex with %s unfinished partitions",
+                len(partitions))
+  else:
+    with benchmark("Create reindex partitions"):
+      partitions = create_partitions(task)
+  partition_ids = [partition.id for partition in partitions]
+
+  if processes > 1 and len(partition_ids) > 1:
+    results = _run_parallel(partition_ids, processes)
+  else:
+    results = _run_sequential(partition_ids)
+
+  with benchmark("Reindex {} partitions".format(len(partition_ids))):
+    throughput = get_throughput(results)
+  for model_name, stats in sorted(throughput.items()):
+    logger.info("Reindexed %s %s objects in %.2fs (%.1f objects/s)",
+                stats["objects"], model_name, stats["seconds"],
+                stats["objects_per_second"])
+
+  get_indexer().invalidate_cache()
+  failed = {model_name: stats["failed_partitions"]
+            for model_name, stats in throughput.iteritems()
+            if stats["failed_partitions"]}
+  if failed:
+    raise ReindexError("Failed to reindex partitions of {}".format(
+        ", ".join("{} ({})".format(model_name, count)
+                  for model_name, count in sorted(failed.items()))))
+  return throughput
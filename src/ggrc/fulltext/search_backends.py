@@ -0,0 +1,332 @@
+# Copyright (C) 2017 Google Inc.
+# Licensed under http://www.apache.org/licenses/LICENSE-2.0 <see LICENSE file>
+
+"""Search backends used by MysqlIndexer to match full text records.
+
+A search backend turns the search terms into a filter on the
+fulltext_record_properties table. The backend is selected with the
+FULLTEXT_SEARCH_BACKEND setting:
+
+  ggrc.fulltext.search_backends.LikeSearchBackend
+    Default backend, matches content with `LIKE '%terms%'`. Needs no extra
+    index, but scans the whole table on every search.
+
+  ggrc.fulltext.search_backends.MysqlFulltextSearchBackend
+    Narrows the matched records with the ngram FULLTEXT index on content,
+    which needs MySQL 5.7.6+ with innodb_ft_enable_stopword disabled.
+
+  ggrc.fulltext.search_backends.InvertedIndexSearchBackend
+    Keeps an in-process inverted index of the searched properties and
+    filters records by the matching (type, key) pairs. Terms shorter than a
+    trigram or matching too many objects fall back to LIKE.
+
+All backends return the same records as the LIKE backend, apart from the
+case-insensitive matching of the inverted index being stricter than MySQL
+collations for accented characters.
+"""
+
+import logging
+import threading
+import time
+import weakref
+from collections import defaultdict
+
+import flask
+from sqlalchemy import and_
+from sqlalchemy import event
+from sqlalchemy import or_
+from sqlalchemy.orm import Session
+from sqlalchemy.sql import false
+
+from ggrc import db
+from ggrc.fulltext.mysql import MysqlRecordProperty
+from ggrc.fulltext.mysql import SEARCHED_PROPERTIES
+
+
+logger = logging.getLogger(__name__)  # pylint: disable=invalid-name
+
+
+class SearchBackend(object):
+  """Base class for search backends."""
+
+  def __init__(self, settings):
+    pass
+
+  def get_filter(self, terms):
+    """Get filter for full text records with content matching terms."""
+    raise NotImplementedError()
+
+  def records_updated(self, type_name, keys):
+    """Handle changed full text records of objects of a single type."""
+    pass
+
+
+class LikeSearchBackend(SearchBackend):
+  """Search backend that matches content with LIKE."""
+
+  def get_filter(self, terms):
+    return MysqlRecordProperty.content.contains(terms)
+
+
+class MysqlFulltextSearchBackend(SearchBackend):
+  """Search backend that uses the ngram FULLTEXT index on content.
+
+  Terms are searched as a boolean mode phrase, which uses the index to find
+  records containing all ngrams of the terms in order. The LIKE filter is
+  still applied to these records so that the results do not depend on how
+  the terms were split into ngrams. Terms shorter than the ngram token size
+  can not be searched with the index and fall back to LIKE.
+  """
+
+  def __init__(self, settings):
+    super(MysqlFulltextSearchBackend, self).__init__(settings)
+    self.token_size = settings.FULLTEXT_NGRAM_TOKEN_SIZE
+
+  def get_filter(self, terms):
+    like = MysqlRecordProperty.content.contains(terms)
+    if len(terms.strip()) < self.token_size or '"' in terms:
+      return like
+    return and_(
+        MysqlRecordProperty.content.match(u'"{}"'.format(terms)),
+        like,
+    )
+
+
+class InvertedIndex(object):
+  """In-process inverted index of object contents.
+
+  Every object is a document with the lowercase contents of its searched
+  properties. The index maps each trigram of the contents to the posting set
+  of documents containing it. A search intersects the posting sets of all
+  trigrams of the terms and checks the contents of the remaining documents,
+  so it finds the same objects as a substring match.
+  """
+
+  NGRAM_SIZE = 3
+
+  # Separates contents of different properties of an object so that a match
+  # can not span two properties.
+  SEPARATOR = u"\x00"
+
+  def __init__(self):
+    self.documents = {}
+    self.postings = defaultdict(set)
+
+  @classmethod
+  def get_tokens(cls, content):
+    """Get all trigrams of the content."""
+    return {content[i:i + cls.NGRAM_SIZE]
+            for i in range(len(content) - cls.NGRAM_SIZE + 1)}
+
+  def remove(self, doc):
+    """Remove a (type, key) document from the index."""
+    content = self.documents.pop(doc, None)
+    if content is None:
+      return
+    for token in self.get_tokens(content):
+      posting = self.postings[token]
+      posting.discard(doc)
+      if not posting:
+        del self.postings[token]
+
+  def add(self, doc, contents):
+    """Add a (type, key) document with a list of property contents."""
+    self.remove(doc)
+    content = self.SEPARATOR.join(c.lower() for c in contents)
+    self.documents[doc] = content
+    for token in self.get_tokens(content):
+      self.postings[token].add(doc)
+
+  def search(self, terms):
+    """Get set of (type, key) documents that contain the terms."""
+    terms = terms.lower()
+    tokens = self.get_tokens(terms)
+    if tokens:
+      postings = sorted((self.postings.get(t, set()) for t in tokens), key=len)
+      candidates = set.intersection(*postings)
+    else:
+      candidates = self.documents
+    return {doc for doc in candidates if terms in self.documents[doc]}
+
+
+class InvertedIndexSearchBackend(SearchBackend):
+  """Search backend that filters records with an in-process inverted index.
+
+  The index is built from the database on first use and rebuilt after
+  FULLTEXT_INVERTED_INDEX_TTL seconds, which bounds the staleness caused by
+  records written by other processes. Rebuilds run in a background thread
+  and searches use the old index until the new one replaces it. Records
+  written by this process are applied to the index when their transaction is
+  committed and dropped when it is rolled back.
+  """
+
+  # Searches matching more objects than this are filtered with LIKE instead
+  # of listing the matched keys.
+  MAX_FILTER_KEYS = 1000
+
+  def __init__(self, settings):
+    super(InvertedIndexSearchBackend, self).__init__(settings)
+    self.ttl = settings.FULLTEXT_INVERTED_INDEX_TTL
+    self.index = None
+    self.built_at = 0
+    # Updates applied while a rebuild runs, None if no rebuild is running.
+    self.rebuild_updates = None
+    self.lock = threading.RLock()
+    # Session -> list of (transaction, type_name, keys, contents) of updates
+    # that are not committed yet.
+    self.pending = weakref.WeakKeyDictionary()
+    event.listen(Session, "after_commit", self._after_commit)
+    event.listen(Session, "after_soft_rollback", self._after_soft_rollback)
+
+  @staticmethod
+  def _query_contents(type_name=None, keys=None):
+    """Query contents of searched properties grouped by (type, key)."""
+    query = db.session.query(
+        MysqlRecordProperty.type,
+        MysqlRecordProperty.key,
+        MysqlRecordProperty.content,
+    ).filter(
+        MysqlRecordProperty.property.in_(SEARCHED_PROPERTIES)
+    )
+    if type_name is not None:
+      query = query.filter(
+          MysqlRecordProperty.type == type_name,
+          MysqlRecordProperty.key.in_(keys),
+      )
+    contents = defaultdict(list)
+    for type_, key, content in query:
+      if content:
+        contents[(type_, key)].append(content)
+    return contents
+
+  def _build_index(self):
+    """Build an inverted index of all searched records."""
+    index = InvertedIndex()
+    for doc, contents in self._query_contents().iteritems():
+      index.add(doc, contents)
+    return index
+
+  def _rebuild(self, app):
+    """Build a new index and replace the current one with it."""
+    index = None
+    try:
+      with app.app_context():
+        index = self._build_index()
+    except Exception:  # pylint: disable=broad-except
+      logger.exception("Failed to rebuild the inverted search index")
+    with self.lock:
+      if index is not None:
+        # Updates committed while the records were read may be missing.
+        for type_name, keys, contents in self.rebuild_updates:
+          self._apply(type_name, keys, contents, index)
+        self.index = index
+      self.built_at = time.time()
+      self.rebuild_updates = None
+
+  def get_index(self):
+    """Get the inverted index.
+
+    A missing index is built before it is returned, an expired index is
+    returned while a new one is built in the background.
+    """
+    with self.lock:
+      if self.index is None:
+        self.index = self._build_index()
+        self.built_at = time.time()
+      elif (time.time() - self.built_at > self.ttl and
+            self.rebuild_updates is None):
+        self.rebuild_updates = []
+        thread = threading.Thread(
+            target=self._rebuild,
+            # pylint: disable=protected-access
+            args=(flask.current_app._get_current_object(),),
+            name="inverted-index-rebuild",
+        )
+        thread.daemon = True
+        thread.start()
+      return self.index
+
+  def get_filter(self, terms):
+    like = MysqlRecordProperty.content.contains(terms)
+    if len(terms) < InvertedIndex.NGRAM_SIZE:
+      return like
+    with self.lock:
+      docs = self.get_index().search(terms)
+    if len(docs) > self.MAX_FILTER_KEYS:
+      return like
+    keys_by_type = defaultdict(list)
+    for type_name, key in docs:
+      keys_by_type[type_name].append(key)
+    if not keys_by_type:
+      return false()
+    return or_(*[
+        and_(MysqlRecordProperty.type == type_name,
+             MysqlRecordProperty.key.in_(keys))
+        for type_name, keys in keys_by_type.iteritems()
+    ])
+
+  def records_updated(self, type_name, keys):
+    keys = list(keys)
+    if not keys or self.index is None:
+      return
+    contents = self._query_contents(type_name, keys)
+    session = db.session()
+    # pylint: disable=protected-access
+    transaction = session.transaction
+    while transaction._parent is not None and not transaction.nested:
+      transaction = transaction._parent
+    with self.lock:
+      self.pending.setdefault(session, []).append(
+          (transaction, type_name, keys, contents))
+
+  def _apply(self, type_name, keys, contents, index=None):
+    """Apply committed contents of objects to the index."""
+    if index is None:
+      index = self.index
+      if self.rebuild_updates is not None:
+        self.rebuild_updates.append((type_name, keys, contents))
+    for key in keys:
+      doc = (type_name, key)
+      if doc in contents:
+        index.add(doc, contents[doc])
+      else:
+        index.remove(doc)
+
+  def _after_commit(self, session):
+    """Apply updates of a committed transaction.
+
+    Updates made in a released savepoint move to the enclosing transaction.
+    """
+    # pylint: disable=protected-access
+    transaction = session.transaction
+    with self.lock:
+      updates = self.pending.get(session)
+      if not updates:
+        return
+      if transaction.nested:
+        parent = transaction._parent
+        self.pending[session] = [
+            ((parent,) + update[1:]) if update[0] is transaction else update
+            for update in updates
+        ]
+        return
+      del self.pending[session]
+      if self.index is None:
+        return
+      for _, type_name, keys, contents in updates:
+        self._apply(type_name, keys, contents)
+
+  def _after_soft_rollback(self, session, previous_transaction):
+    """Drop updates made in transactions that were rolled back."""
+    # pylint: disable=protected-access,unused-argument
+    with self.lock:
+      updates = self.pending.get(session)
+      if not updates:
+        return
+      open_transactions = set()
+      transaction = session.transaction
+      while transaction is not None:
+        open_transactions.add(transaction)
+        transaction = transaction._parent
+      self.pending[session] = [update for update in updates
+                               if update[0] in open_transactions]
@@ -0,0 +1,305 @@
+# Copyright (C) 2017 Google Inc.
+# Licensed under http://www.apache.org/licenses/LICENSE-2.0 <see LICENSE file>
+
+"""Typed secondary indexes of custom attribute values.
+
+Filters on custom attributes compare the content of full text records, which
+becomes a LIKE or string comparison over all records of a type. The values of
+custom attributes are therefore also stored in narrow tables keyed by
+(type, property, content):
+
+  fulltext_text_properties
+    non-empty values of all custom attributes except Map:Person ones.
+
+  fulltext_date_properties
+    values that are ISO formatted dates, stored as DATE.
+
+Both tables are derived from the full text records of an object and refreshed
+whenever these records are written. Filters use them for custom attributes of
+the filtered type, while people attributes and snapshots keep filtering the
+full text records.
+"""
+
+import datetime
+import threading
+import time
+
+from sqlalchemy import and_
+from sqlalchemy import cast
+from sqlalchemy import event
+from sqlalchemy import not_
+from sqlalchemy.sql.expression import select
+
+from ggrc import db
+from ggrc import fulltext
+from ggrc import settings
+from ggrc.models.custom_attribute_definition import CustomAttributeDefinition
+from ggrc.models.custom_attribute_value import CustomAttributeValue
+from ggrc.models.mixins import CustomAttributable
+
+
+MAP_TYPE_PREFIX = CustomAttributeDefinition.ValidTypes.MAP + ":"
+
+DATE_PATTERN = "^[0-9]{4}-[0-9]{2}-[0-9]{2}$"
+
+
+class TextRecordProperty(db.Model):
+  """Text value of a custom attribute of an object."""
+  # pylint: disable=too-few-public-methods
+  __tablename__ = "fulltext_text_properties"
+
+  key = db.Column(db.Integer, primary_key=True, autoincrement=False)
+  type = db.Column(db.String(64), primary_key=True)
+  property = db.Column(db.String(250), primary_key=True)
+  content = db.Column(db.Text, nullable=False)
+
+  __table_args__ = (
+      db.Index("ix_fulltext_text_properties_content",
+               "type", "property", "content",
+               mysql_length={"content": 100}),
+  )
+
+
+class DateRecordProperty(db.Model):
+  """Date value of a custom attribute of an object."""
+  # pylint: disable=too-few-public-methods
+  __tablename__ = "fulltext_date_properties"
+
+  key = db.Column(db.Integer, primary_key=True, autoincrement=False)
+  type = db.Column(db.String(64), primary_key=True)
+  property = db.Column(db.String(250), primary_key=True)
+  content = db.Column(db.Date, nullable=False)
+
+  __table_args__ = (
+      db.Index("ix_fulltext_date_properties_content",
+               "type", "property", "content"),
+  )
+
+
+TYPED_MODELS = (TextRecordProperty, DateRecordProperty)
+
+
+def _get_value_select(type_name, keys, content):
+  """Select custom attribute records of objects with the given content."""
+  record = fulltext.get_indexer().record_type
+  cav = CustomAttributeValue
+  cad = CustomAttributeDefinition
+  return select([
+      record.key, record.type, record.property, content
+  ]).select_from(
+      record.__table__.join(cav, and_(
+          cav.attributable_type == record.type,
+          cav.attributable_id == record.key,
+      )).join(cad, and_(
+          cad.id == cav.custom_attribute_id,
+          cad.title == record.property,
+      ))
+  ).where(and_(
+      record.type == type_name,
+      record.key.in_(keys),
+      record.subproperty == u"",
+      record.content != u"",
+      not_(cad.attribute_type.startswith(MAP_TYPE_PREFIX)),
+  ))
+
+
+def refresh(type_name, keys):
+  """Rebuild typed values of objects from their full text records.
+
+  Args:
+    type_name: name of the model of the objects.
+    keys: ids of the objects.
+  """
+  keys = list(keys)
+  if not keys:
+    return
+  for model in TYPED_MODELS:
+    db.session.execute(model.__table__.delete().where(and_(
+        model.type == type_name,
+        model.key.in_(keys),
+    )))
+  record = fulltext.get_indexer().record_type
+  columns = ["key", "type", "property", "content"]
+  db.session.execute(
+      TextRecordProperty.__table__.insert().prefix_with("IGNORE").from_select(
+          columns, _get_value_select(type_name, keys, record.content)))
+  date_content = cast(record.content, db.Date)
+  db.session.execute(
+      DateRecordProperty.__table__.insert().prefix_with("IGNORE").from_select(
+          columns, _get_value_select(type_name, keys, date_content).where(
+              and_(record.content.op("REGEXP")(DATE_PATTERN),
+                   date_content.isnot(None)))))
+
+
+def add_pending(type_name, key):
+  """Mark full text records of an object as changed before the next commit.
+
+  See pop_pending.
+  """
+  if not hasattr(db.session, "typed_properties_pending"):
+    db.session.typed_properties_pending = set()
+  db.session.typed_properties_pending.add((type_name, key))
+
+
+def pop_pending():
+  """Get objects marked with add_pending and clear the marks.
+
+  Returns:
+    dict of lists of keys of the marked objects by type name. The typed
+    values of these objects must be refreshed.
+  """
+  pending = getattr(db.session, "typed_properties_pending", None)
+  if not pending:
+    return {}
+  db.session.typed_properties_pending = set()
+  db.session.flush()
+  keys_by_type = {}
+  for type_name, key in pending:
+    keys_by_type.setdefault(type_name, []).append(key)
+  return keys_by_type
+
+
+def delete_all(type_name=None):
+  """Delete typed values of all objects or of all objects of a type."""
+  for model in TYPED_MODELS:
+    query = db.session.query(model)
+    if type_name is not None:
+      query = query.filter(model.type == type_name)
+    query.delete(synchronize_session=False)
+
+
+class IndexedCache(object):
+  """Cache of whether values of a property of a model are in typed tables.
+
+  Plans of the query API are keyed on these flags, so checking them must not
+  query custom attribute definitions for every filter. Flags are kept for
+  TYPED_PROPERTIES_CACHE_TTL seconds and dropped when custom attribute
+  definitions change in this process.
+  """
+
+  MAX_SIZE = 1000
+
+  def __init__(self, ttl):
+    self.ttl = ttl
+    self.flags = {}
+    self.generation = 0
+    self.lock = threading.Lock()
+
+  def get(self, key):
+    """Get a cached flag and the generation to store a new one with."""
+    with self.lock:
+      expires_at, indexed = self.flags.get(key, (0, None))
+      if expires_at < time.time():
+        indexed = None
+      return indexed, self.generation
+
+  def set(self, key, indexed, generation):
+    """Store a flag unless the cache was cleared since it was read."""
+    if not self.ttl:
+      return
+    with self.lock:
+      if generation != self.generation:
+        return
+      if len(self.flags) >= self.MAX_SIZE:
+        self.flags.clear()
+      self.flags[key] = (time.time() + self.ttl, indexed)
+
+  def clear(self):
+    """Remove all cached flags."""
+    with self.lock:
+      self.flags.clear()
+      self.generation += 1
+
+
+INDEXED_CACHE = IndexedCache(settings.TYPED_PROPERTIES_CACHE_TTL)
+
+
+@event.listens_for(CustomAttributeDefinition, "after_insert")
+@event.listens_for(CustomAttributeDefinition, "after_update")
+@event.listens_for(CustomAttributeDefinition, "after_delete")
+def clear_indexed_cache(mapper, connection, target):
+  """Drop cached flags when a custom attribute definition changes."""
+  # pylint: disable=unused-argument
+  INDEXED_CACHE.clear()
+
+
+@event.listens_for(db.session.__class__, "after_bulk_update")
+@event.listens_for(db.session.__class__, "after_bulk_delete")
+def clear_indexed_cache_bulk(session, query, query_context, result):
+  """Drop cached flags when custom attribute definitions are bulk changed."""
+  # pylint: disable=unused-argument
+  if any(description["type"] is CustomAttributeDefinition
+         for description in query.column_descriptions):
+    INDEXED_CACHE.clear()
+
+
+def _query_is_indexed(object_class, key):
+  """Query if values of a property of a model are in the typed tables."""
+  cad = CustomAttributeDefinition
+  # pylint: disable=protected-access
+  attribute_types = [attribute_type for attribute_type, in db.session.query(
+      cad.attribute_type
+  ).filter(
+      cad.definition_type == object_class._inflector.table_singular,
+      cad.title == key,
+  ).distinct()]
+  return bool(attribute_types) and not any(
+      attribute_type.startswith(MAP_TYPE_PREFIX)
+      for attribute_type in attribute_types)
+
+
+def is_indexed(object_class, key):
+  """Check if values of a property of a model are in the typed tables."""
+  if not issubclass(object_class, CustomAttributable):
+    return False
+  cache_key = (object_class.__name__, key)
+  indexed, generation = INDEXED_CACHE.get(cache_key)
+  if indexed is None:
+    indexed = _query_is_indexed(object_class, key)
+    INDEXED_CACHE.set(cache_key, indexed, generation)
+  return indexed
+
+
+def get_filter(object_class, key, predicate, value):
+  """Get filter comparing custom attribute values with the typed tables.
+
+  Args:
+    object_class: filtered model.
+    key: custom attribute title.
+    predicate: comparison of a column with a value.
+    value: compared value, dates are compared with the date table.
+
+  Returns:
+    `id IN` filter over the typed tables or None if the property is not
+    indexed there.
+  """
+  if not is_indexed(object_class, key):
+    return None
+  if isinstance(value, datetime.date):
+    model = DateRecordProperty
+  else:
+    model = TextRecordProperty
+  return object_class.id.in_(
+      db.session.query(model.key).filter(
+          model.type == object_class.__name__,
+          model.property == key,
+          predicate(model.content, value),
+      )
+  )
+
+
+def get_empty_filter(object_class, key):
+  """Get filter for objects with an empty custom attribute value.
+
+  Returns:
+    `id NOT IN` filter over the text table or None if the property is not
+    indexed there.
+  """
+  if not is_indexed(object_class, key):
+    return None
+  return object_class.id.notin_(
+      db.session.query(TextRecordProperty.key).filter(
+          TextRecordProperty.type == object_class.__name__,
+          TextRecordProperty.property == key,
+      )
+  )
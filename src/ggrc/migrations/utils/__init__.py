@@ -17,11 +17,14 @@ from sqlalchemy.sql import select
 from sqlalchemy.sql import tuple_
 
 from ggrc.models.relationship import Relationship
+from ggrc.models.relationship import RelationshipNeighbor
 from ggrc.models.revision import Revision
 from ggrc.models.snapshot import Snapshot
 
 
 relationships_table = Relationship.__table__  # pylint: disable=invalid-name
+# pylint: disable=invalid-name
+relationship_neighbors_table = RelationshipNeighbor.__table__
 revisions_table = Revision.__table__  # pylint: disable=invalid-name
 snapshots_table = Snapshot.__table__  # pylint: disable=invalid-name
 
@@ -166,3 +169,25 @@ def insert_payloads(connection, snapshots=None, relationships=None):
               "now())")
     sql += ','.join(value_.format(**rel) for rel in relationships)
     connection.execute(sql)
+    insert_relationship_neighbors(connection, relationships)
+
+
+def insert_relationship_neighbors(connection, relationships):
+  """Add neighbors of relationships inserted with plain SQL.
+
+  Migrations that run before the relationship_neighbors table is created
+  skip this, since that migration fills the table from all relationships.
+  """
+  if not connection.dialect.has_table(connection,
+                                      relationship_neighbors_table.name):
+    return
+  connection.execute(RelationshipNeighbor.get_insert(tuple_(
+      relationships_table.c.source_type,
+      relationships_table.c.source_id,
+      relationships_table.c.destination_type,
+      relationships_table.c.destination_id,
+  ).in_([
+      (rel["source_type"], rel["source_id"],
+       rel["destination_type"], rel["destination_id"])
+      for rel in relationships
+  ])))
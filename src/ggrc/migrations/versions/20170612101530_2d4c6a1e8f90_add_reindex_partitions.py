@@ -0,0 +1,57 @@
+# Copyright (C) 2017 Google Inc.
+# Licensed under http://www.apache.org/licenses/LICENSE-2.0 <see LICENSE file>
+
+"""
+Add reindex_partitions table
+
+Create Date: 2017-06-12 10:15:30.517260
+"""
+# disable Invalid constant name pylint warning for mandatory Alembic variables.
+# pylint: disable=invalid-name
+
+import sqlalchemy as sa
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = '2d4c6a1e8f90'
+down_revision = '4936d6e2f8dd'
+
+
+def upgrade():
+  """Upgrade database schema and/or data, creating a new revision."""
+  op.create_table(
+      'reindex_partitions',
+      sa.Column('id', sa.Integer(), nullable=False),
+      sa.Column('background_task_id', sa.Integer(), nullable=True),
+      sa.Column('model_name', sa.String(length=250), nullable=False),
+      sa.Column('first_id', sa.Integer(), nullable=False),
+      sa.Column('last_id', sa.Integer(), nullable=False),
+      sa.Column('object_count', sa.Integer(), nullable=False),
+      sa.Column('duration', sa.Float(), nullable=False),
+      sa.Column('status', sa.String(length=250), nullable=False),
+      sa.Column('created_at', sa.DateTime(), nullable=False),
+      sa.Column('modified_by_id', sa.Integer(), nullable=True),
+      sa.Column('updated_at', sa.DateTime(), nullable=False),
+      sa.Column('context_id', sa.Integer(), nullable=True),
+      sa.ForeignKeyConstraint(['background_task_id'],
+                              ['background_tasks.id'], ),
+      sa.ForeignKeyConstraint(['context_id'], ['contexts.id'], ),
+      sa.PrimaryKeyConstraint('id'),
+  )
+  op.create_index(
+      'fk_reindex_partitions_contexts',
+      'reindex_partitions',
+      ['context_id'],
+      unique=False)
+  op.create_index(
+      'ix_reindex_partitions_updated_at',
+      'reindex_partitions',
+      ['updated_at'],
+      unique=False)
+
+
+def downgrade():
+  """Downgrade database schema and/or data back to the previous revision."""
+  op.drop_table('reindex_partitions')
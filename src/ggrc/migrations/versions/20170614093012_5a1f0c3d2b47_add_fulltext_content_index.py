@@ -0,0 +1,55 @@
+# Copyright (C) 2017 Google Inc.
+# Licensed under http://www.apache.org/licenses/LICENSE-2.0 <see LICENSE file>
+
+"""
+Add ngram FULLTEXT index on fulltext_record_properties content
+
+Create Date: 2017-06-14 09:30:12.184519
+"""
+# disable Invalid constant name pylint warning for mandatory Alembic variables.
+# pylint: disable=invalid-name
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = '5a1f0c3d2b47'
+down_revision = '2d4c6a1e8f90'
+
+INDEX_NAME = 'ft_fulltext_record_properties_content'
+
+
+def has_ngram_parser():
+  """Check if the server supports the ngram full text parser (MySQL 5.7.6+)."""
+  return op.get_bind().execute("""
+      SELECT COUNT(*) FROM information_schema.plugins
+      WHERE plugin_name = 'ngram' AND plugin_status = 'ACTIVE'
+  """).scalar() > 0
+
+
+def has_index():
+  """Check if the content FULLTEXT index exists."""
+  return op.get_bind().execute("""
+      SELECT COUNT(*) FROM information_schema.statistics
+      WHERE table_schema = DATABASE()
+        AND table_name = 'fulltext_record_properties'
+        AND index_name = '{}'
+  """.format(INDEX_NAME)).scalar() > 0
+
+
+def upgrade():
+  """Upgrade database schema and/or data, creating a new revision."""
+  # The index is used only by the MysqlFulltextSearchBackend. Servers without
+  # the ngram parser keep using the LIKE search backend.
+  if not has_ngram_parser():
+    return
+  op.execute("""
+      ALTER TABLE fulltext_record_properties
+      ADD FULLTEXT INDEX {} (content) WITH PARSER ngram
+  """.format(INDEX_NAME))
+
+
+def downgrade():
+  """Downgrade database schema and/or data back to the previous revision."""
+  if has_index():
+    op.drop_index(INDEX_NAME, 'fulltext_record_properties')
@@ -0,0 +1,45 @@
+# Copyright (C) 2017 Google Inc.
+# Licensed under http://www.apache.org/licenses/LICENSE-2.0 <see LICENSE file>
+
+"""
+Add permitted_objects and permitted_object_sets tables
+
+Create Date: 2017-06-16 14:12:08.311742
+"""
+# disable Invalid constant name pylint warning for mandatory Alembic variables.
+# pylint: disable=invalid-name
+
+import sqlalchemy as sa
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = '1b6e3f9a7c25'
+down_revision = '5a1f0c3d2b47'
+
+
+def upgrade():
+  """Upgrade database schema and/or data, creating a new revision."""
+  op.create_table(
+      'permitted_objects',
+      sa.Column('person_id', sa.Integer(), autoincrement=False,
+                nullable=False),
+      sa.Column('object_type', sa.String(length=250), nullable=False),
+      sa.Column('object_id', sa.Integer(), autoincrement=False,
+                nullable=False),
+      sa.PrimaryKeyConstraint('person_id', 'object_type', 'object_id'),
+  )
+  op.create_table(
+      'permitted_object_sets',
+      sa.Column('person_id', sa.Integer(), autoincrement=False,
+                nullable=False),
+      sa.Column('fingerprint', sa.String(length=40), nullable=False),
+      sa.PrimaryKeyConstraint('person_id'),
+  )
+
+
+def downgrade():
+  """Downgrade database schema and/or data back to the previous revision."""
+  op.drop_table('permitted_object_sets')
+  op.drop_table('permitted_objects')
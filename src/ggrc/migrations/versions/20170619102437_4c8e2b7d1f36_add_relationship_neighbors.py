@@ -0,0 +1,53 @@
+# Copyright (C) 2017 Google Inc.
+# Licensed under http://www.apache.org/licenses/LICENSE-2.0 <see LICENSE file>
+
+"""
+Add relationship_neighbors table
+
+Create Date: 2017-06-19 10:24:37.518204
+"""
+# disable Invalid constant name pylint warning for mandatory Alembic variables.
+# pylint: disable=invalid-name
+
+import sqlalchemy as sa
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = '4c8e2b7d1f36'
+down_revision = '1b6e3f9a7c25'
+
+
+def upgrade():
+  """Upgrade database schema and/or data, creating a new revision."""
+  op.create_table(
+      'relationship_neighbors',
+      sa.Column('object_type', sa.String(length=250), nullable=False),
+      sa.Column('object_id', sa.Integer(), autoincrement=False,
+                nullable=False),
+      sa.Column('related_type', sa.String(length=250), nullable=False),
+      sa.Column('related_id', sa.Integer(), autoincrement=False,
+                nullable=False),
+      sa.Column('relationship_id', sa.Integer(), autoincrement=False,
+                nullable=False),
+      sa.ForeignKeyConstraint(['relationship_id'], ['relationships.id'],
+                              ondelete='CASCADE'),
+      sa.PrimaryKeyConstraint('object_type', 'object_id', 'related_type',
+                              'related_id', 'relationship_id'),
+  )
+  op.execute("""
+      INSERT IGNORE INTO relationship_neighbors (
+          object_type, object_id, related_type, related_id, relationship_id
+      )
+      SELECT source_type, source_id, destination_type, destination_id, id
+      FROM relationships
+      UNION ALL
+      SELECT destination_type, destination_id, source_type, source_id, id
+      FROM relationships
+  """)
+
+
+def downgrade():
+  """Downgrade database schema and/or data back to the previous revision."""
+  op.drop_table('relationship_neighbors')
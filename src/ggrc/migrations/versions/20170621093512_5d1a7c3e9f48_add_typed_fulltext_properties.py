@@ -0,0 +1,75 @@
+# Copyright (C) 2017 Google Inc.
+# Licensed under http://www.apache.org/licenses/LICENSE-2.0 <see LICENSE file>
+
+"""
+Add typed fulltext property tables
+
+Create Date: 2017-06-21 09:35:12.204716
+"""
+# disable Invalid constant name pylint warning for mandatory Alembic variables.
+# pylint: disable=invalid-name
+
+import sqlalchemy as sa
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = '5d1a7c3e9f48'
+down_revision = '4c8e2b7d1f36'
+
+
+VALUES_SELECT = """
+    SELECT r.`key`, r.type, r.property, {content}
+    FROM fulltext_record_properties AS r
+    JOIN custom_attribute_values AS v
+        ON v.attributable_type = r.type AND v.attributable_id = r.`key`
+    JOIN custom_attribute_definitions AS d
+        ON d.id = v.custom_attribute_id AND d.title = r.property
+    WHERE r.subproperty = '' AND r.content != ''
+        AND d.attribute_type NOT LIKE 'Map:%'
+"""
+
+
+def upgrade():
+  """Upgrade database schema and/or data, creating a new revision."""
+  op.create_table(
+      'fulltext_text_properties',
+      sa.Column('key', sa.Integer(), autoincrement=False, nullable=False),
+      sa.Column('type', sa.String(length=64), nullable=False),
+      sa.Column('property', sa.String(length=250), nullable=False),
+      sa.Column('content', sa.Text(), nullable=False),
+      sa.PrimaryKeyConstraint('key', 'type', 'property'),
+  )
+  op.create_index('ix_fulltext_text_properties_content',
+                  'fulltext_text_properties',
+                  ['type', 'property', 'content'],
+                  mysql_length={'content': 100})
+  op.create_table(
+      'fulltext_date_properties',
+      sa.Column('key', sa.Integer(), autoincrement=False, nullable=False),
+      sa.Column('type', sa.String(length=64), nullable=False),
+      sa.Column('property', sa.String(length=250), nullable=False),
+      sa.Column('content', sa.Date(), nullable=False),
+      sa.PrimaryKeyConstraint('key', 'type', 'property'),
+  )
+  op.create_index('ix_fulltext_date_properties_content',
+                  'fulltext_date_properties',
+                  ['type', 'property', 'content'])
+  op.execute("""
+      INSERT IGNORE INTO fulltext_text_properties (`key`, type, property,
+                                                   content)
+  """ + VALUES_SELECT.format(content="r.content"))
+  op.execute("""
+      INSERT IGNORE INTO fulltext_date_properties (`key`, type, property,
+                                                   content)
+  """ + VALUES_SELECT.format(content="CAST(r.content AS DATE)") + """
+        AND r.content REGEXP '^[0-9]{4}-[0-9]{2}-[0-9]{2}$'
+        AND CAST(r.content AS DATE) IS NOT NULL
+  """)
+
+
+def downgrade():
+  """Downgrade database schema and/or data back to the previous revision."""
+  op.drop_table('fulltext_date_properties')
+  op.drop_table('fulltext_text_properties')
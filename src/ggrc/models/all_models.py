@@ -49,6 +49,7 @@ from ggrc.models.person import Person
 from ggrc.models.product import Product
 from ggrc.models.program import Program
 from ggrc.models.project import Project
+from ggrc.models.reindex_partition import ReindexPartition
 from ggrc.models.relationship import Relationship
 from ggrc.models.relationship import RelationshipAttr
 from ggrc.models.revision import Revision
@@ -107,6 +108,7 @@ all_models = [
     Revision,
     Event,
     BackgroundTask,
+    ReindexPartition,
     NotificationConfig,
     NotificationType,
     Notification,
@@ -5,6 +5,7 @@ from logging import getLogger
 from functools import wraps
 from time import time
 
+from flask import json
 from flask import request
 from flask.wrappers import Response
 from werkzeug.datastructures import Headers
@@ -69,6 +70,24 @@ class BackgroundTask(Base, Stateful, db.Model):
     db.session.add(self)
     db.session.commit()
 
+  def set_progress(self, progress):
+    """Store the progress of a running task as its temporary result.
+
+    The result is written outside of the current session, so that changes
+    made by the task are not committed with it.
+
+    Args:
+      progress: json serializable progress data.
+    """
+    result = {
+        'content': json.dumps({'status': self.status, 'progress': progress}),
+        'status_code': 200,
+        'headers': [('Content-Type', 'application/json')],
+    }
+    table = self.__table__
+    db.engine.execute(
+        table.update().where(table.c.id == self.id).values(result=result))
+
   def make_response(self, default=None):
     if self.result is None:
       return default
@@ -108,7 +127,10 @@ def create_task(name, url, queued_callback=None, parameters=None):
 
 def make_task_response(id_):
   task = BackgroundTask.query.get(id_)
-  return task.make_response()
+  from ggrc.app import app
+  return task.make_response(app.make_response((
+      json.dumps({'status': task.status}), 200,
+      [('Content-Type', 'application/json')])))
 
 
 def queued_task(func):
@@ -0,0 +1,41 @@
+# Copyright (C) 2017 Google Inc.
+# Licensed under http://www.apache.org/licenses/LICENSE-2.0 <see LICENSE file>
+
+"""Checkpoints for the full text reindex procedure."""
+
+from ggrc import db
+from ggrc.models.mixins import Base
+from ggrc.models.mixins import Stateful
+
+
+class ReindexPartition(Base, Stateful, db.Model):
+  """Range of object ids of a single model that is reindexed as one unit.
+
+  All partitions of a reindex run are created upfront. A partition is marked
+  as successful once all records for its objects have been committed, so an
+  interrupted reindex can be resumed by processing only unfinished partitions.
+  """
+  __tablename__ = "reindex_partitions"
+
+  VALID_STATES = [
+      "Pending",
+      "Running",
+      "Success",
+      "Failure",
+  ]
+
+  background_task_id = db.Column(
+      db.Integer, db.ForeignKey("background_tasks.id"), nullable=True)
+  model_name = db.Column(db.String(250), nullable=False)
+  first_id = db.Column(db.Integer, nullable=False)
+  last_id = db.Column(db.Integer, nullable=False)
+  object_count = db.Column(db.Integer, nullable=False, default=0)
+  duration = db.Column(db.Float, nullable=False, default=0)
+
+  def finish(self, status, object_count=0, duration=0):
+    """Store the outcome of processing this partition."""
+    self.status = status
+    self.object_count = object_count
+    self.duration = duration
+    db.session.add(self)
+    db.session.commit()
@@ -6,8 +6,11 @@ import inspect
 
 from sqlalchemy import event
 from sqlalchemy import or_, and_
+from sqlalchemy import select
+from sqlalchemy import union_all
 from sqlalchemy.ext.associationproxy import association_proxy
 from sqlalchemy.ext.declarative import declared_attr
+from sqlalchemy.orm import Session
 from sqlalchemy.orm.collections import attribute_mapped_collection
 
 from ggrc import db
@@ -144,6 +147,102 @@ event.listen(Relationship, 'before_insert', Relationship.validate_attrs)
 event.listen(Relationship, 'before_update', Relationship.validate_attrs)
 
 
+class RelationshipNeighbor(db.Model):
+  """Undirected adjacency index of relationships.
+
+  Every relationship is stored twice, once from the side of each mapped
+  object, so that the neighbors of an object with a given type are found with
+  a single probe of the primary key instead of a union of source and
+  destination scans of the relationships table. Rows are removed together
+  with their relationship by the foreign key.
+
+  Relationships inserted through the ORM are added by the after_insert
+  listener. Code that inserts relationships with plain SQL must call
+  insert_for for the new relationships. Endpoints of relationships can not
+  be changed with a bulk Query.update, because the changed relationships are
+  not known afterwards.
+  """
+  # pylint: disable=too-few-public-methods
+  __tablename__ = 'relationship_neighbors'
+
+  object_type = db.Column(db.String(250), primary_key=True)
+  object_id = db.Column(db.Integer, primary_key=True, autoincrement=False)
+  related_type = db.Column(db.String(250), primary_key=True)
+  related_id = db.Column(db.Integer, primary_key=True, autoincrement=False)
+  relationship_id = db.Column(
+      db.Integer,
+      db.ForeignKey('relationships.id', ondelete="CASCADE"),
+      primary_key=True,
+      autoincrement=False,
+  )
+
+  @classmethod
+  def get_insert(cls, whereclause):
+    """Get INSERT of neighbors of relationships matching whereclause."""
+    rel = Relationship.__table__.c
+    neighbors = union_all(
+        select([rel.source_type, rel.source_id, rel.destination_type,
+                rel.destination_id, rel.id]).where(whereclause),
+        select([rel.destination_type, rel.destination_id, rel.source_type,
+                rel.source_id, rel.id]).where(whereclause),
+    )
+    table = cls.__table__
+    # A relationship of an object to itself gives the same row twice.
+    return table.insert().prefix_with("IGNORE").from_select(
+        [table.c.object_type, table.c.object_id, table.c.related_type,
+         table.c.related_id, table.c.relationship_id],
+        neighbors,
+    )
+
+  @classmethod
+  def insert_for(cls, whereclause):
+    """Add neighbors of relationships inserted without the ORM."""
+    db.session.execute(cls.get_insert(whereclause))
+
+  @classmethod
+  def get_related_ids(cls, object_type, related_type, related_ids):
+    """Get query for ids of object_type neighbors of related objects."""
+    return db.session.query(cls.related_id).filter(
+        cls.object_type == related_type,
+        cls.object_id.in_(related_ids),
+        cls.related_type == object_type,
+    )
+
+
+@event.listens_for(Relationship, 'after_insert')
+def add_relationship_neighbors(mapper, connection, target):
+  """Add neighbors of a new relationship."""
+  # pylint: disable=unused-argument
+  connection.execute(
+      RelationshipNeighbor.get_insert(Relationship.id == target.id))
+
+
+@event.listens_for(Relationship, 'after_update')
+def update_relationship_neighbors(mapper, connection, target):
+  """Replace neighbors of a relationship with changed endpoints."""
+  # pylint: disable=unused-argument
+  table = RelationshipNeighbor.__table__
+  connection.execute(table.delete().where(
+      table.c.relationship_id == target.id))
+  connection.execute(
+      RelationshipNeighbor.get_insert(Relationship.id == target.id))
+
+
+ENDPOINT_COLUMNS = {"source_type", "source_id",
+                    "destination_type", "destination_id"}
+
+
+@event.listens_for(Session, 'after_bulk_update')
+def check_relationship_bulk_update(update_context):
+  """Reject bulk updates that would leave stale relationship neighbors."""
+  if update_context.primary_table is not Relationship.__table__:
+    return
+  columns = {getattr(key, "key", key) for key in update_context.values}
+  if columns & ENDPOINT_COLUMNS:
+    raise ValueError("Relationship endpoints can not be changed with a bulk "
+                     "update, relationship_neighbors would not be updated")
+
+
 class Relatable(object):
 
   @declared_attr
@@ -5,8 +5,6 @@
 
 from sqlalchemy import and_
 from sqlalchemy import sql
-from sqlalchemy import union
-from sqlalchemy.orm import aliased
 
 from ggrc import db
 from ggrc.extensions import get_extension_modules
@@ -15,6 +13,7 @@ from ggrc.models import Audit
 from ggrc.models import Snapshot
 from ggrc.models import all_models
 from ggrc.models.relationship import Relationship
+from ggrc.models.relationship import RelationshipNeighbor
 from ggrc.snapshotter.rules import Types
 
 
@@ -162,6 +161,8 @@ def _array_union(queries):
   clean_queries = [q for q in queries if q]
   if not clean_queries:
     return db.session.query(Relationship.source_id).filter(sql.false())
+  if len(clean_queries) == 1:
+    return clean_queries[0]
 
   query = clean_queries.pop()
   return query.union(*clean_queries)
@@ -170,71 +171,31 @@ def _array_union(queries):
 def _assessment_object_mappings(object_type, related_type, related_ids):
   """Get Object ids for audit scope objects and snapshotted objects."""
 
+  neighbor = RelationshipNeighbor
   if object_type in Types.scoped and related_type in Types.all:
-
-    source_query = db.session.query(
-        Relationship.destination_id.label("result_id"),
-        Relationship.destination_type,
-        Snapshot.child_id,
-        Snapshot.child_type,
-    ).join(
-        Snapshot,
-        and_(
-            Relationship.source_id == Snapshot.id,
-            Relationship.source_type == Snapshot.__name__,
-            Relationship.destination_type == object_type,
-            Snapshot.child_type == related_type,
-            Snapshot.child_id.in_(related_ids),
-        )
-    )
-
-    destination_query = db.session.query(
-        Relationship.source_id.label("result_id"),
-        Relationship.source_type,
-        Snapshot.child_id,
-        Snapshot.child_type,
-    ).join(
+    query = db.session.query(neighbor.related_id).join(
         Snapshot,
         and_(
-            Relationship.destination_id == Snapshot.id,
-            Relationship.destination_type == Snapshot.__name__,
-            Relationship.source_type == object_type,
-            Snapshot.child_type == related_type,
-            Snapshot.child_id.in_(related_ids),
+            neighbor.object_type == Snapshot.__name__,
+            neighbor.object_id == Snapshot.id,
         )
+    ).filter(
+        neighbor.related_type == object_type,
+        Snapshot.child_type == related_type,
+        Snapshot.child_id.in_(related_ids),
     )
 
   elif object_type in Types.all and related_type in Types.scoped:
-    source_query = db.session.query(
-        Relationship.destination_id,
-        Relationship.destination_type,
-        Snapshot.child_id.label("result_id"),
-        Snapshot.child_type,
-    ).join(
-        Snapshot,
+    query = db.session.query(Snapshot.child_id).join(
+        neighbor,
         and_(
-            Relationship.source_id == Snapshot.id,
-            Relationship.source_type == Snapshot.__name__,
-            Relationship.destination_type == related_type,
-            Relationship.destination_id.in_(related_ids),
-            Snapshot.child_type == object_type,
-        )
-    )
-
-    destination_query = db.session.query(
-        Relationship.source_id,
-        Relationship.source_type,
-        Snapshot.child_id.label("result_id"),
-        Snapshot.child_type,
-    ).join(
-        Snapshot,
-        and_(
-            Relationship.destination_id == Snapshot.id,
-            Relationship.destination_type == Snapshot.__name__,
-            Relationship.source_type == related_type,
-            Relationship.source_id.in_(related_ids),
-            Snapshot.child_type == object_type,
+            neighbor.related_type == Snapshot.__name__,
+            neighbor.related_id == Snapshot.id,
         )
+    ).filter(
+        neighbor.object_type == related_type,
+        neighbor.object_id.in_(related_ids),
+        Snapshot.child_type == object_type,
     )
 
   else:
@@ -243,9 +204,7 @@ def _assessment_object_mappings(object_type, related_type, related_ids):
         "object types: '{}' - '{}'".format(object_type, related_type)
     )
 
-  query = aliased(union(source_query, destination_query))
-
-  return db.session.query(query.c.result_id)
+  return query
 
 
 def _parent_object_mappings(object_type, related_type, related_ids):
@@ -295,22 +254,8 @@ def get_ids_related_to(object_type, related_type, related_ids=None):
     return _parent_object_mappings(
         object_type, related_type, related_ids)
 
-  destination_ids = db.session.query(Relationship.destination_id).filter(
-      and_(
-          Relationship.destination_type == object_type,
-          Relationship.source_type == related_type,
-          Relationship.source_id.in_(related_ids),
-      )
-  )
-  source_ids = db.session.query(Relationship.source_id).filter(
-      and_(
-          Relationship.source_type == object_type,
-          Relationship.destination_type == related_type,
-          Relationship.destination_id.in_(related_ids),
-      )
-  )
-
-  queries = [destination_ids, source_ids]
+  queries = [RelationshipNeighbor.get_related_ids(
+      object_type, related_type, related_ids)]
   queries.extend(get_extension_mappings(
       object_type, related_type, related_ids))
   queries.extend(get_special_mappings(
@@ -307,6 +307,15 @@ def _insert_program_relationships(relationship_stubs):
           for relationship_stub in relationship_stubs
       ])
   )
+  rel = relationship.Relationship
+  relationship.RelationshipNeighbor.insert_for(
+      tuple_(rel.source_type, rel.source_id,
+             rel.destination_type, rel.destination_id).in_([
+                 (stub.source_type, stub.source_id,
+                  stub.destination_type, stub.destination_id)
+                 for stub in relationship_stubs
+             ])
+  )
 
 
 def _set_latest_revisions(objects):
@@ -110,6 +110,10 @@ def delete_resources_for(resource_type):
   """All resources in which the user has delete permission."""
   return permissions_for(get_user()).delete_resources_for(resource_type)
 
+def permissions_version():
+  """Identifier of the current permissions of the user or None if unknown."""
+  return permissions_for(get_user()).permissions_version()
+
 def is_allowed_view_object_page_for(instance):
   """Whether or not the user is allwoed to access the object page view for the
   given instance.
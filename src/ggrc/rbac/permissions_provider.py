@@ -3,6 +3,7 @@
 
 from collections import namedtuple
 from flask import g
+from flask import has_app_context
 from flask.ext.login import current_user
 from .user_permissions import UserPermissions
 from ggrc.app import db
@@ -152,6 +153,100 @@ def has_changed_condition(instance, property_name, prevent_if=None, **_):
       property_name, False).has_changes()
 
 
+class CompiledPermissions(object):
+  """Permissions of a user compiled into sets for membership checks.
+
+  Permissions are loaded as nested dicts of lists. The contexts and resources
+  of every (action, resource type) pair are turned into sets on first use, so
+  checking many objects of a type does not scan the lists again.
+  """
+
+  ADMIN_ACTION = '__GGRC_ADMIN__'
+  ALL_TYPES = '__GGRC_ALL__'
+
+  def __init__(self, permissions):
+    self.permissions = permissions
+    self._contexts = {}
+    self._resources = {}
+    self._rules = {}
+
+  def contexts(self, action, resource_type):
+    """Set of contexts of the action on the resource type"""
+    key = (action, resource_type)
+    if key not in self._contexts:
+      self._contexts[key] = frozenset(
+          (self.permissions or {}).get(action, {})
+          .get(resource_type, {})
+          .get('contexts', ()))
+    return self._contexts[key]
+
+  def resources(self, action, resource_type):
+    """Set of resource ids of the action on the resource type"""
+    key = (action, resource_type)
+    if key not in self._resources:
+      self._resources[key] = frozenset(
+          (self.permissions or {}).get(action, {})
+          .get(resource_type, {})
+          .get('resources', ()))
+    return self._resources[key]
+
+  def _rule(self, action, resource_type):
+    """Get the sets deciding whether the action is allowed on a resource.
+
+    Returns:
+      None if the action is allowed on all resources of the type, otherwise
+      a tuple of allowed resource ids, allowed contexts and whether any
+      context other than None and 0 is allowed.
+    """
+    key = (action, resource_type)
+    if key not in self._rules:
+      admin_contexts = self.contexts(self.ADMIN_ACTION, self.ALL_TYPES)
+      contexts = self.contexts(action, resource_type)
+      all_types_contexts = self.contexts(action, self.ALL_TYPES)
+      if (None in admin_contexts or 0 in admin_contexts or
+              None in self.resources(self.ADMIN_ACTION, self.ALL_TYPES) or
+              None in contexts):
+        rule = None
+      else:
+        rule = (
+            self.resources(action, resource_type),
+            contexts | all_types_contexts | admin_contexts,
+            None in all_types_contexts and resource_type != '/admin',
+        )
+      self._rules[key] = rule
+    return self._rules[key]
+
+  def is_allowed(self, action, resource_type, resource_id, context_id):
+    """Whether the action is allowed on the resource"""
+    rule = self._rule(action, resource_type)
+    if rule is None:
+      return True
+    resources, contexts, any_context = rule
+    return (resource_id in resources or context_id in contexts or
+            bool(any_context and context_id))
+
+  def filter_allowed(self, action, resource_type, keys):
+    """Get (resource id, context id) pairs the action is allowed on"""
+    rule = self._rule(action, resource_type)
+    if rule is None:
+      return set(keys)
+    resources, contexts, any_context = rule
+    return {key for key in keys
+            if key[0] in resources or key[1] in contexts or
+            any_context and key[1]}
+
+
+def compile_permissions(permissions):
+  """Get compiled permissions, shared by all checks of a request"""
+  if not has_app_context():
+    return CompiledPermissions(permissions)
+  compiled = getattr(g, '_compiled_permissions', None)
+  if compiled is None or compiled.permissions is not permissions:
+    compiled = CompiledPermissions(permissions)
+    g._compiled_permissions = compiled  # pylint: disable=protected-access
+  return compiled
+
+
 """
 All functions with a signature
 
@@ -188,28 +283,16 @@ class DefaultUserPermissions(UserPermissions):
 
   def _permission_match(self, permission, permissions):
     """Check if the user has the given permission"""
-
-    if None in \
-        permissions\
-            .get(permission.action, {})\
-            .get(permission.resource_type, {})\
-            .get('contexts', []):
+    compiled = compile_permissions(permissions)
+    contexts = compiled.contexts(permission.action, permission.resource_type)
+    if None in contexts:
       return True
     return \
-        permission.resource_id in permissions\
-        .get(permission.action, {})\
-        .get(permission.resource_type, {})\
-        .get('resources', [])\
-        or permission.context_id in \
-        permissions\
-        .get(permission.action, {})\
-        .get(permission.resource_type, {})\
-        .get('contexts', [])\
-        or permission.context_id in \
-        permissions\
-        .get(permission.action, {})\
-        .get(self.ADMIN_PERMISSION.resource_type, {})\
-        .get('contexts', [])
+        permission.resource_id in compiled.resources(
+            permission.action, permission.resource_type) \
+        or permission.context_id in contexts \
+        or permission.context_id in compiled.contexts(
+            permission.action, self.ADMIN_PERMISSION.resource_type)
 
   @staticmethod
   def _permissions():
@@ -217,18 +300,9 @@ class DefaultUserPermissions(UserPermissions):
     return getattr(g, '_request_permissions', {})
 
   def _is_allowed(self, permission):
-    permissions = self._permissions()
-    if permission.resource_type != '/admin' \
-       and permission.context_id \
-       and self._is_allowed(permission._replace(context_id=None)):
-      return True
-    if self._permission_match(permission, permissions):
-      return True
-    if self._permission_match(self.ADMIN_PERMISSION, permissions):
-      return True
-    return self._permission_match(
-        self._admin_permission_for_context(permission.context_id),
-        permissions)
+    return compile_permissions(self._permissions()).is_allowed(
+        permission.action, permission.resource_type, permission.resource_id,
+        permission.context_id)
 
   @staticmethod
   def _check_conditions(instance, action, conditions):
@@ -254,14 +328,10 @@ class DefaultUserPermissions(UserPermissions):
     if (not permissions.get(action) or
        not permissions[action].get(instance._inflector.model_singular)):
       return False
-    resources = self._permissions()\
-        .setdefault(action, {})\
-        .setdefault(instance._inflector.model_singular, {})\
-        .setdefault('resources', [])
-    contexts = self._permissions()\
-        .setdefault(action, {})\
-        .setdefault(instance._inflector.model_singular, {})\
-        .setdefault('contexts', [])
+    compiled = compile_permissions(permissions)
+    resources = compiled.resources(action,
+                                   instance._inflector.model_singular)
+    contexts = compiled.contexts(action, instance._inflector.model_singular)
     # We can't use instance.context_id, because it requires the
     # object <-> context mapping to be created,
     # which isn't the case when creating objects
@@ -307,6 +377,12 @@ class DefaultUserPermissions(UserPermissions):
     """Whether or not the user is allowed to read the given instance"""
     return self._is_allowed_for(instance, 'read')
 
+  def filter_allowed_read(self, resource_type, keys):
+    """Get the (resource_id, context_id) pairs of resources of the specified
+    type the user is allowed to read."""
+    return compile_permissions(self._permissions()).filter_allowed(
+        'read', resource_type, keys)
+
   def is_allowed_update(self, resource_type, resource_id, context_id):
     """Whether or not the user is allowed to update a resource of the specified
     type in the context."""
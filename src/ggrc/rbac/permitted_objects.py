@@ -0,0 +1,208 @@
+# Copyright (C) 2017 Google Inc.
+# Licensed under http://www.apache.org/licenses/LICENSE-2.0 <see LICENSE file>
+
+"""Materialized sets of objects a user can read through resource permissions.
+
+Besides context permissions, users get read access to single objects through
+ownership, assignments, relationships and access control lists. These
+resources are turned into `id IN (...)` predicates, which grow with the number
+of objects a user works with and get rebuilt for every search and query.
+
+The resources are instead stored as (person_id, object_type, object_id) rows
+in the permitted_objects table and queries filter them with an indexed EXISTS
+lookup. The permitted_object_sets table holds a fingerprint of the stored
+resources of each user. Any role, ACL or relationship change invalidates the
+cached user permissions, so when the freshly loaded resources no longer match
+the fingerprint, only the difference is written to the table.
+
+Cached permissions have a version which changes with every invalidation and
+is used as the fingerprint. Requests with unchanged permissions then only
+compare it with the stored one, without collecting the resources of all
+models.
+"""
+
+import hashlib
+import logging
+
+from flask import g
+from flask import has_request_context
+from sqlalchemy import and_
+from sqlalchemy import exc
+from sqlalchemy.sql import exists
+from sqlalchemy.sql import false
+from sqlalchemy.sql import select
+from sqlalchemy.sql import tuple_
+
+from ggrc import db
+from ggrc import settings
+from ggrc.models import all_models
+from ggrc.rbac import permissions
+
+
+logger = logging.getLogger(__name__)  # pylint: disable=invalid-name
+
+
+class PermittedObject(db.Model):
+  """Object readable by a user through resource permissions."""
+  # pylint: disable=too-few-public-methods
+  __tablename__ = "permitted_objects"
+
+  person_id = db.Column(db.Integer, primary_key=True, autoincrement=False)
+  object_type = db.Column(db.String(250), primary_key=True)
+  object_id = db.Column(db.Integer, primary_key=True, autoincrement=False)
+
+
+class PermittedObjectSet(db.Model):
+  """Fingerprint of the permitted objects stored for a user."""
+  # pylint: disable=too-few-public-methods
+  __tablename__ = "permitted_object_sets"
+
+  person_id = db.Column(db.Integer, primary_key=True, autoincrement=False)
+  fingerprint = db.Column(db.String(40), nullable=False)
+
+
+def get_read_resources():
+  """Get set of (type, id) pairs the current user can read as resources."""
+  resources = set()
+  for model in all_models.all_models:
+    model_name = model.__name__
+    for resource_id in permissions.read_resources_for(model_name) or []:
+      resources.add((model_name, int(resource_id)))
+  return resources
+
+
+def get_fingerprint(resources):
+  """Get a fingerprint of a set of (type, id) pairs."""
+  return hashlib.sha1(repr(sorted(resources))).hexdigest()
+
+
+def _write_resources(person_id, resources, fingerprint):
+  """Write the difference between stored and new resources of a user."""
+  table = PermittedObject.__table__
+  sets_table = PermittedObjectSet.__table__
+  with db.engine.begin() as connection:
+    stored = {
+        (object_type, object_id)
+        for object_type, object_id in connection.execute(
+            select([table.c.object_type, table.c.object_id]).where(
+                table.c.person_id == person_id))
+    }
+    removed = stored - resources
+    added = resources - stored
+    if removed:
+      connection.execute(table.delete().where(
+          table.c.person_id == person_id
+      ).where(
+          tuple_(table.c.object_type, table.c.object_id).in_(list(removed))
+      ))
+    if added:
+      connection.execute(table.insert(), [
+          {"person_id": person_id, "object_type": object_type,
+           "object_id": object_id}
+          for object_type, object_id in added
+      ])
+    connection.execute(sets_table.delete().where(
+        sets_table.c.person_id == person_id))
+    connection.execute(sets_table.insert().values(
+        person_id=person_id, fingerprint=fingerprint))
+  return len(added), len(removed)
+
+
+def _get_stored_fingerprint(person_id):
+  """Get the fingerprint of the stored permitted objects of a user."""
+  return db.session.query(
+      PermittedObjectSet.fingerprint
+  ).filter(
+      PermittedObjectSet.person_id == person_id
+  ).scalar()
+
+
+def _update(person_id, resources, fingerprint):
+  """Write new resources of a user.
+
+  Returns:
+    False as the current session can't use the written objects.
+  """
+  try:
+    added, removed = _write_resources(person_id, resources, fingerprint)
+  except exc.SQLAlchemyError:
+    # Concurrent requests of the same user can update the same rows.
+    logger.exception("Failed to update permitted objects of user %s",
+                     person_id)
+    return False
+  logger.info("Updated permitted objects of user %s: %s added, %s removed",
+              person_id, added, removed)
+  return False
+
+
+def refresh(person_id, resources, fingerprint=None):
+  """Make sure the permitted objects of a user match the given resources.
+
+  The table is written in a separate transaction, which the snapshot of the
+  current session might not see yet.
+
+  Args:
+    person_id: id of the user.
+    resources: set of (type, id) pairs the user can read as resources.
+    fingerprint: identifier of the resources, a hash of them by default.
+
+  Returns:
+    True if the stored permitted objects can be used in the current session.
+  """
+  if fingerprint is None:
+    fingerprint = get_fingerprint(resources)
+  if _get_stored_fingerprint(person_id) == fingerprint:
+    return True
+  return _update(person_id, resources, fingerprint)
+
+
+def _is_materialized():
+  """Check if the current user's permitted objects are stored and current."""
+  user = permissions.get_user()
+  if user is None or user.is_anonymous():
+    return False
+  version = permissions.permissions_version()
+  if version is None:
+    resources = get_read_resources()
+    if len(resources) < settings.PERMITTED_OBJECTS_MIN_RESOURCES:
+      return False
+    return refresh(user.id, resources)
+  if _get_stored_fingerprint(user.id) == version:
+    # Only resources of enough objects get stored with a version.
+    return True
+  resources = get_read_resources()
+  if len(resources) < settings.PERMITTED_OBJECTS_MIN_RESOURCES:
+    return False
+  return _update(user.id, resources, version)
+
+
+def is_materialized():
+  """Check once per request if the permitted objects table can be used."""
+  if not has_request_context():
+    return _is_materialized()
+  if getattr(g, "_permitted_objects_materialized", None) is None:
+    setattr(g, "_permitted_objects_materialized", _is_materialized())
+  return getattr(g, "_permitted_objects_materialized")
+
+
+def get_resource_filter(model_name, id_column, resources):
+  """Get filter for objects the current user can read as resources.
+
+  Args:
+    model_name: name of the filtered model.
+    id_column: column with the ids of the filtered objects.
+    resources: read resources of the current user for model_name.
+
+  Returns:
+    EXISTS lookup in the permitted objects table if it holds the current
+    resources and `id_column IN resources` otherwise.
+  """
+  if not resources:
+    return false()
+  if not is_materialized():
+    return id_column.in_(resources)
+  return exists().where(and_(
+      PermittedObject.person_id == permissions.get_user().id,
+      PermittedObject.object_type == model_name,
+      PermittedObject.object_id == id_column,
+  ))
@@ -23,6 +23,21 @@ class UserPermissions(object):
     """
     raise NotImplementedError()
 
+  def filter_allowed_read(self, resource_type, keys):
+    """Get the subset of (resource_id, context_id) pairs of resources of the
+    specified type the user is allowed to read. Implementations can check
+    all pairs at once instead of calling ``is_allowed_read`` for each.
+    """
+    return {key for key in keys
+            if self.is_allowed_read(resource_type, key[0], key[1])}
+
+  def permissions_version(self):
+    """Identifier of the loaded permissions which changes whenever they might
+    change, or None if the implementation can't tell. Permissions with the
+    same version grant the same contexts and resources.
+    """
+    return None
+
   def is_allowed_update(self, resource_type, resource_id, context_id):
     """Whether or not the user is allowed to update a resource of the specified
     type in the context."""
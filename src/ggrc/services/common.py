@@ -56,9 +56,13 @@ def get_oauth_credentials():
 
 
 def _get_cache_manager():
-  from ggrc.cache import CacheManager, MemCache
+  from ggrc.cache import CacheManager, MemCache, TieredCache, get_local_cache
+  cache = MemCache()
+  local_cache = get_local_cache()
+  if local_cache is not None:
+    cache = TieredCache(local_cache, cache)
   cache_manager = CacheManager()
-  cache_manager.initialize(MemCache())
+  cache_manager.initialize(cache)
   return cache_manager
 
 
@@ -189,6 +193,14 @@ def update_memcache_before_commit(context, modified_objects, expiry_time):
 
   context.cache_manager = _get_cache_manager()
 
+  if modified_objects is None:
+    context.cache_manager.marked_permission_changes = None
+  else:
+    context.cache_manager.marked_permission_changes = \
+        get_permission_changes(itertools.chain(modified_objects.new,
+                                               modified_objects.deleted),
+                               modified_objects.dirty)
+
   if modified_objects is not None:
     if len(modified_objects.new) > 0:
       memcache_mark_for_deletion(context, modified_objects.new.items())
@@ -260,7 +272,7 @@ def update_memcache_after_commit(context):
     if delete_result is not True:
       logger.error("CACHE: Failed to remove status entries from cache")
 
-  clear_permission_cache()
+  clear_permission_cache(cache_manager.marked_permission_changes)
   cache_manager.clear_cache()
 
 
@@ -416,15 +428,35 @@ def log_event(session, obj=None, current_user_id=None, flush=True,
   return event
 
 
-def clear_permission_cache():
+def get_permission_changes(objects, updated=()):
+  """Get cached permission fragments invalidated by changed objects
+
+  Args:
+    objects: model instances created or deleted in the session, read before
+             commit
+    updated: model instances updated in the session
+  Returns:
+    set of (fragment name, user id) pairs
+  """
+  from ggrc_basic_permissions import permissions_cache
+  return permissions_cache.get_changes(objects, updated)
+
+
+def clear_permission_cache(changes=None):
+  """Invalidate cached permissions
+
+  Args:
+    changes: fragments returned by get_permission_changes, cached
+             permissions of all users are invalidated if None
+  """
   if not getattr(settings, 'MEMCACHE_MECHANISM', False):
     return
+  from ggrc_basic_permissions import permissions_cache
   cache = _get_cache_manager().cache_object.memcache_client
-  cached_keys_set = cache.get('permissions:list') or set()
-  cached_keys_set.add('permissions:list')
-  # We delete all the cached user permissions as well as
-  # the permissions:list value itself
-  cache.delete_multi(cached_keys_set)
+  if changes is None:
+    permissions_cache.invalidate_all(cache)
+  else:
+    permissions_cache.invalidate(cache, changes)
 
 
 class ModelView(View):
@@ -1077,15 +1109,17 @@ class Resource(ModelView):
       with benchmark("Serialize collection"):
         collection = self.build_collection_representation(
             objs, extras=extras)
+        collection_etag = chunks_etag(self.iter_collection_json(collection))
 
       if 'If-None-Match' in self.request.headers and \
-         self.request.headers['If-None-Match'] == etag(collection):
+         self.request.headers['If-None-Match'] == collection_etag:
         return current_app.make_response((
-            '', 304, [('Etag', etag(collection))]))
+            '', 304, [('Etag', collection_etag)]))
 
       with benchmark("Make response"):
-        return self.json_success_response(
-            collection, self.collection_last_modified(), cache_op=cache_op)
+        return self.json_streaming_response(
+            self.iter_collection_json(collection), collection_etag,
+            self.collection_last_modified(), cache_op=cache_op)
 
   def get_resources_from_cache(self, matches):
     """Get resources from cache for specified matches"""
@@ -1095,47 +1129,50 @@ class Resource(ModelView):
     # invalidation logic so we have to disabling memcache.
     if self.model.__name__ == 'BackgroundTask':
       return resources
-    # Skip right to memcache
-    memcache_client = self.request.cache_manager.cache_object.memcache_client
+    cache_object = self.request.cache_manager.cache_object
+    memcache_client = self._get_batched_memcache_client()
     key_matches = {}
-    keys = []
     for match in matches:
       key = get_cache_key(None, id=match[0], type=match[1])
       key_matches[key] = match
-      keys.append(key)
-    while len(keys) > 0:
-      slice_keys = keys[:32]
-      keys = keys[32:]
-      result = memcache_client.get_multi(slice_keys)
-      for key in result:
-        if 'selfLink' in result[key]:
-          resources[key_matches[key]] = result[key]
+    result = cache_object.local_get_multi(key_matches.keys())
+    remote_result = memcache_client.get_multi(
+        [match_key for match_key in key_matches if match_key not in result])
+    cache_object.local_set_multi(remote_result)
+    result.update(remote_result)
+    for key in result:
+      if 'selfLink' in result[key]:
+        resources[key_matches[key]] = result[key]
     return resources
 
   def add_resources_to_cache(self, match_obj_pairs):
     """Add resources to cache if they are not blocked by DeleteOp entries"""
-    # Skip right to memcache
-    memcache_client = self.request.cache_manager.cache_object.memcache_client
+    memcache_client = self._get_batched_memcache_client()
     key_objs = {}
     key_blockers = {}
-    keys = []
     for match, obj in match_obj_pairs.items():
       key = get_cache_key(None, id=match[0], type=match[1])
-      delete_op_key = "DeleteOp:{}".format(key)
-      keys.append(key)
       key_objs[key] = obj
-      key_blockers[key] = delete_op_key
-    while len(keys) > 0:
-      slice_keys = keys[:32]
-      keys = keys[32:]
-      blocker_keys = [key_blockers[slice_key] for slice_key in slice_keys]
-      result = memcache_client.get_multi(blocker_keys)
-      # Reduce `slice_keys` to only unblocked keys
-      slice_keys = [
-          slice_key for slice_key in slice_keys
-          if key_blockers[slice_key] not in result]
-      memcache_client.add_multi(
-          {key: key_objs[key] for key in slice_keys})
+      key_blockers[key] = "DeleteOp:{}".format(key)
+    blockers = memcache_client.get_multi(key_blockers.values())
+    unblocked = {
+        key: obj for key, obj in key_objs.iteritems()
+        if key_blockers[key] not in blockers
+    }
+    not_added = set(memcache_client.add_multi(unblocked))
+    self.request.cache_manager.cache_object.local_set_multi({
+        key: obj for key, obj in unblocked.iteritems()
+        if key not in not_added
+    })
+
+  def _get_batched_memcache_client(self):
+    """Get memcache client of the request sending keys in parallel batches."""
+    from ggrc.cache.batching import BatchedClient
+    # Skip right to memcache
+    return BatchedClient(
+        self.request.cache_manager.cache_object.memcache_client,
+        settings.MEMCACHE_BATCH_SIZE,
+    )
 
   def json_create(self, obj, src):
     ggrc.builder.json.create(obj, src)
@@ -1528,6 +1565,25 @@ class Resource(ModelView):
       resource[collection_name].update(extras)
     return resource
 
+  def iter_collection_json(self, collection):
+    """Generate the JSON of a collection representation in parts.
+
+    Objects of the collection are encoded one at a time, so the JSON of the
+    whole collection is never held in memory.
+    """
+    table_plural = self.model._inflector.table_plural
+    (collection_name, body), = collection.items()
+    yield '{{{0}: {{'.format(as_json(collection_name))
+    for key, value in body.items():
+      if key != table_plural:
+        yield '{0}: {1}, '.format(as_json(key), as_json(value))
+    yield '{0}: ['.format(as_json(table_plural))
+    for index, obj in enumerate(body[table_plural]):
+      if index:
+        yield ', '
+      yield as_json(obj)
+    yield ']}}'
+
   def object_for_json(self, obj, model_name=None, properties_to_include=None):
     model_name = model_name or self.model._inflector.table_singular
     json_obj = ggrc.builder.json.publish(
@@ -1563,6 +1619,22 @@ class Resource(ModelView):
     return current_app.make_response(
         (self.as_json(response_object), status, headers))
 
+  def json_streaming_response(self, chunks, etag_, last_modified,
+                              cache_op=None):
+    """Make a response sending JSON generated in ``chunks``.
+
+    The etag must be computed beforehand with chunks_etag, which also
+    raises any encoding errors before the response is started.
+    """
+    headers = [
+        ('Last-Modified', self.http_timestamp(last_modified)),
+        ('Etag', etag_),
+        ('Content-Type', 'application/json'),
+    ]
+    if cache_op:
+      headers.append(('X-GGRC-Cache', cache_op))
+    return current_app.response_class(chunks, status=200, headers=headers)
+
   def getval(self, src, attr, *args):
     if args:
       return src.get(unicode(attr), *args)
@@ -1580,8 +1652,56 @@ class ReadOnlyResource(Resource):
       raise NotImplementedError()
 
 
-def filter_resource(resource, depth=0, user_permissions=None):  # noqa
+def _get_context_id(resource):
+  """Get the context id of a resource, False if it has no context."""
+  if 'context' in resource:
+    if resource['context'] is None:
+      return None
+    return resource['context']['id']
+  return resource.get('context_id', False)
+
+
+def _collect_read_keys(resource, keys):
+  """Collect (id, context_id) pairs of a resource and its sub-resources."""
+  context_id = _get_context_id(resource)
+  if context_id is not False:
+    keys[resource['type']].add((resource.get('id'), context_id))
+  for key, value in resource.items():
+    if key != 'context' and isinstance(value, dict) and 'type' in value:
+      _collect_read_keys(value, keys)
+
+
+def filter_resources(resources, user_permissions=None):
+  """
+  Returns:
+     The subset of resources which are readable based on user_permissions
+
+  Read permissions of all resources and their sub-resources are checked
+  with a single filter_allowed_read call per type.
+  """
+  if user_permissions is None:
+    user_permissions = permissions.permissions_for(get_current_user())
+
+  keys = defaultdict(set)
+  for resource in resources:
+    if isinstance(resource, dict) and 'type' in resource:
+      _collect_read_keys(resource, keys)
+  readable = {
+      resource_type: user_permissions.filter_allowed_read(resource_type,
+                                                          type_keys)
+      for resource_type, type_keys in keys.items()
+  }
+  return filter_resource(resources, user_permissions=user_permissions,
+                         readable=readable)
+
+
+def filter_resource(resource, depth=0, user_permissions=None,  # noqa
+                    readable=None):
   """
+  Args:
+    readable: readable (id, context_id) pairs by type, computed by
+              filter_resources
+
   Returns:
      The subset of resources which are readable based on user_permissions
   """
@@ -1590,23 +1710,19 @@ def filter_resource(resource, depth=0, user_permissions=None):  # noqa
     user_permissions = permissions.permissions_for(get_current_user())
 
   if isinstance(resource, (list, tuple)):
+    if readable is None:
+      return filter_resources(resource, user_permissions=user_permissions)
     filtered = []
     for sub_resource in resource:
       filtered_sub_resource = filter_resource(
-          sub_resource, depth=depth + 1, user_permissions=user_permissions)
+          sub_resource, depth=depth + 1, user_permissions=user_permissions,
+          readable=readable)
       if filtered_sub_resource is not None:
         filtered.append(filtered_sub_resource)
     return filtered
   elif isinstance(resource, dict) and 'type' in resource:
     # First check current level
-    context_id = False
-    if 'context' in resource:
-      if resource['context'] is None:
-        context_id = None
-      else:
-        context_id = resource['context']['id']
-    elif 'context_id' in resource:
-      context_id = resource['context_id']
+    context_id = _get_context_id(resource)
     assert context_id is not False, "No context found for object"
 
     # In order to avoid loading full instances and using is_allowed_read_for,
@@ -1641,6 +1757,10 @@ def filter_resource(resource, depth=0, user_permissions=None):  # noqa
       if instance is None or\
          not user_permissions.is_allowed_read_for(instance):
         return None
+    elif readable is not None:
+      if (resource['id'], context_id) not in readable.get(resource['type'],
+                                                          ()):
+        return None
     else:
       if not user_permissions.is_allowed_read(resource['type'],
                                               resource['id'], context_id):
@@ -1654,7 +1774,8 @@ def filter_resource(resource, depth=0, user_permissions=None):  # noqa
         # Apply filtering to sub-resources
         if isinstance(value, dict) and 'type' in value:
           resource[key] = filter_resource(
-              value, depth=depth + 1, user_permissions=user_permissions)
+              value, depth=depth + 1, user_permissions=user_permissions,
+              readable=readable)
 
     return resource
   else:
@@ -1681,3 +1802,11 @@ def etag(last_modified):
       the same etag due to two updates performed in rapid succession.
   """
   return '"{0}"'.format(hashlib.sha1(str(last_modified)).hexdigest())
+
+
+def chunks_etag(chunks):
+  """Generate the etag of a representation generated in chunks."""
+  digest = hashlib.sha1()
+  for chunk in chunks:
+    digest.update(chunk)
+  return '"{0}"'.format(digest.hexdigest())
@@ -9,11 +9,14 @@ from wsgiref.handlers import format_date_time
 from flask import request
 from flask import current_app
 from werkzeug.exceptions import BadRequest
+from werkzeug.exceptions import Forbidden
 
+from ggrc.converters import plan_cache
 from ggrc.converters.query_helper import BadQueryException
 from ggrc.services.query_helper import QueryAPIQueryHelper
 from ggrc.login import login_required
 from ggrc.models.inflector import get_model
+from ggrc.rbac import permissions
 from ggrc.services.common import etag
 from ggrc.utils import as_json
 
@@ -98,3 +101,14 @@ def init_query_view(app):
       return get_objects_by_query()
     except (NotImplementedError, BadQueryException) as exc:
       raise BadRequest(exc.message)
+
+  @app.route('/query/plan_cache', methods=['GET'])
+  @login_required
+  def query_plan_cache_stats():
+    """Hit and miss counters of the query plan cache."""
+    if not permissions.is_allowed_read("/admin", None, 1):
+      raise Forbidden()
+    return current_app.make_response((
+        as_json(plan_cache.get_stats()), 200,
+        [('Content-Type', 'application/json')],
+    ))
@@ -70,6 +70,25 @@ SECRET_KEY = os.environ.get('GGRC_SECRET_KEY', 'Replace-with-something-secret')
 
 MEMCACHE_MECHANISM = True
 
+# Backend providing memcache clients, App Engine memcache when not set.
+# Use ggrc.cache.backends.MemcachedBackend with MEMCACHED_SERVERS off App
+# Engine, or ggrc.cache.backends.InProcessBackend for a single process.
+CACHE_BACKEND = os.environ.get("GGRC_CACHE_BACKEND")
+MEMCACHED_SERVERS = os.environ.get(
+    "GGRC_MEMCACHED_SERVERS", "127.0.0.1:11211").split(",")
+
+# Number of keys sent in one memcache RPC when caching collections.
+MEMCACHE_BATCH_SIZE = int(os.environ.get("GGRC_MEMCACHE_BATCH_SIZE", "250"))
+
+# Bounds of the in-process cache in front of memcache. Other instances do not
+# invalidate it, so entries expire after LOCAL_CACHE_TTL seconds. The cache is
+# disabled when LOCAL_CACHE_MAX_ENTRIES is 0.
+LOCAL_CACHE_MAX_ENTRIES = int(
+    os.environ.get("GGRC_LOCAL_CACHE_MAX_ENTRIES", "0"))
+LOCAL_CACHE_MAX_BYTES = int(
+    os.environ.get("GGRC_LOCAL_CACHE_MAX_BYTES", str(64 * 1024 * 1024)))
+LOCAL_CACHE_TTL = int(os.environ.get("GGRC_LOCAL_CACHE_TTL", "10"))
+
 # AppEngine Email
 APPENGINE_EMAIL = os.environ.get('APPENGINE_EMAIL', '')
 
@@ -93,6 +112,49 @@ USE_APP_ENGINE_ASSETS_SUBDOMAIN = False
 
 BACKGROUND_COLLECTION_POST_SLEEP = 0
 
+# Full text reindex is split into partitions of at most this many objects of
+# a single model, which are processed by REINDEX_PROCESSES worker processes.
+REINDEX_PARTITION_SIZE = int(os.environ.get("GGRC_REINDEX_PARTITION_SIZE",
+                                            "10000"))
+REINDEX_PROCESSES = int(os.environ.get("GGRC_REINDEX_PROCESSES", "1"))
+# Running partitions that were not updated for this many seconds belong to an
+# interrupted reindex and are taken over by the next one.
+REINDEX_PARTITION_TIMEOUT = int(os.environ.get(
+    "GGRC_REINDEX_PARTITION_TIMEOUT", "3600"))
+
+# Backend that matches search terms with full text records, see
+# ggrc.fulltext.search_backends. Defaults to the LIKE search backend.
+FULLTEXT_SEARCH_BACKEND = os.environ.get("GGRC_FULLTEXT_SEARCH_BACKEND")
+# Must match the ngram_token_size of the MySQL server.
+FULLTEXT_NGRAM_TOKEN_SIZE = int(
+    os.environ.get("GGRC_FULLTEXT_NGRAM_TOKEN_SIZE", "2"))
+# Seconds after which the in-process inverted index is rebuilt.
+FULLTEXT_INVERTED_INDEX_TTL = int(
+    os.environ.get("GGRC_FULLTEXT_INVERTED_INDEX_TTL", "300"))
+
+# Users with at least this many objects readable through resource
+# permissions get them stored in the permitted_objects table, which search
+# and query filters look up instead of listing all object ids.
+PERMITTED_OBJECTS_MIN_RESOURCES = int(
+    os.environ.get("GGRC_PERMITTED_OBJECTS_MIN_RESOURCES", "100"))
+
+# Number of rows committed together by asynchronous csv imports.
+IMPORT_BATCH_SIZE = int(os.environ.get("GGRC_IMPORT_BATCH_SIZE", "100"))
+
+# Number of filter expressions kept in the /query plan cache.
+QUERY_PLAN_CACHE_SIZE = int(
+    os.environ.get("GGRC_QUERY_PLAN_CACHE_SIZE", "1000"))
+
+# Seconds for which /query totals are reused when paging through results.
+QUERY_TOTAL_CACHE_TTL = int(
+    os.environ.get("GGRC_QUERY_TOTAL_CACHE_TTL", "30"))
+
+# Seconds for which the custom attributes that filters read from typed
+# tables are cached. Changes of custom attribute definitions made by this
+# process clear the cache.
+TYPED_PROPERTIES_CACHE_TTL = int(
+    os.environ.get("GGRC_TYPED_PROPERTIES_CACHE_TTL", "60"))
+
 
 LOGGING_HANDLER = {
     "class": "logging.StreamHandler",
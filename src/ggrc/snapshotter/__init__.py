@@ -8,27 +8,35 @@ snapshot object represent a join between parent object (Audit),
 child object (e.g. Control, Regulation, ...) and a particular revision.
 """
 
+from datetime import datetime
 from logging import getLogger
 
+from sqlalchemy.sql.expression import and_
 from sqlalchemy.sql.expression import tuple_
 from sqlalchemy.sql.expression import bindparam
 
 from ggrc import db
 from ggrc import models
 from ggrc.login import get_current_user_id
+from ggrc.models.relationship import RelationshipNeighbor
 from ggrc.utils import benchmark
 
 from ggrc.snapshotter.datastructures import Attr
 from ggrc.snapshotter.datastructures import Pair
 from ggrc.snapshotter.datastructures import Stub
 from ggrc.snapshotter.datastructures import OperationResponse
+from ggrc.snapshotter.helpers import LatestRevisions
+from ggrc.snapshotter.helpers import NeighborhoodCache
+from ggrc.snapshotter.helpers import RelationshipRow
+from ggrc.snapshotter.helpers import SnapshotRow
+from ggrc.snapshotter.helpers import chunks
 from ggrc.snapshotter.helpers import create_relationship_dict
 from ggrc.snapshotter.helpers import create_relationship_revision_dict
 from ggrc.snapshotter.helpers import create_snapshot_dict
 from ggrc.snapshotter.helpers import create_snapshot_revision_dict
-from ggrc.snapshotter.helpers import get_relationships
+from ggrc.snapshotter.helpers import get_relationship_ids
 from ggrc.snapshotter.helpers import get_revisions
-from ggrc.snapshotter.helpers import get_snapshots
+from ggrc.snapshotter.helpers import get_snapshot_ids
 from ggrc.snapshotter.indexer import reindex_pairs
 
 from ggrc.snapshotter.rules import get_rules
@@ -39,23 +47,48 @@ logger = getLogger(__name__)  # pylint: disable=invalid-name
 class SnapshotGenerator(object):
   """Geneate snapshots per rules of all connected objects"""
 
-  def __init__(self, dry_run):
+  def __init__(self, dry_run, neighborhood_cache=None):
     self.rules = get_rules()
 
     self.parents = set()
     self.children = set()
     self.snapshots = dict()
     self.context_cache = dict()
+    self.latest_revisions = LatestRevisions()
+    if neighborhood_cache is None:
+      neighborhood_cache = NeighborhoodCache()
+    self.neighborhood_cache = neighborhood_cache
     self.dry_run = dry_run
 
   def add_parent(self, obj):
     """Add parent object and automatically scan neighborhood for snapshottable
     objects."""
-    with benchmark("Snapshot.add_parent_object"):
-      key = Stub.from_object(obj)
-      if key not in self.parents:
-        with benchmark("Snapshot.add_parent_object.add object"):
-          objs = self._get_snapshottable_objects(obj)
+    return self.add_parents([obj])
+
+  def add_parents(self, objs):
+    """Add parent objects and scan their neighborhoods for snapshottable
+    objects.
+
+    Neighborhoods of all parents are loaded together before any parent is
+    added.
+    """
+    with benchmark("Snapshot.add_parent_objects"):
+      related_objects = {}
+      for obj in objs:
+        if Stub.from_object(obj) not in self.parents:
+          related_objects[obj] = self._get_related_objects(obj)
+
+      with benchmark("Snapshot.add_parent_objects.fetch neighborhoods"):
+        self.neighborhood_cache.load(
+            (stub, type_)
+            for obj, related in related_objects.items()
+            for stub in related
+            for type_ in self.rules.rules[obj.type]["snd"])
+
+      with benchmark("Snapshot.add_parent_objects.add objects"):
+        for obj, related in related_objects.items():
+          key = Stub.from_object(obj)
+          objs = self._fetch_neighborhood(obj, related)
           self.parents.add(key)
           self.context_cache[key] = obj.context_id
           self.children = self.children | objs
@@ -74,48 +107,16 @@ class SnapshotGenerator(object):
 
   def _fetch_neighborhood(self, parent_object, objects):
     with benchmark("Snapshot._fetch_object_neighborhood"):
-      query_pairs = set()
-
-      for obj in objects:
-        for snd_obj in self.rules.rules[parent_object.type]["snd"]:
-          query_pairs.add((obj.type, obj.id, snd_obj))
-
-      columns = db.session.query(
-          models.Relationship.source_type,
-          models.Relationship.source_id,
-          models.Relationship.destination_type,
-          models.Relationship.destination_id)
-
-      relationships = columns.filter(
-          tuple_(
-              models.Relationship.destination_type,
-              models.Relationship.destination_id,
-              models.Relationship.source_type,
-          ).in_(query_pairs)).union(
-          columns.filter(tuple_(
-              models.Relationship.source_type,
-              models.Relationship.source_id,
-              models.Relationship.destination_type,
-          ).in_(query_pairs)))
-
-      neighborhood = set()
-      for (stype, sid, dtype, did) in relationships:
-        source = Stub(stype, sid)
-        destination = Stub(dtype, did)
-
-        if source in objects:
-          neighborhood.add(destination)
-        else:
-          neighborhood.add(source)
-      return neighborhood
+      return self.neighborhood_cache.get(
+          objects, self.rules.rules[parent_object.type]["snd"])
 
-  def _get_snapshottable_objects(self, obj):
-    """Get snapshottable objects from parent object's neighborhood."""
-    with benchmark("Snapshot._get_snapshotable_objects"):
+  def _get_related_objects(self, obj):
+    """Get first degree objects of parent object per rules."""
+    with benchmark("Snapshot._get_related_objects"):
       related_mappings = set()
       object_rules = self.rules.rules[obj.type]
 
-      with benchmark("Snapshot._get_snapshotable_objects.related_mappings"):
+      with benchmark("Snapshot._get_related_objects.related_mappings"):
         relatable_rules = {
             rule for rule in object_rules["fst"]
             if isinstance(rule, basestring)
@@ -126,13 +127,18 @@ class SnapshotGenerator(object):
               rule for rule in object_rules["fst"]
               if isinstance(rule, basestring)})
 
-      with benchmark("Snapshot._get_snapshotable_objects.direct mappings"):
+      with benchmark("Snapshot._get_related_objects.direct mappings"):
         direct_mappings = {getattr(obj, rule.name)
                            for rule in object_rules["fst"]
                            if isinstance(rule, Attr)}
 
-      related_objects = {Stub.from_object(obj)
-                         for obj in related_mappings | direct_mappings}
+      return {Stub.from_object(obj)
+              for obj in related_mappings | direct_mappings}
+
+  def _get_snapshottable_objects(self, obj):
+    """Get snapshottable objects from parent object's neighborhood."""
+    with benchmark("Snapshot._get_snapshotable_objects"):
+      related_objects = self._get_related_objects(obj)
 
       with benchmark("Snapshot._get_snapshotable_objects.fetch neighborhood"):
         return self._fetch_neighborhood(obj, related_objects)
@@ -152,6 +158,8 @@ class SnapshotGenerator(object):
     """Update (or create) parent objects' snapshots and create revisions for
     them.
 
+    Snapshots are updated in chunks of CHUNK_SIZE, see _update_chunk.
+
     Args:
       event: A ggrc.models.Event instance
       revisions: A set of tuples of pairs with revisions to which it should
@@ -160,15 +168,10 @@ class SnapshotGenerator(object):
     Returns:
       OperationResponse
     """
-    # pylint: disable=too-many-locals
     with benchmark("Snapshot._update"):
       user_id = get_current_user_id()
       missed_keys = set()
-      snapshot_cache = dict()
-      modified_snapshot_keys = set()
-      data_payload_update = list()
-      revision_payload = list()
-      response_data = dict()
+      response_data = {"revisions": {"old": {}, "new": {}}}
 
       if self.dry_run and event is None:
         event_id = 0
@@ -179,80 +182,95 @@ class SnapshotGenerator(object):
         if _filter:
           for_update = {elem for elem in for_update if _filter(elem)}
 
-      with benchmark("Snapshot._update.get existing snapshots"):
-        existing_snapshots = db.session.query(
-            models.Snapshot.id,
-            models.Snapshot.revision_id,
-            models.Snapshot.parent_type,
-            models.Snapshot.parent_id,
-            models.Snapshot.child_type,
-            models.Snapshot.child_id,
-        ).filter(tuple_(
-            models.Snapshot.parent_type, models.Snapshot.parent_id,
-            models.Snapshot.child_type, models.Snapshot.child_id
-        ).in_({pair.to_4tuple() for pair in for_update}))
-
-        for esnap in existing_snapshots:
-          sid, rev_id, pair_tuple = esnap[0], esnap[1], esnap[2:]
-          pair = Pair.from_4tuple(pair_tuple)
-          snapshot_cache[pair] = (sid, rev_id)
-
       with benchmark("Snapshot._update.retrieve latest revisions"):
         revision_id_cache = get_revisions(
-            for_update,
-            filters=[models.Revision.action.in_(["created", "modified"])],
-            revisions=revisions)
-
-      response_data["revisions"] = {
-          "old": {pair: values[1] for pair, values in snapshot_cache.items()},
-          "new": revision_id_cache
-      }
-
-      with benchmark("Snapshot._update.build snapshot payload"):
-        for key in for_update:
-          if key in revision_id_cache:
-            sid, rev_id = snapshot_cache[key]
-            latest_rev = revision_id_cache[key]
-            if rev_id != latest_rev:
-              modified_snapshot_keys.add(key)
-              data_payload_update += [{
-                  "_id": sid,
-                  "_revision_id": latest_rev,
-                  "_modified_by_id": user_id
-              }]
-          else:
-            missed_keys.add(key)
+            for_update, revisions, self.latest_revisions,
+            include_deleted=False)
+      response_data["revisions"]["new"] = revision_id_cache
+
+      modified = False
+      for chunk in chunks(for_update):
+        missed_keys.update(key for key in chunk
+                           if key not in revision_id_cache)
+        old_revisions, chunk_modified = self._update_chunk(
+            chunk, revision_id_cache, event_id, user_id)
+        response_data["revisions"]["old"].update(old_revisions)
+        modified = modified or chunk_modified
 
       if missed_keys:
         logger.warning(
             "Tried to update snapshots for the following objects but "
             "found no revisions: %s", missed_keys)
 
-      if not modified_snapshot_keys:
+      if not modified:
         return OperationResponse("update", True, set(), response_data)
-
-      with benchmark("Snapshot._update.write snapshots to database"):
-        update_sql = models.Snapshot.__table__.update().where(
-            models.Snapshot.id == bindparam("_id")).values(
-            revision_id=bindparam("_revision_id"),
-            modified_by_id=bindparam("_modified_by_id"))
-        self._execute(update_sql, data_payload_update)
-
-      with benchmark("Snapshot._update.retrieve inserted snapshots"):
-        snapshots = get_snapshots(modified_snapshot_keys)
-
-      with benchmark("Snapshot._update.create snapshots revision payload"):
-        for snapshot in snapshots:
-          parent = Stub(snapshot.parent_type, snapshot.parent_id)
-          context_id = self.context_cache[parent]
-          data = create_snapshot_revision_dict("modified", event_id, snapshot,
-                                               user_id, context_id)
-          revision_payload += [data]
-
-      with benchmark("Insert Snapshot entries into Revision"):
-        self._execute(models.Revision.__table__.insert(), revision_payload)
       return OperationResponse("update", True, for_update, response_data)
 
+  def _update_chunk(self, pairs, revision_id_cache, event_id, user_id):
+    """Point snapshots of pairs to their latest revisions.
+
+    Revision payloads are built from the existing snapshots read before the
+    update, so updated snapshots are not read again.
+
+    Returns:
+      old revision ids of the snapshots by pair and whether any snapshot
+      was modified
+    """
+    with benchmark("Snapshot._update_chunk.get existing snapshots"):
+      existing_snapshots = db.session.query(
+          models.Snapshot.id,
+          models.Snapshot.context_id,
+          models.Snapshot.created_at,
+          models.Snapshot.revision_id,
+          models.Snapshot.parent_type,
+          models.Snapshot.parent_id,
+          models.Snapshot.child_type,
+          models.Snapshot.child_id,
+      ).filter(tuple_(
+          models.Snapshot.parent_type, models.Snapshot.parent_id,
+          models.Snapshot.child_type, models.Snapshot.child_id
+      ).in_([pair.to_4tuple() for pair in pairs]))
+
+    old_revisions = {}
+    data_payload_update = []
+    revision_payload = []
+    now = datetime.now().replace(microsecond=0)
+    with benchmark("Snapshot._update_chunk.build payloads"):
+      for esnap in existing_snapshots:
+        pair = Pair.from_4tuple(esnap[4:])
+        old_revisions[pair] = esnap.revision_id
+        latest_rev = revision_id_cache.get(pair)
+        if latest_rev is None or latest_rev == esnap.revision_id:
+          continue
+        data_payload_update.append({
+            "_id": esnap.id,
+            "_revision_id": latest_rev,
+            "_modified_by_id": user_id,
+            "_updated_at": now,
+        })
+        snapshot = SnapshotRow(
+            esnap.id, esnap.context_id, esnap.created_at, now,
+            esnap.parent_type, esnap.parent_id, esnap.child_type,
+            esnap.child_id, latest_rev, user_id)
+        revision_payload.append(create_snapshot_revision_dict(
+            "modified", event_id, snapshot, user_id,
+            self.context_cache[pair.parent]))
+
+    if not data_payload_update:
+      return old_revisions, False
+
+    with benchmark("Snapshot._update_chunk.write snapshots to database"):
+      update_sql = models.Snapshot.__table__.update().where(
+          models.Snapshot.id == bindparam("_id")).values(
+          revision_id=bindparam("_revision_id"),
+          modified_by_id=bindparam("_modified_by_id"),
+          updated_at=bindparam("_updated_at"))
+      self._execute(update_sql, data_payload_update)
+
+    with benchmark("Snapshot._update_chunk.write revisions to database"):
+      self._execute(models.Revision.__table__.insert(), revision_payload)
+    return old_revisions, True
+
   def analyze(self):
     """Analyze which snapshots need to be updated and which created"""
     query = set(db.session.query(
@@ -346,6 +364,8 @@ class SnapshotGenerator(object):
     """Create snapshots of parent objects neighhood and create revisions for
     snapshots.
 
+    Snapshots are created in chunks of CHUNK_SIZE, see _create_chunk.
+
     Args:
       event: A ggrc.models.Event instance
       revisions: A set of tuples of pairs with revisions to which it should
@@ -354,14 +374,9 @@ class SnapshotGenerator(object):
     Returns:
       OperationResponse
     """
-    # pylint: disable=too-many-locals,too-many-statements
     with benchmark("Snapshot._create"):
       with benchmark("Snapshot._create init"):
         user_id = get_current_user_id()
-        missed_keys = set()
-        data_payload = list()
-        revision_payload = list()
-        relationship_payload = list()
         response_data = dict()
 
         if self.dry_run and event is None:
@@ -374,73 +389,79 @@ class SnapshotGenerator(object):
           for_create = {elem for elem in for_create if _filter(elem)}
 
       with benchmark("Snapshot._create._get_revisions"):
-        revision_id_cache = get_revisions(for_create, revisions)
+        revision_id_cache = get_revisions(for_create, revisions,
+                                          self.latest_revisions)
 
       response_data["revisions"] = revision_id_cache
 
-      with benchmark("Snapshot._create.create payload"):
-        for pair in for_create:
-          if pair in revision_id_cache:
-            revision_id = revision_id_cache[pair]
-            context_id = self.context_cache[pair.parent]
-            data = create_snapshot_dict(pair, revision_id, user_id, context_id)
-            data_payload += [data]
-          else:
-            missed_keys.add(pair)
-
+      missed_keys = {pair for pair in for_create
+                     if pair not in revision_id_cache}
       if missed_keys:
         logger.warning(
             "Tried to create snapshots for the following objects but "
             "found no revisions: %s", missed_keys)
 
-      with benchmark("Snapshot._create.write to database"):
-        self._execute(
-            models.Snapshot.__table__.insert(),
-            data_payload)
-
-      with benchmark("Snapshot._create.retrieve inserted snapshots"):
-        snapshots = get_snapshots(for_create)
-
-      with benchmark("Snapshot._create.create parent object -> snapshot rels"):
-        for snapshot in snapshots:
-          parent = Stub(snapshot.parent_type, snapshot.parent_id)
-          base = Stub(snapshot.child_type, snapshot.child_id)
-          relationship = create_relationship_dict(
-              parent, base, user_id, self.context_cache[parent])
-          relationship_payload += [relationship]
-
-      with benchmark("Snapshot._create.write relationships to database"):
-        self._execute(models.Relationship.__table__.insert(),
-                      relationship_payload)
-
-      with benchmark("Snapshot._create.get created relationships"):
-        created_relationships = {
-            (rel["source_type"], rel["source_id"],
-             rel["destination_type"], rel["destination_id"])
-            for rel in relationship_payload}
-        relationships = get_relationships(created_relationships)
-
-      with benchmark("Snapshot._create.create revision payload"):
-        with benchmark("Snapshot._create.create snapshots revision payload"):
-          for snapshot in snapshots:
-            parent = Stub(snapshot.parent_type, snapshot.parent_id)
-            context_id = self.context_cache[parent]
-            data = create_snapshot_revision_dict("created", event_id, snapshot,
-                                                 user_id, context_id)
-            revision_payload += [data]
-
-        with benchmark("Snapshot._create.create rel revision payload"):
-          for relationship in relationships:
-            parent = Stub(relationship.source_type, relationship.source_id)
-            context_id = self.context_cache[parent]
-            data = create_relationship_revision_dict(
-                "created", event_id, relationship, user_id, context_id)
-            revision_payload += [data]
-
-      with benchmark("Snapshot._create.write revisions to database"):
-        self._execute(models.Revision.__table__.insert(), revision_payload)
+      if not self.dry_run:
+        for chunk in chunks(pair for pair in for_create
+                            if pair in revision_id_cache):
+          self._create_chunk(chunk, revision_id_cache, event_id, user_id)
       return OperationResponse("create", True, for_create, response_data)
 
+  def _create_chunk(self, pairs, revision_id_cache, event_id, user_id):
+    """Create snapshots of pairs, their relationships and revisions.
+
+    Only ids of the inserted rows are read back, all other values of the
+    revision payloads come from the inserted payloads.
+    """
+    # pylint: disable=too-many-locals
+    now = datetime.now().replace(microsecond=0)
+    with benchmark("Snapshot._create_chunk.create payload"):
+      data_payload = []
+      relationship_payload = []
+      for pair in pairs:
+        context_id = self.context_cache[pair.parent]
+        data = create_snapshot_dict(pair, revision_id_cache[pair], user_id,
+                                    context_id)
+        data.update(created_at=now, updated_at=now)
+        data_payload.append(data)
+        relationship = create_relationship_dict(pair.parent, pair.child,
+                                                user_id, context_id)
+        relationship.update(created_at=now, updated_at=now)
+        relationship_payload.append(relationship)
+
+    with benchmark("Snapshot._create_chunk.write to database"):
+      self._execute(models.Snapshot.__table__.insert(), data_payload)
+      self._execute(models.Relationship.__table__.insert(),
+                    relationship_payload)
+
+    with benchmark("Snapshot._create_chunk.get inserted ids"):
+      snapshot_ids = get_snapshot_ids(pairs)
+      relationship_ids = get_relationship_ids(pairs)
+
+    with benchmark("Snapshot._create_chunk.write relationship neighbors"):
+      if relationship_ids:
+        db.engine.execute(RelationshipNeighbor.get_insert(
+            models.Relationship.id.in_(relationship_ids.values())))
+
+    with benchmark("Snapshot._create_chunk.create revision payload"):
+      revision_payload = []
+      for data in data_payload:
+        pair = Pair.from_4tuple((data["parent_type"], data["parent_id"],
+                                 data["child_type"], data["child_id"]))
+        snapshot = SnapshotRow(id=snapshot_ids[pair], **data)
+        revision_payload.append(create_snapshot_revision_dict(
+            "created", event_id, snapshot, user_id, data["context_id"]))
+      for data in relationship_payload:
+        pair = Pair.from_4tuple((data["source_type"], data["source_id"],
+                                 data["destination_type"],
+                                 data["destination_id"]))
+        relationship = RelationshipRow(id=relationship_ids[pair], **data)
+        revision_payload.append(create_relationship_revision_dict(
+            "created", event_id, relationship, user_id, data["context_id"]))
+
+    with benchmark("Snapshot._create_chunk.write revisions to database"):
+      self._execute(models.Revision.__table__.insert(), revision_payload)
+
   def _copy_snapshot_relationships(self):
     """Add relationships between snapshotted objects.
 
@@ -484,42 +505,62 @@ class SnapshotGenerator(object):
           "user_id": get_current_user_id(),
           "parent_id": parent.id
       })
-
-
-def create_snapshots(objs, event, revisions=None, _filter=None, dry_run=False):
-  """Create snapshots of parent objects."""
+      snapshot_ids = db.session.query(models.Snapshot.id).filter(
+          models.Snapshot.parent_type == parent.type,
+          models.Snapshot.parent_id == parent.id,
+      )
+      RelationshipNeighbor.insert_for(and_(
+          models.Relationship.source_type == models.Snapshot.__name__,
+          models.Relationship.source_id.in_(snapshot_ids),
+          models.Relationship.destination_type == models.Snapshot.__name__,
+          models.Relationship.destination_id.in_(snapshot_ids),
+      ))
+
+
+def create_snapshots(objs, event, revisions=None, _filter=None, dry_run=False,
+                     neighborhood_cache=None):
+  """Create snapshots of parent objects.
+
+  A NeighborhoodCache can be passed to share neighborhoods with other
+  snapshot operations of the same request or job.
+  """
   # pylint: disable=unused-argument
   if not revisions:
     revisions = set()
 
   with benchmark("Snapshot.create_snapshots"):
     with benchmark("Snapshot.create_snapshots.init"):
-      generator = SnapshotGenerator(dry_run)
+      generator = SnapshotGenerator(dry_run, neighborhood_cache)
       if not isinstance(objs, set):
         objs = {objs}
       for obj in objs:
         db.session.add(obj)
-        with benchmark("Snapshot.create_snapshots.add_parent_objects"):
-          generator.add_parent(obj)
+      with benchmark("Snapshot.create_snapshots.add_parent_objects"):
+        generator.add_parents(objs)
     with benchmark("Snapshot.create_snapshots.create"):
       return generator.create(event=event,
                               revisions=revisions,
                               _filter=_filter)
 
 
-def upsert_snapshots(objs, event, revisions=None, _filter=None, dry_run=False):
-  """Update (and create if needed) snapshots of parent objects."""
+def upsert_snapshots(objs, event, revisions=None, _filter=None, dry_run=False,
+                     neighborhood_cache=None):
+  """Update (and create if needed) snapshots of parent objects.
+
+  A NeighborhoodCache can be passed to share neighborhoods with other
+  snapshot operations of the same request or job.
+  """
   # pylint: disable=unused-argument
   if not revisions:
     revisions = set()
 
   with benchmark("Snapshot.update_snapshots"):
-    generator = SnapshotGenerator(dry_run)
+    generator = SnapshotGenerator(dry_run, neighborhood_cache)
     if not isinstance(objs, set):
       objs = {objs}
     for obj in objs:
       db.session.add(obj)
-      generator.add_parent(obj)
+    generator.add_parents(objs)
     return generator.upsert(event=event, revisions=revisions, _filter=_filter)
 
 
@@ -4,12 +4,15 @@
 """Various simple helper functions for snapshot generator"""
 
 import collections
+import itertools
 from logging import getLogger
 
+from sqlalchemy import func
 from sqlalchemy.sql.expression import tuple_
 
 from ggrc import db
 from ggrc import models
+from ggrc.models.relationship import RelationshipNeighbor
 from ggrc.snapshotter.datastructures import Stub
 from ggrc.snapshotter.datastructures import Pair
 from ggrc.utils import benchmark
@@ -17,7 +20,167 @@ from ggrc.utils import benchmark
 logger = getLogger(__name__)  # pylint: disable=invalid-name
 
 
-def get_revisions(pairs, revisions, filters=None):
+# Number of objects looked up or written with a single statement.
+CHUNK_SIZE = 1000
+
+SnapshotRow = collections.namedtuple("SnapshotRow", [
+    "id", "context_id", "created_at", "updated_at", "parent_type",
+    "parent_id", "child_type", "child_id", "revision_id", "modified_by_id",
+])
+
+RelationshipRow = collections.namedtuple("RelationshipRow", [
+    "id", "modified_by_id", "created_at", "updated_at", "source_type",
+    "source_id", "destination_type", "destination_id", "context_id",
+])
+
+
+def chunks(items, chunk_size=CHUNK_SIZE):
+  """Split items into lists of at most chunk_size items."""
+  items = iter(items)
+  while True:
+    chunk = list(itertools.islice(items, chunk_size))
+    if not chunk:
+      return
+    yield chunk
+
+
+class LatestRevisions(object):
+  """Lookup table of latest revision ids of objects.
+
+  Revision ids are loaded with one grouped query per chunk of objects, which
+  is answered from the (resource_type, resource_id) index, and kept for the
+  lifetime of the table. A snapshot generator keeps one table, so objects in
+  the scope of several parents or of both creates and updates are looked up
+  once.
+  """
+
+  def __init__(self):
+    # Stub -> (latest revision id, latest created or modified revision id)
+    self._revisions = {}
+
+  def load(self, stubs):
+    """Load revision ids of objects that have not been loaded yet."""
+    missing = {stub for stub in stubs if stub not in self._revisions}
+    for chunk in chunks(missing):
+      latest = db.session.query(
+          func.max(models.Revision.id).label("id"),
+      ).filter(
+          tuple_(
+              models.Revision.resource_type,
+              models.Revision.resource_id).in_(chunk)
+      ).group_by(
+          models.Revision.resource_type,
+          models.Revision.resource_id,
+      ).subquery()
+      query = db.session.query(
+          models.Revision.id,
+          models.Revision.resource_type,
+          models.Revision.resource_id,
+          models.Revision.action,
+      ).join(latest, models.Revision.id == latest.c.id)
+
+      deleted = set()
+      for revid, restype, resid, action in query:
+        stub = Stub(restype, resid)
+        if action == "deleted":
+          self._revisions[stub] = (revid, None)
+          deleted.add(stub)
+        else:
+          self._revisions[stub] = (revid, revid)
+      if deleted:
+        self._load_not_deleted(deleted)
+      for stub in chunk:
+        self._revisions.setdefault(stub, (None, None))
+
+  def _load_not_deleted(self, stubs):
+    """Load latest created or modified revisions of deleted objects."""
+    query = db.session.query(
+        func.max(models.Revision.id),
+        models.Revision.resource_type,
+        models.Revision.resource_id,
+    ).filter(
+        tuple_(
+            models.Revision.resource_type,
+            models.Revision.resource_id).in_(stubs),
+        models.Revision.action.in_(["created", "modified"]),
+    ).group_by(
+        models.Revision.resource_type,
+        models.Revision.resource_id,
+    )
+    for revid, restype, resid in query:
+      stub = Stub(restype, resid)
+      self._revisions[stub] = (self._revisions[stub][0], revid)
+
+  def get(self, stub, include_deleted=True):
+    """Get the latest revision id of a loaded object or None."""
+    latest, latest_not_deleted = self._revisions.get(stub, (None, None))
+    return latest if include_deleted else latest_not_deleted
+
+
+class NeighborhoodCache(object):
+  """Related objects of given types, shared by snapshot generators.
+
+  Neighbors are loaded from the relationship neighbors table with one query
+  per chunk of (object, related type) keys. A cache can be passed to all
+  snapshot operations of a request or a job, so objects in the scope of many
+  parents, like the program of many audits, are looked up once. Relationships
+  created after an object was loaded are not seen, so a cache should not
+  outlive the request or job it was created for.
+  """
+
+  def __init__(self):
+    # (Stub, related type) -> set of related Stubs
+    self._neighbors = {}
+
+  def load(self, keys):
+    """Load neighbors of (object, related type) keys not loaded yet."""
+    missing = {key for key in keys if key not in self._neighbors}
+    for chunk in chunks(missing):
+      query = db.session.query(
+          RelationshipNeighbor.object_type,
+          RelationshipNeighbor.object_id,
+          RelationshipNeighbor.related_type,
+          RelationshipNeighbor.related_id,
+      ).filter(
+          tuple_(
+              RelationshipNeighbor.object_type,
+              RelationshipNeighbor.object_id,
+              RelationshipNeighbor.related_type,
+          ).in_([(stub.type, stub.id, type_) for stub, type_ in chunk])
+      )
+      for stub, type_ in chunk:
+        self._neighbors[stub, type_] = set()
+      for obj_type, obj_id, related_type, related_id in query:
+        self._neighbors[Stub(obj_type, obj_id), related_type].add(
+            Stub(related_type, related_id))
+
+  def get(self, stubs, types):
+    """Get neighbors of the given types of all stubs."""
+    self.load((stub, type_) for stub in stubs for type_ in types)
+    neighborhood = set()
+    for stub in stubs:
+      for type_ in types:
+        neighborhood |= self._neighbors[stub, type_]
+    return neighborhood
+
+
+def _get_revision_objects(revision_ids):
+  """Get objects and actions of revisions by revision id."""
+  revision_objects = {}
+  for chunk in chunks(revision_ids):
+    query = db.session.query(
+        models.Revision.id,
+        models.Revision.resource_type,
+        models.Revision.resource_id,
+        models.Revision.action,
+    ).filter(models.Revision.id.in_(chunk))
+    for revid, restype, resid, action in query:
+      revision_objects[revid] = (Stub(restype, resid), action)
+  return revision_objects
+
+
+def get_revisions(pairs, revisions, latest_revisions=None,
+                  include_deleted=True):
   """Retrieve revision ids for pairs
 
   If revisions dictionary is provided it will validate that the selected
@@ -26,122 +189,95 @@ def get_revisions(pairs, revisions, filters=None):
   Args:
     pairs: set([(parent_1, child_1), (parent_2, child_2), ...])
     revisions: dict({(parent, child): revision_id, ...})
-    filters: predicate
+    latest_revisions: LatestRevisions table to reuse
+    include_deleted: False to ignore revisions of deletions
   """
   with benchmark("snapshotter.helpers.get_revisions"):
     revision_id_cache = dict()
-
-    if pairs:
-      with benchmark("get_revisions.create caches"):
-        child_stubs = {pair.child for pair in pairs}
-
-        with benchmark("get_revisions.create child -> parents cache"):
-          parents_cache = collections.defaultdict(set)
-          for parent, child in pairs:
-            parents_cache[child].add(parent)
-
-      with benchmark("get_revisions.retrieve revisions"):
-        query = db.session.query(
-            models.Revision.id,
-            models.Revision.resource_type,
-            models.Revision.resource_id).filter(
-            tuple_(
-                models.Revision.resource_type,
-                models.Revision.resource_id).in_(child_stubs)
-        ).order_by(models.Revision.id.desc())
-        if filters:
-          for _filter in filters:
-            query = query.filter(_filter)
-
-      with benchmark("get_revisions.create revision_id cache"):
-        for revid, restype, resid in query:
-          child = Stub(restype, resid)
-          for parent in parents_cache[child]:
-            key = Pair(parent, child)
-            if key in revisions:
-              if revid == revisions[key]:
-                revision_id_cache[key] = revid
-              else:
-                logger.warning(
-                    "Specified revision for object %s but couldn't find the"
-                    "revision '%s' in object history", key, revisions[key])
-            else:
-              if key not in revision_id_cache:
-                revision_id_cache[key] = revid
+    if not pairs:
+      return revision_id_cache
+    if latest_revisions is None:
+      latest_revisions = LatestRevisions()
+
+    with benchmark("get_revisions.retrieve revisions"):
+      revision_objects = _get_revision_objects(
+          {revisions[pair] for pair in pairs if pair in revisions})
+      latest_revisions.load(
+          {pair.child for pair in pairs if pair not in revisions})
+
+    with benchmark("get_revisions.create revision_id cache"):
+      for pair in pairs:
+        if pair in revisions:
+          revid = revisions[pair]
+          child, action = revision_objects.get(revid, (None, None))
+          if child == pair.child and (include_deleted or
+                                      action != "deleted"):
+            revision_id_cache[pair] = revid
+          else:
+            logger.warning(
+                "Specified revision for object %s but couldn't find the"
+                "revision '%s' in object history", pair, revid)
+        else:
+          revid = latest_revisions.get(pair.child, include_deleted)
+          if revid is not None:
+            revision_id_cache[pair] = revid
     return revision_id_cache
 
 
-def get_relationships(relationships):
-  """Retrieve relationships
+def get_relationship_ids(pairs):
+  """Get ids of relationships from parents to children of pairs.
 
   Args:
-    relationships:
+    pairs: iterable of Pair
+  Returns:
+    dict of relationship ids by pair
   """
-  with benchmark("snapshotter.helpers.get_relationships"):
-    if relationships:
-      relationship_columns = db.session.query(
-          models.Relationship.id,
-          models.Relationship.modified_by_id,
-          models.Relationship.created_at,
-          models.Relationship.updated_at,
-          models.Relationship.source_type,
-          models.Relationship.source_id,
-          models.Relationship.destination_type,
-          models.Relationship.destination_id,
-          models.Relationship.context_id,
-      )
+  with benchmark("snapshotter.helpers.get_relationship_ids"):
+    if not pairs:
+      return {}
+    query = db.session.query(
+        models.Relationship.id,
+        models.Relationship.source_type,
+        models.Relationship.source_id,
+        models.Relationship.destination_type,
+        models.Relationship.destination_id,
+    ).filter(
+        tuple_(
+            models.Relationship.source_type,
+            models.Relationship.source_id,
+            models.Relationship.destination_type,
+            models.Relationship.destination_id,
+        ).in_([pair.to_4tuple() for pair in pairs])
+    )
+    return {Pair.from_4tuple(row[1:]): row[0] for row in query}
 
-      return relationship_columns.filter(
-          tuple_(
-              models.Relationship.source_type,
-              models.Relationship.source_id,
-              models.Relationship.destination_type,
-              models.Relationship.destination_id,
-          ).in_(relationships)
-      ).union(
-          relationship_columns.filter(
-              tuple_(
-                  models.Relationship.destination_type,
-                  models.Relationship.destination_id,
-                  models.Relationship.source_type,
-                  models.Relationship.source_id
-              ).in_(relationships)
-          )
-      )
-    else:
-      return set()
 
+def get_snapshot_ids(pairs):
+  """Get ids of snapshots of pairs.
 
-def get_snapshots(objects=None, ids=None):
-  with benchmark("snapshotter.helpers.get_snapshots"):
-    if objects and ids:
-      raise Exception(
-          "Insert only iterable of (parent, child) tuples or set of IDS")
-    columns = db.session.query(
+  Args:
+    pairs: iterable of Pair
+  Returns:
+    dict of snapshot ids by pair
+  """
+  with benchmark("snapshotter.helpers.get_snapshot_ids"):
+    if not pairs:
+      return {}
+    query = db.session.query(
         models.Snapshot.id,
-        models.Snapshot.context_id,
-        models.Snapshot.created_at,
-        models.Snapshot.updated_at,
         models.Snapshot.parent_type,
         models.Snapshot.parent_id,
         models.Snapshot.child_type,
         models.Snapshot.child_id,
-        models.Snapshot.revision_id,
-        models.Snapshot.modified_by_id,
+    ).filter(
+        tuple_(
+            models.Snapshot.parent_type,
+            models.Snapshot.parent_id,
+            models.Snapshot.child_type,
+            models.Snapshot.child_id
+        ).in_([pair.to_4tuple() for pair in pairs])
     )
-    if objects:
-      return columns.filter(
-          tuple_(
-              models.Snapshot.parent_type,
-              models.Snapshot.parent_id,
-              models.Snapshot.child_type,
-              models.Snapshot.child_id
-          ).in_({(parent.type, parent.id, child.type, child.id)
-                 for parent, child in objects}))
-    if ids:
-      return columns.filter(
-          models.Snapshot.id.in_(ids))
-    return set()
+    return {Pair.from_4tuple(row[1:]): row[0] for row in query}
 
 
 def create_json_stub(model_, context_id, object_id):
@@ -19,7 +19,6 @@ from ggrc.models.reflection import AttributeInfo
 from ggrc.utils import generate_query_chunks
 
 from ggrc.snapshotter.rules import Types
-from ggrc.snapshotter.datastructures import Pair
 from ggrc.fulltext.attributes import FullTextAttr, DatetimeFullTextAttr
 
 
@@ -55,6 +54,9 @@ TAG_TMPL = u"{parent_type}-{parent_id}-{child_type}"
 PARENT_PROPERTY_TMPL = u"{parent_type}-{parent_id}"
 CHILD_PROPERTY_TMPL = u"{child_type}-{child_id}"
 
+# Number of full text records inserted with a single statement.
+INSERT_BATCH_SIZE = 1000
+
 
 def _get_custom_attribute_dict():
   """Get fulltext indexable properties for all snapshottable objects
@@ -109,34 +111,34 @@ def get_searchable_attributes(attributes, cad_dict, content):
   return searchable_values
 
 
-def reindex():
-  """Reindex all snapshots."""
-  columns = db.session.query(
+def _get_snapshot_query():
+  """Get query for snapshot columns needed for building full text records."""
+  return db.session.query(
+      models.Snapshot.id,
+      models.Snapshot.context_id,
       models.Snapshot.parent_type,
       models.Snapshot.parent_id,
       models.Snapshot.child_type,
       models.Snapshot.child_id,
+      models.Snapshot.revision_id,
   )
-  for query_chunk in generate_query_chunks(columns):
-    pairs = {Pair.from_4tuple(p) for p in query_chunk}
-    reindex_pairs(pairs)
-    db.session.commit()
+
+
+def reindex():
+  """Reindex all snapshots."""
+  cad_dict = _get_custom_attribute_dict()
+  for query_chunk in generate_query_chunks(_get_snapshot_query()):
+    reindex_snapshot_rows(query_chunk.all(), cad_dict)
 
 
 def reindex_snapshots(snapshot_ids):
   """Reindex selected snapshots"""
   if not snapshot_ids:
     return
-  columns = db.session.query(
-      models.Snapshot.parent_type,
-      models.Snapshot.parent_id,
-      models.Snapshot.child_type,
-      models.Snapshot.child_id,
-  ).filter(models.Snapshot.id.in_(snapshot_ids))
-  for query_chunk in generate_query_chunks(columns):
-    pairs = {Pair.from_4tuple(p) for p in query_chunk}
-    reindex_pairs(pairs)
-    db.session.commit()
+  cad_dict = _get_custom_attribute_dict()
+  query = _get_snapshot_query().filter(models.Snapshot.id.in_(snapshot_ids))
+  for query_chunk in generate_query_chunks(query):
+    reindex_snapshot_rows(query_chunk.all(), cad_dict)
 
 
 def delete_records(snapshot_ids):
@@ -267,6 +269,103 @@ def get_record_value(prop, val, rec):
   return []
 
 
+def get_revision_attributes(revision_ids, cad_dict):
+  """Get searchable attributes of revisions.
+
+  Many snapshots share the same revision, so the content of every distinct
+  revision is decoded only once.
+
+  Args:
+    revision_ids: Iterable with ids of revisions.
+    cad_dict: dict from CAD id to CAD object with title and type defined.
+  Returns:
+    Dict from revision id to searchable attributes of the revision.
+  """
+  if not revision_ids:
+    return {}
+  revisions = models.Revision.query.filter(
+      models.Revision.id.in_(revision_ids)
+  ).options(
+      orm.load_only(
+          "id",
+          "resource_type",
+          "resource_id",
+          "content",
+      ),
+  )
+  return {
+      revision.id: get_searchable_attributes(
+          CLASS_PROPERTIES[revision.resource_type],
+          cad_dict,
+          revision.populated_content)
+      for revision in revisions
+  }
+
+
+def generate_records(snapshot_rows, revision_attributes):
+  """Generate full text records for snapshots.
+
+  Args:
+    snapshot_rows: List of snapshot rows from _get_snapshot_query.
+    revision_attributes: Dict from revision id to searchable attributes.
+  Yields:
+    Dictionaries that represent full text record entries.
+  """
+  for row in snapshot_rows:
+    snapshot = {
+        "id": row.id,
+        "context_id": row.context_id,
+        "parent_type": row.parent_type,
+        "parent_id": row.parent_id,
+        "child_type": row.child_type,
+        "child_id": row.child_id,
+        "revision": revision_attributes[row.revision_id],
+    }
+    for prop, val in get_properties(snapshot).items():
+      for record in get_record_value(
+          prop,
+          val,
+          {
+              "key": snapshot["id"],
+              "type": "Snapshot",
+              "context_id": snapshot["context_id"],
+              "tags": TAG_TMPL.format(**snapshot),
+              "subproperty": "",
+          }
+      ):
+        yield record
+
+
+def reindex_snapshot_rows(snapshot_rows, cad_dict=None):
+  """Replace full text records of snapshots.
+
+  Records are inserted in batches of INSERT_BATCH_SIZE, so only a single
+  batch of records is kept in memory.
+
+  Args:
+    snapshot_rows: List of snapshot rows from _get_snapshot_query.
+    cad_dict: dict from CAD id to CAD object with title and type defined.
+  """
+  if not snapshot_rows:
+    return
+  if cad_dict is None:
+    cad_dict = _get_custom_attribute_dict()
+  revision_attributes = get_revision_attributes(
+      {row.revision_id for row in snapshot_rows}, cad_dict)
+  snapshot_ids = [row.id for row in snapshot_rows]
+  delete_records(snapshot_ids)
+  records = generate_records(snapshot_rows, revision_attributes)
+  while True:
+    batch = list(itertools.islice(records, INSERT_BATCH_SIZE))
+    if not batch:
+      break
+    insert_records(batch)
+  # Records are written outside of the session, so the search backend is
+  # notified separately.
+  get_indexer().search_backend.records_updated("Snapshot", snapshot_ids)
+  db.session.commit()
+
+
 def reindex_pairs(pairs):
   """Reindex selected snapshots.
 
@@ -276,8 +375,7 @@ def reindex_pairs(pairs):
   """
   if not pairs:
     return
-  snapshots = dict()
-  snapshot_query = models.Snapshot.query.filter(
+  snapshot_query = _get_snapshot_query().filter(
       tuple_(
           models.Snapshot.parent_type,
           models.Snapshot.parent_id,
@@ -286,53 +384,5 @@ def reindex_pairs(pairs):
       ).in_(
           {pair.to_4tuple() for pair in pairs}
       )
-  ).options(
-      orm.subqueryload("revision").load_only(
-          "id",
-          "resource_type",
-          "resource_id",
-          "content",
-      ),
-      orm.load_only(
-          "id",
-          "context_id",
-          "parent_type",
-          "parent_id",
-          "child_type",
-          "child_id",
-          "revision_id",
-      )
   )
-  cad_dict = _get_custom_attribute_dict()
-  for snapshot in snapshot_query:
-    revision = snapshot.revision
-    snapshots[snapshot.id] = {
-        "id": snapshot.id,
-        "context_id": snapshot.context_id,
-        "parent_type": snapshot.parent_type,
-        "parent_id": snapshot.parent_id,
-        "child_type": snapshot.child_type,
-        "child_id": snapshot.child_id,
-        "revision": get_searchable_attributes(
-            CLASS_PROPERTIES[revision.resource_type],
-            cad_dict,
-            revision.populated_content)
-    }
-  search_payload = []
-  for snapshot in snapshots.values():
-    for prop, val in get_properties(snapshot).items():
-      search_payload.extend(
-          get_record_value(
-              prop,
-              val,
-              {
-                  "key": snapshot["id"],
-                  "type": "Snapshot",
-                  "context_id": snapshot["context_id"],
-                  "tags": TAG_TMPL.format(**snapshot),
-                  "subproperty": "",
-              }
-          )
-      )
-  delete_records(snapshots.keys())
-  insert_records(search_payload)
+  reindex_snapshot_rows(snapshot_query.all())
@@ -247,11 +247,67 @@ def iso_to_us_date(date_string):
   return convert_date_format(date_string, DATE_FORMAT_ISO, DATE_FORMAT_US)
 
 
-def generate_query_chunks(query, chunk_size=1000):
-  """Make a generator splitting `query` into chunks of size `chunk_size`."""
-  count = query.count()
-  for offset in range(0, count, chunk_size):
-    yield query.order_by("id").limit(chunk_size).offset(offset)
+def _get_id_column(query, id_column=None):
+  """Get the column used for splitting `query` into chunks."""
+  if id_column is not None:
+    return id_column
+  # first queried expression is either a model or a model attribute
+  expr = query.column_descriptions[0]["expr"]
+  return getattr(expr, "class_", expr).id
+
+
+def generate_id_ranges(query, chunk_size=1000, id_column=None):
+  """Make a generator of id ranges splitting `query` into chunks.
+
+  Ids for the next range are fetched with keyset pagination:
+  `WHERE id > last_id ORDER BY id LIMIT chunk_size`. Unlike OFFSET pagination,
+  the cost of fetching a range does not grow with its position.
+
+  Args:
+    query: SQLAlchemy query object to split into chunks.
+    chunk_size (int): maximal number of rows in a single range.
+    id_column: unique column used for ordering and splitting the rows. The id
+      column of the first entity in the query is used by default.
+
+  Yields:
+    (first_id, last_id) tuples of inclusive bounds for each chunk.
+  """
+  id_column = _get_id_column(query, id_column)
+  ids_query = query.with_entities(id_column).order_by(None).order_by(
+      id_column)
+  last_id = None
+  while True:
+    chunk_ids_query = ids_query
+    if last_id is not None:
+      chunk_ids_query = chunk_ids_query.filter(id_column > last_id)
+    ids = [row[0] for row in chunk_ids_query.limit(chunk_size)]
+    if not ids:
+      return
+    yield ids[0], ids[-1]
+    if len(ids) < chunk_size:
+      return
+    last_id = ids[-1]
+
+
+def generate_query_chunks(query, chunk_size=1000, id_column=None):
+  """Make a generator splitting `query` into chunks of size `chunk_size`.
+
+  Chunks are selected with keyset pagination (see generate_id_ranges) and
+  every yielded query is restricted to the id range of its chunk.
+
+  Args:
+    query: SQLAlchemy query object to split into chunks.
+    chunk_size (int): maximal number of rows in a single chunk.
+    id_column: unique column used for ordering and splitting the rows. The id
+      column of the first entity in the query is used by default.
+
+  Yields:
+    query objects ordered by id_column, each returning at most chunk_size rows.
+  """
+  id_column = _get_id_column(query, id_column)
+  for first_id, last_id in generate_id_ranges(query, chunk_size, id_column):
+    yield query.filter(id_column.between(first_id, last_id)).order_by(
+        None).order_by(id_column)
 
 
 def create_stub(object_, context_id=None):
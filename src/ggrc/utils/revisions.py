@@ -11,6 +11,7 @@ from sqlalchemy import literal
 
 from ggrc import db
 from ggrc.utils import benchmark
+from ggrc.utils import generate_query_chunks
 from ggrc.login import get_current_user_id
 from ggrc.models import all_models
 from ggrc.snapshotter.rules import Types
@@ -57,12 +58,8 @@ def _fix_type_revisions(event, type_, obj_rev_map):
                    "skipped", type_)
     return
 
-  chunk = 1000
-  all_objects = model.eager_query().order_by(model.id)
-  all_objects_count = model.query.count()
-
-  for i in range(all_objects_count // chunk + 1):
-    objects_chunk = all_objects.limit(chunk).offset(i * chunk)
+  for query_chunk in generate_query_chunks(model.eager_query()):
+    objects_chunk = query_chunk.all()
     chunk_with_revisions = [
         obj for obj in objects_chunk if obj.id in obj_rev_map]
     chunk_without_revisions = [
@@ -7,21 +7,29 @@ This module handles all view related function to import and export pages
 including the import/export api endponts.
 """
 
+from itertools import chain
+from itertools import islice
 from logging import getLogger
 
 from flask import current_app
 from flask import request
 from flask import json
 from flask import render_template
+from flask import stream_with_context
+from flask import url_for
 from werkzeug.exceptions import BadRequest
 
+from ggrc import settings
 from ggrc.app import app
 from ggrc.converters.base import Converter
+from ggrc.converters.import_helper import generate_csv_chunks
 from ggrc.converters.import_helper import generate_csv_string
 from ggrc.converters.import_helper import read_csv_file
 from ggrc.converters.query_helper import BadQueryException
 from ggrc.converters.query_helper import QueryHelper
 from ggrc.login import login_required
+from ggrc.models.background_task import create_task
+from ggrc.models.background_task import queued_task
 from ggrc.utils import benchmark
 
 
@@ -52,25 +60,57 @@ def parse_export_request():
   return request.json
 
 
+def is_streamed_export():
+  """Check if the client asked for a streamed export response.
+
+  Streamed exports send the csv file in parts while objects are still being
+  converted. Errors that happen after the first part has been sent can not be
+  reported with an error status anymore and end the response early instead.
+  """
+  return request.headers.get("X-export-stream") == "true"
+
+
+def get_export_headers(converter):
+  object_names = "_".join(converter.get_object_names())
+  filename = "{}.csv".format(object_names)
+  return [
+      ("Content-Type", "text/csv"),
+      ("Content-Disposition",
+       "attachment; filename='{}'".format(filename)),
+  ]
+
+
+def make_streamed_export_response(ids_by_type):
+  """Make a response that generates the csv file while it is being sent."""
+  converter = Converter(ids_by_type=ids_by_type)
+  csv_lines = converter.iter_block_array()
+  # Block converters are created and checked on the first line, so any
+  # problems with the export query are still raised before the response.
+  first_line = list(islice(csv_lines, 1))
+  csv_chunks = generate_csv_chunks(chain(first_line, csv_lines))
+  return current_app.response_class(
+      stream_with_context(csv_chunks),
+      status=200,
+      headers=get_export_headers(converter),
+  )
+
+
 def handle_export_request():
   try:
     with benchmark("handle export request"):
       data = parse_export_request()
       query_helper = QueryHelper(data)
       ids_by_type = query_helper.get_ids()
+    if is_streamed_export():
+      with benchmark("Make streamed response."):
+        return make_streamed_export_response(ids_by_type)
     with benchmark("Generate CSV array"):
       converter = Converter(ids_by_type=ids_by_type)
       csv_data = converter.to_array()
     with benchmark("Generate CSV string"):
       csv_string = generate_csv_string(csv_data)
     with benchmark("Make response."):
-      object_names = "_".join(converter.get_object_names())
-      filename = "{}.csv".format(object_names)
-      headers = [
-          ("Content-Type", "text/csv"),
-          ("Content-Disposition",
-           "attachment; filename='{}'".format(filename)),
-      ]
+      headers = get_export_headers(converter)
       return current_app.make_response((csv_string, 200, headers))
   except BadQueryException as exception:
     raise BadRequest(exception.message)
@@ -101,15 +141,58 @@ def parse_import_request():
   return dry_run, csv_data
 
 
+def is_async_import():
+  """Check if the client asked for the import to run as a background task.
+
+  Asynchronous imports respond with the background task right away. Progress
+  and the final import result are available on /background_task/<id>.
+  """
+  return request.headers.get("X-import-async") == "true"
+
+
+def make_import_response(converter):
+  response_json = json.dumps(converter.get_info())
+  headers = [("Content-Type", "application/json")]
+  return current_app.make_response((response_json, 200, headers))
+
+
+def run_import_task(task):
+  """Import csv data stored in the task parameters in row batches."""
+  converter = Converter(
+      dry_run=task.parameters["dry_run"],
+      csv_data=task.parameters["csv_data"],
+      batch_size=settings.IMPORT_BATCH_SIZE,
+      progress_callback=task.set_progress,
+  )
+  converter.import_csv()
+  return make_import_response(converter)
+
+
+def schedule_import(dry_run, csv_data):
+  """Create a background task for importing csv data."""
+  task = create_task(
+      "import_csv",
+      url_for("handle_import_task"),
+      queued_task(run_import_task),
+      parameters={"dry_run": dry_run, "csv_data": csv_data},
+  )
+  response_json = json.dumps({
+      "id": task.id,
+      "status": task.status,
+      "href": url_for("get_task_response", id_task=task.id),
+  })
+  headers = [("Content-Type", "application/json")]
+  return current_app.make_response((response_json, 202, headers))
+
+
 def handle_import_request():
   try:
     dry_run, csv_data = parse_import_request()
+    if is_async_import():
+      return schedule_import(dry_run, csv_data)
     converter = Converter(dry_run=dry_run, csv_data=csv_data)
     converter.import_csv()
-    response_data = converter.get_info()
-    response_json = json.dumps(response_data)
-    headers = [("Content-Type", "application/json")]
-    return current_app.make_response((response_json, 200, headers))
+    return make_import_response(converter)
   except:  # pylint: disable=bare-except
     logger.exception("Import failed")
   raise BadRequest("Import failed due to server error.")
@@ -132,6 +215,13 @@ def init_converter_views():
     with benchmark("handle import request"):
       return handle_import_request()
 
+  # Needs to be secured as we are removing @login_required
+  @app.route("/_background_tasks/import_csv", methods=["POST"])
+  @queued_task
+  def handle_import_task(task):
+    with benchmark("handle import task"):
+      return run_import_task(task)
+
   @app.route("/import")
   @login_required
   def import_view():
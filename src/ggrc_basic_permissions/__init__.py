@@ -30,6 +30,7 @@ from ggrc.services import signals
 from ggrc.services.registry import service
 from ggrc.utils import benchmark
 from ggrc_basic_permissions import basic_roles
+from ggrc_basic_permissions import permissions_cache
 from ggrc_basic_permissions.contributed_roles import lookup_role_implications
 from ggrc_basic_permissions.contributed_roles import BasicRoleDeclarations
 from ggrc_basic_permissions.contributed_roles import BasicRoleImplications
@@ -48,8 +49,6 @@ blueprint = Blueprint(
     static_url_path='/static/ggrc_basic_permissions',
 )
 
-PERMISSION_CACHE_TIMEOUT = 3600  # 60 minutes
-
 
 def get_public_config(_):
   """Expose additional permissions-dependent config to client.
@@ -281,11 +280,14 @@ class BasicUserPermissions(DefaultUserPermissions):
   def __init__(self, user):
     self.user = user
     with benchmark('BasicUserPermissions > load permissions for user'):
-      self.permissions = load_permissions_for(user)
+      self.permissions, self.version = load_versioned_permissions_for(user)
 
   def _permissions(self):
     return self.permissions
 
+  def permissions_version(self):
+    return self.version
+
 
 class UserPermissions(DefaultUserPermissions):
   """User permissions cached in the global session object"""
@@ -306,6 +308,10 @@ class UserPermissions(DefaultUserPermissions):
     if not self._request_permissions:
       self.load_permissions()
 
+  def permissions_version(self):
+    self.check_permissions()
+    return getattr(g, '_request_permissions_version', None)
+
   def get_email_for(self, user):
     return user.email if hasattr(user, 'email') else 'ANONYMOUS'
 
@@ -315,11 +321,13 @@ class UserPermissions(DefaultUserPermissions):
     email = self.get_email_for(user)
     self._request_permissions = {}
     self._request_permissions['__user'] = email
+    g._request_permissions_version = None
     if user is None or user.is_anonymous():
       self._request_permissions = {}
     else:
       with benchmark('load_permissions'):
-        self._request_permissions = load_permissions_for(user)
+        self._request_permissions, g._request_permissions_version = \
+            load_versioned_permissions_for(user)
 
 
 def collect_permissions(src_permissions, context_id, permissions):
@@ -351,35 +359,23 @@ def collect_permissions(src_permissions, context_id, permissions):
             })
 
 
-def query_memcache(key):
-  """Check if cached permissions are available
+def query_memcache(user_id):
+  """Check if cached permission fragments are available
 
   Args:
-      key (string): key of the stored permissions
+      user_id (int): id of the user whose permissions are loaded
   Returns:
       cache (memcache_client): memcache client or None if caching
                                is not available
-      permissions_cache (dict): dict with all permissions or None if there
-                                was a cache miss
+      fragments (dict): valid cached permission fragments by name
+      tokens (dict): tokens for storing loaded fragments
   """
   if not getattr(settings, 'MEMCACHE_MECHANISM', False):
-    return None, None
+    return None, {}, {}
 
   cache = _get_cache_manager().cache_object.memcache_client
-  cached_keys_set = cache.get('permissions:list') or set()
-  if key not in cached_keys_set:
-    # We set the permissions:list variable so that we are able to batch
-    # remove all permissions related keys from memcache
-    cached_keys_set.add(key)
-    cache.set('permissions:list', cached_keys_set, PERMISSION_CACHE_TIMEOUT)
-    return cache, None
-
-  permissions_cache = cache.get(key)
-  if permissions_cache:
-    # If the key is both in permissions:list and in memcache itself
-    # it is safe to return the cached permissions
-    return cache, permissions_cache
-  return cache, None
+  fragments, tokens = permissions_cache.get_fragments(cache, user_id)
+  return cache, fragments, tokens
 
 
 def load_default_permissions(permissions):
@@ -616,21 +612,24 @@ def context_relationship_query(contexts):
   ))).all()
 
 
-def load_context_relationships(permissions):
+def load_context_relationships(permissions, role_permissions=None):
   """Load context relationship permissions
 
   Args:
-      user (Person): Person object
       permissions (dict): dict where the permissions will be stored
+      role_permissions (dict): dict with program contexts of the user, the
+                               permissions dict if not given
   Returns:
       None
   """
+  if role_permissions is None:
+    role_permissions = permissions
   read_contexts = set(
-      permissions.get('read', {}).
+      role_permissions.get('read', {}).
       get('Program', {}).
       get('contexts', []))
   write_contexts = set(
-      permissions.get('update', {}).
+      role_permissions.get('update', {}).
       get('Program', {}).
       get('contexts', []))
   read_only_contexts = read_contexts - write_contexts
@@ -738,54 +737,15 @@ def load_backlog_workflows(permissions):
             .append(wf_context_id)
 
 
-def store_results_into_memcache(permissions, cache, key):
-  """Load personal context for user
+def load_role_permissions(user, permissions):
+  """Load default, bootstrap admin, user role and implied role permissions
 
   Args:
+      user (Person): Person object
       permissions (dict): dict where the permissions will be stored
-      cache (cache_manager): Cache manager that should be used for storing
-                             permissions
-      key (string): key of under which permissions should be stored
   Returns:
       None
   """
-  if cache is None:
-    return
-
-  cached_keys_set = cache.get('permissions:list') or set()
-  if key in cached_keys_set:
-    # We only add the permissions to the cache if the
-    # key still exists in the permissions:list after
-    # the query has executed.
-    cache.set(key, permissions, PERMISSION_CACHE_TIMEOUT)
-
-
-def load_permissions_for(user):
-  """Permissions is dictionary that can be exported to json to share with
-  clients. Structure is:
-  ..
-
-    permissions[action][resource_type][contexts]
-                                      [conditions][context][context_conditions]
-
-  'action' is one of 'create', 'read', 'update', 'delete'.
-  'resource_type' is the name of a valid GGRC resource type.
-  'contexts' is a list of context_id where the action is allowed.
-  'conditions' is a dictionary of 'context_conditions' indexed by 'context'
-    where 'context' is a context_id.
-  'context_conditions' is a list of dictionaries with 'condition' and 'terms'
-    keys.
-  'condition' is the string name of a conditional operator, such as 'contains'.
-  'terms' are the arguments to the 'condition'.
-  """
-  permissions = {}
-  key = 'permissions:{}'.format(user.id)
-
-  with benchmark("load_permissions > query memcache"):
-    cache, result = query_memcache(key)
-    if result:
-      return result
-
   with benchmark("load_permissions > load default permissions"):
     load_default_permissions(permissions)
 
@@ -803,28 +763,86 @@ def load_permissions_for(user):
     load_implied_roles(permissions, source_contexts_to_rolenames,
                        all_context_implications)
 
-  with benchmark("load_permissions > load object owners"):
-    load_object_owners(user, permissions)
 
-  with benchmark("load_permissions > load context relationships"):
-    load_context_relationships(permissions)
+def store_results_into_memcache(fragments, cache, user_id, tokens):
+  """Store loaded permission fragments
+
+  Args:
+      fragments (dict): loaded permission fragments by name
+      cache (memcache_client): memcache client that should be used for
+                               storing permissions
+      user_id (int): id of the user whose permissions are stored
+      tokens (dict): tokens returned by query_memcache
+  Returns:
+      None
+  """
+  if cache is None:
+    return
+  permissions_cache.store_fragments(cache, user_id, fragments, tokens)
+
+
+def load_permissions_for(user):
+  """Load permissions of a user, see load_versioned_permissions_for."""
+  return load_versioned_permissions_for(user)[0]
+
 
-  with benchmark("load_permissions > load assignee relationships"):
-    load_assignee_relationships(user, permissions)
+def load_versioned_permissions_for(user):
+  """Permissions is dictionary that can be exported to json to share with
+  clients. Structure is:
+  ..
 
-  with benchmark("load_permissions > load personal context"):
-    load_personal_context(user, permissions)
+    permissions[action][resource_type][contexts]
+                                      [conditions][context][context_conditions]
 
-  with benchmark("load_permissions > load access control list"):
-    load_access_control_list(user, permissions)
+  'action' is one of 'create', 'read', 'update', 'delete'.
+  'resource_type' is the name of a valid GGRC resource type.
+  'contexts' is a list of context_id where the action is allowed.
+  'conditions' is a dictionary of 'context_conditions' indexed by 'context'
+    where 'context' is a context_id.
+  'context_conditions' is a list of dictionaries with 'condition' and 'terms'
+    keys.
+  'condition' is the string name of a conditional operator, such as 'contains'.
+  'terms' are the arguments to the 'condition'.
 
-  with benchmark("load_permissions > load backlog workflows"):
-    load_backlog_workflows(permissions)
+  Every group of loading stages is cached as a separate fragment, see
+  ggrc_basic_permissions.permissions_cache. Only fragments that are not in
+  cache are loaded.
 
-  with benchmark("load_permissions > store results into memcache"):
-    store_results_into_memcache(permissions, cache, key)
+  Returns:
+      permissions dictionary and its version from
+      permissions_cache.get_version or None if permissions are not cached.
+  """
+  with benchmark("load_permissions > query memcache"):
+    cache, fragments, tokens = query_memcache(user.id)
+
+  loaders = {
+      "roles": lambda p: load_role_permissions(user, p),
+      "owners": lambda p: load_object_owners(user, p),
+      "context_relationships":
+          lambda p: load_context_relationships(p, fragments["roles"]),
+      "assignees": lambda p: load_assignee_relationships(user, p),
+      "personal_context": lambda p: load_personal_context(user, p),
+      "acl": lambda p: load_access_control_list(user, p),
+      "backlog": load_backlog_workflows,
+  }
+  missing = [fragment.name for fragment in permissions_cache.FRAGMENTS
+             if fragment.name not in fragments]
+  for name in missing:
+    fragments[name] = {}
+    with benchmark("load_permissions > load {}".format(name)):
+      loaders[name](fragments[name])
+
+  if missing:
+    with benchmark("load_permissions > store results into memcache"):
+      store_results_into_memcache(
+          {name: fragments[name] for name in missing}, cache, user.id,
+          tokens)
 
-  return permissions
+  permissions = {}
+  for fragment in permissions_cache.FRAGMENTS:
+    permissions_cache.merge_permissions(permissions,
+                                        fragments[fragment.name])
+  return permissions, permissions_cache.get_version(tokens)
 
 
 def backlog_workflows():
@@ -0,0 +1,220 @@
+# Copyright (C) 2017 Google Inc.
+# Licensed under http://www.apache.org/licenses/LICENSE-2.0 <see LICENSE file>
+
+"""Permissions cached in memcache as separate fragments.
+
+load_permissions_for builds the permissions of a user in stages. The result
+of every stage is cached as a fragment, so a change only makes the fragments
+that depend on the changed objects load again. An ACL change, for example,
+only invalidates the ACL fragment of the person on the entry.
+
+Every fragment is stored together with two tokens: one shared by all users
+and one for the user. Invalidating a fragment replaces a token with a new
+random value, so fragments stored with the old token are ignored. Loads that
+read the database while a change is committed store their fragments with the
+old token and are never used.
+"""
+
+import collections
+import hashlib
+import itertools
+import uuid
+
+from ggrc.utils import benchmark
+
+
+PERMISSION_CACHE_TIMEOUT = 3600  # 60 minutes
+
+Fragment = collections.namedtuple("Fragment", "name per_user depends_on")
+
+# Fragments in the order in which they are merged into permissions
+FRAGMENTS = (
+    Fragment("roles", True, ()),
+    Fragment("owners", True, ()),
+    Fragment("context_relationships", True, ("roles",)),
+    Fragment("assignees", True, ()),
+    Fragment("personal_context", True, ()),
+    Fragment("acl", True, ()),
+    Fragment("backlog", False, ()),
+)
+
+# Changed objects of these types invalidate the given fragments for the
+# person the object belongs to and for all users.
+INVALIDATED_FRAGMENTS = {
+    "Person": (("roles",), ()),
+    "UserRole": (("roles",), ()),
+    "ObjectOwner": (("owners",), ()),
+    "AccessControlList": (("acl",), ()),
+    "Role": ((), ("roles",)),
+    "ContextImplication": ((), ("roles",)),
+    "Context": ((), ("context_relationships", "personal_context")),
+    "Relationship": ((), ("context_relationships", "assignees")),
+    "RelationshipAttr": ((), ("assignees",)),
+    "AccessControlRole": ((), ("acl",)),
+    "Workflow": ((), ("backlog",)),
+}
+
+
+def _token_key(name, user_id=None):
+  if user_id is None:
+    return "permissions:token:{}".format(name)
+  return "permissions:{}:token:{}".format(user_id, name)
+
+
+def _fragment_key(fragment, user_id):
+  if fragment.per_user:
+    return "permissions:{}:{}".format(user_id, fragment.name)
+  return "permissions:{}".format(fragment.name)
+
+
+def _new_token():
+  return uuid.uuid4().hex
+
+
+def get_fragments(cache, user_id):
+  """Get valid cached fragments of a user.
+
+  Args:
+      cache: memcache client
+      user_id (int): id of the user
+  Returns:
+      fragments (dict): valid fragment data by fragment name
+      tokens (dict): tokens to store new fragments with by fragment name, a
+                     fragment with no tokens must not be stored
+  """
+  keys = []
+  for fragment in FRAGMENTS:
+    keys.append(_token_key(fragment.name))
+    if fragment.per_user:
+      keys.append(_token_key(fragment.name, user_id))
+    keys.append(_fragment_key(fragment, user_id))
+  values = cache.get_multi(keys) or {}
+
+  missing_tokens = {key: _new_token() for key in keys
+                    if ":token:" in key and key not in values}
+  if missing_tokens:
+    not_added = set(cache.add_multi(missing_tokens) or ())
+    values.update((key, token) for key, token in missing_tokens.items()
+                  if key not in not_added)
+
+  fragments = {}
+  tokens = {}
+  for fragment in FRAGMENTS:
+    fragment_tokens = (
+        values.get(_token_key(fragment.name)),
+        values.get(_token_key(fragment.name, user_id))
+        if fragment.per_user else None,
+    )
+    if fragment_tokens[0] is None or (fragment.per_user and
+                                      fragment_tokens[1] is None):
+      # Another request created the token first, skip storing this time.
+      continue
+    tokens[fragment.name] = fragment_tokens
+    cached = values.get(_fragment_key(fragment, user_id))
+    if cached is None or cached[0] != fragment_tokens:
+      continue
+    if any(name not in fragments for name in fragment.depends_on):
+      continue
+    fragments[fragment.name] = cached[1]
+  return fragments, tokens
+
+
+def store_fragments(cache, user_id, fragments, tokens):
+  """Store loaded fragments of a user.
+
+  Args:
+      cache: memcache client
+      user_id (int): id of the user
+      fragments (dict): fragment data by fragment name
+      tokens (dict): tokens returned by get_fragments
+  """
+  data = {
+      _fragment_key(fragment, user_id): (tokens[fragment.name],
+                                         fragments[fragment.name])
+      for fragment in FRAGMENTS
+      if fragment.name in fragments and fragment.name in tokens
+  }
+  if data:
+    cache.set_multi(data, PERMISSION_CACHE_TIMEOUT)
+
+
+def get_version(tokens):
+  """Get the version of permissions loaded with the given tokens.
+
+  Any invalidation of a fragment replaces its token, so permissions with the
+  same version hold the same data.
+
+  Args:
+      tokens (dict): tokens returned by get_fragments
+  Returns:
+      sha1 hex digest of all fragment tokens or None if a token is missing
+  """
+  if any(fragment.name not in tokens for fragment in FRAGMENTS):
+    return None
+  return hashlib.sha1(repr(
+      [tokens[fragment.name] for fragment in FRAGMENTS])).hexdigest()
+
+
+def merge_permissions(permissions, fragment):
+  """Add permissions of a fragment to permissions."""
+  for action, resources in fragment.items():
+    action_permissions = permissions.setdefault(action, {})
+    for resource_type, resource_permissions in resources.items():
+      merged = action_permissions.setdefault(resource_type, {})
+      for name, values in resource_permissions.items():
+        if name == "conditions":
+          conditions = merged.setdefault(name, {})
+          for context_id, context_conditions in values.items():
+            conditions.setdefault(context_id, []).extend(context_conditions)
+        else:
+          merged.setdefault(name, []).extend(values)
+
+
+def get_changes(objects, updated=()):
+  """Get fragments invalidated by changed objects.
+
+  Changes must be collected before commit, while deleted objects can still
+  be read. Updated objects may have been moved to another person, whose
+  previous value is no longer known once the session is flushed, so they
+  invalidate their fragments for all users.
+
+  Args:
+      objects: created or deleted model instances
+      updated: updated model instances
+  Returns:
+      set of (fragment name, user id) pairs, user id is None for fragments
+      of all users
+  """
+  changes = set()
+  objects = itertools.chain(((obj, False) for obj in objects),
+                            ((obj, True) for obj in updated))
+  for obj, is_update in objects:
+    user_fragments, all_fragments = INVALIDATED_FRAGMENTS.get(
+        obj.__class__.__name__, ((), ()))
+    if user_fragments:
+      if obj.__class__.__name__ == "Person":
+        user_id = obj.id
+      elif is_update:
+        user_id = None
+      else:
+        user_id = getattr(obj, "person_id", None)
+      if user_id is None:
+        all_fragments = all_fragments + user_fragments
+      else:
+        changes.update((name, user_id) for name in user_fragments)
+    changes.update((name, None) for name in all_fragments)
+  return changes
+
+
+def invalidate(cache, changes):
+  """Invalidate fragments returned by get_changes."""
+  if not changes:
+    return
+  with benchmark("Invalidate cached permissions"):
+    cache.set_multi({_token_key(name, user_id): _new_token()
+                     for name, user_id in changes})
+
+
+def invalidate_all(cache):
+  """Invalidate cached permissions of all users."""
+  invalidate(cache, {(fragment.name, None) for fragment in FRAGMENTS})
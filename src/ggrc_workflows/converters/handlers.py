@@ -316,7 +316,6 @@ class ObjectsColumnHandler(multi_object.ObjectsColumnHandler):
           context=obj.context,
       )
       db.session.add(tgo)
-    db.session.flush()
 
 
 class CycleWorkflowColumnHandler(handlers.ExportOnlyColumnHandler):
@@ -18,6 +18,7 @@ from flask.ext.testing import TestCase as BaseTestCase
 
 from ggrc import db
 from ggrc.app import app
+from ggrc.fulltext import typed_properties
 from ggrc.models import Revision
 from integration.ggrc.api_helper import Api
 from integration.ggrc.models import factories
@@ -122,6 +123,8 @@ class TestCase(BaseTestCase, object):
     db.engine.execute(people.delete(people.c.email != "user@example.com"))
     db.session.reindex_set = set()
     db.session.commit()
+    # Definitions were deleted without ORM events.
+    typed_properties.INDEXED_CACHE.clear()
 
   def setUp(self):
     self.clear_data()
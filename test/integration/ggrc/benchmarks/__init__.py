@@ -0,0 +1,44 @@
+# Copyright (C) 2017 Google Inc.
+# Licensed under http://www.apache.org/licenses/LICENSE-2.0 <see LICENSE file>
+
+"""Benchmarks for ggrc internals.
+
+Benchmark modules are not collected by the test runner. They are meant to be
+run by hand against the test database in the dev environment, for example:
+
+    cd test
+    python -m integration.ggrc.benchmarks.benchmark_query_chunks
+
+Each benchmark populates the data it needs and removes it when done.
+"""
+
+import time
+
+
+class Timer(object):
+  """Context manager that stores the duration of the wrapped block."""
+  # pylint: disable=too-few-public-methods
+
+  def __init__(self):
+    self.start = 0
+    self.duration = 0
+
+  def __enter__(self):
+    self.start = time.time()
+    return self
+
+  def __exit__(self, exc_type, exc_value, exc_trace):
+    self.duration = time.time() - self.start
+
+
+def print_table(title, header, rows):
+  """Print benchmark results as a simple aligned table."""
+  print title
+  widths = [
+      max(len(str(value)) for value in column)
+      for column in zip(header, *rows)
+  ]
+  for row in [header] + list(rows):
+    print "  ".join(str(value).rjust(width)
+                    for value, width in zip(row, widths))
+  print
@@ -0,0 +1,96 @@
+# Copyright (C) 2017 Google Inc.
+# Licensed under http://www.apache.org/licenses/LICENSE-2.0 <see LICENSE file>
+
+"""Compare objects per second of generic and compiled JSON serialization.
+
+The benchmark creates OBJECT_COUNT controls and publishes them with the
+generic Builder.publish_attr dispatch used before serializers were compiled
+and with ggrc.builder.json.publish, which uses the compiled serializer of
+the model. Objects are loaded before timing, so only serialization is
+measured.
+"""
+
+from ggrc import db
+from ggrc.app import app
+from ggrc.builder.json import get_json_builder
+from ggrc.builder.json import publish
+from ggrc.builder.json import publish_base_properties
+from ggrc.models import all_models
+from integration.ggrc.benchmarks import Timer
+from integration.ggrc.benchmarks import print_table
+
+
+OBJECT_COUNT = 2000
+REPEAT = 5
+SLUG_PREFIX = "BENCHMARK-BUILDER-"
+
+
+def populate_controls(count):
+  """Insert `count` controls."""
+  db.session.execute(all_models.Control.__table__.insert(), [
+      {"title": "Benchmark control {}".format(index),
+       "slug": "{}{}".format(SLUG_PREFIX, index)}
+      for index in range(count)
+  ])
+  db.session.commit()
+
+
+def publish_generic(obj):
+  """Publish an object by dispatching on every attribute."""
+  builder = get_json_builder(obj)
+  inclusions = tuple(set((attr,) for attr in builder._include_links))
+  ret = publish_base_properties(obj)
+  for attr in builder._publish_attrs:
+    attr_name = attr.attr_name if hasattr(attr, '__call__') else attr
+    local_inclusion = ()
+    for inclusion in inclusions:
+      if inclusion[0] == attr_name:
+        local_inclusion = inclusion
+        break
+    ret[attr_name] = builder.publish_attr(
+        obj, attr_name, local_inclusion[1:], len(local_inclusion) > 0, None)
+  return ret
+
+
+def objects_per_second(publish_function, objects):
+  """Return the best objects per second rate of publishing all objects."""
+  best = 0
+  for _ in range(REPEAT):
+    with Timer() as timer:
+      for obj in objects:
+        publish_function(obj)
+    best = max(best, len(objects) / timer.duration)
+  return best
+
+
+def main():
+  """Run the benchmark and print objects per second."""
+  populate_controls(OBJECT_COUNT)
+  try:
+    with app.test_request_context():
+      objects = all_models.Control.query.filter(
+          all_models.Control.slug.startswith(SLUG_PREFIX)).all()
+      for obj in objects:
+        publish_generic(obj)  # load lazy attributes before timing
+      rows = [
+          ("generic", "{:.0f}".format(
+              objects_per_second(publish_generic, objects))),
+          ("compiled", "{:.0f}".format(
+              objects_per_second(publish, objects))),
+      ]
+  finally:
+    db.session.rollback()
+    all_models.Control.query.filter(
+        all_models.Control.slug.startswith(SLUG_PREFIX)).delete(
+            synchronize_session=False)
+    db.session.commit()
+
+  print_table(
+      "Serialization of {} controls".format(OBJECT_COUNT),
+      ("builder", "objects/s"),
+      rows,
+  )
+
+
+if __name__ == "__main__":
+  main()
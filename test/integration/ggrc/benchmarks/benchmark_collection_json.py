@@ -0,0 +1,107 @@
+# Copyright (C) 2017 Google Inc.
+# Licensed under http://www.apache.org/licenses/LICENSE-2.0 <see LICENSE file>
+
+"""Compare memory used by buffered and streamed collection responses.
+
+The benchmark publishes OBJECT_COUNT controls into a collection
+representation and encodes it the way collection responses were encoded
+before streaming, with an etag over the str of the collection and a single
+JSON string, and with chunks_etag and iter_collection_json. Every encoding
+runs in a forked process, so the growth of its peak resident memory is
+measured separately.
+"""
+
+import os
+import resource
+
+import ggrc.services
+from ggrc import db
+from ggrc.app import app
+from ggrc.builder.json import publish
+from ggrc.builder.json import publish_representation
+from ggrc.models import all_models
+from ggrc.services.common import chunks_etag
+from ggrc.services.common import etag
+from ggrc.utils import as_json
+from integration.ggrc.benchmarks import Timer
+from integration.ggrc.benchmarks import print_table
+
+
+OBJECT_COUNT = 10000
+SLUG_PREFIX = "BENCHMARK-COLLECTION-JSON-"
+
+
+def populate_controls(count):
+  """Insert `count` controls."""
+  db.session.execute(all_models.Control.__table__.insert(), [
+      {"title": "Benchmark control {}".format(index),
+       "slug": "{}{}".format(SLUG_PREFIX, index)}
+      for index in range(count)
+  ])
+  db.session.commit()
+
+
+def encode_buffered(service, collection):
+  """Encode the collection like json_success_response."""
+  # pylint: disable=unused-argument
+  etag(collection)
+  return len(as_json(collection))
+
+
+def encode_streamed(service, collection):
+  """Encode the collection like json_streaming_response."""
+  chunks_etag(service.iter_collection_json(collection))
+  return sum(len(chunk) for chunk in service.iter_collection_json(collection))
+
+
+def measure(encode, service, collection):
+  """Return the peak memory growth in MB and duration of encode."""
+  read_fd, write_fd = os.pipe()
+  pid = os.fork()
+  if pid == 0:
+    os.close(read_fd)
+    before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    with Timer() as timer:
+      encode(service, collection)
+    after = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    os.write(write_fd, "{} {}".format(after - before, timer.duration))
+    os._exit(0)  # pylint: disable=protected-access
+  os.close(write_fd)
+  growth, duration = os.read(read_fd, 100).split()
+  os.close(read_fd)
+  os.waitpid(pid, 0)
+  return int(growth) / 1024.0, float(duration)
+
+
+def main():
+  """Run the benchmark and print peak memory growth."""
+  populate_controls(OBJECT_COUNT)
+  try:
+    with app.test_request_context("/api/controls"):
+      objects = all_models.Control.query.filter(
+          all_models.Control.slug.startswith(SLUG_PREFIX)).all()
+      objs = publish_representation([publish(obj) for obj in objects])
+      service = ggrc.services.Control()
+      collection = service.build_collection_representation(objs)
+      rows = []
+      for name, encode in (("buffered", encode_buffered),
+                           ("streamed", encode_streamed)):
+        growth, duration = measure(encode, service, collection)
+        rows.append((name, "{:.1f}".format(growth),
+                     "{:.2f}".format(duration)))
+  finally:
+    db.session.rollback()
+    all_models.Control.query.filter(
+        all_models.Control.slug.startswith(SLUG_PREFIX)).delete(
+            synchronize_session=False)
+    db.session.commit()
+
+  print_table(
+      "Encoding a collection of {} controls".format(OBJECT_COUNT),
+      ("encoder", "peak MB", "s"),
+      rows,
+  )
+
+
+if __name__ == "__main__":
+  main()
@@ -0,0 +1,125 @@
+# Copyright (C) 2017 Google Inc.
+# Licensed under http://www.apache.org/licenses/LICENSE-2.0 <see LICENSE file>
+
+"""Compare search latency of full text search backends.
+
+The benchmark fills fulltext_record_properties with RECORD_COUNT records of
+generated objects and counts the objects matching a few terms with every
+search backend. The FULLTEXT backend is skipped if the ngram FULLTEXT index
+does not exist on the test database.
+"""
+
+import random
+
+from sqlalchemy import distinct
+from sqlalchemy import func
+
+from ggrc import db
+from ggrc import settings
+from ggrc.app import app  # noqa pylint: disable=unused-import
+from ggrc.fulltext import mysql
+from ggrc.fulltext import search_backends
+from integration.ggrc.benchmarks import Timer
+from integration.ggrc.benchmarks import print_table
+
+
+RECORD_COUNT = 1000000
+BENCHMARK_TYPE = "BenchmarkObject"
+PROPERTIES = ("title", "description", "slug", "notes")
+WORDS = ["control", "access", "market", "vendor", "policy", "review",
+         "system", "data", "audit", "risk", "process", "facility"]
+TERMS = ["control", "access review", "ctl-4242", "zz", "not present"]
+REPEAT = 5
+
+
+def populate_records(count):
+  """Insert `count` records of BENCHMARK_TYPE objects."""
+  table = mysql.MysqlRecordProperty.__table__
+  rand = random.Random(0)
+  batch = []
+  for index in range(count):
+    prop = PROPERTIES[index % len(PROPERTIES)]
+    if prop == "slug":
+      content = u"CTL-{}".format(index // len(PROPERTIES))
+    else:
+      content = u" ".join(rand.choice(WORDS) for _ in range(8))
+    batch.append({
+        "key": index // len(PROPERTIES),
+        "type": BENCHMARK_TYPE,
+        "property": prop,
+        "subproperty": u"",
+        "content": content,
+    })
+    if len(batch) == 10000:
+      db.session.execute(table.insert(), batch)
+      batch = []
+  if batch:
+    db.session.execute(table.insert(), batch)
+  db.session.commit()
+
+
+def has_fulltext_index():
+  """Check if the ngram FULLTEXT index exists on record content."""
+  return db.session.execute("""
+      SELECT COUNT(*) FROM information_schema.statistics
+      WHERE table_schema = DATABASE()
+        AND table_name = 'fulltext_record_properties'
+        AND index_type = 'FULLTEXT'
+  """).scalar() > 0
+
+
+def count_matches(backend, terms):
+  """Count benchmark objects matching terms with a search backend."""
+  record = mysql.MysqlRecordProperty
+  return db.session.query(func.count(distinct(record.key))).filter(
+      record.type == BENCHMARK_TYPE,
+      record.property.in_(mysql.SEARCHED_PROPERTIES),
+      backend.get_filter(terms),
+  ).scalar()
+
+
+def time_search(backend, terms):
+  """Return the best search duration and the number of matched objects."""
+  durations = []
+  for _ in range(REPEAT):
+    with Timer() as timer:
+      count = count_matches(backend, terms)
+    durations.append(timer.duration)
+  return min(durations), count
+
+
+def main():
+  """Run the benchmark and print search latencies in milliseconds."""
+  populate_records(RECORD_COUNT)
+  backends = [("LIKE", search_backends.LikeSearchBackend(settings))]
+  if has_fulltext_index():
+    backends.append(("FULLTEXT",
+                     search_backends.MysqlFulltextSearchBackend(settings)))
+  inverted = search_backends.InvertedIndexSearchBackend(settings)
+  backends.append(("inverted", inverted))
+  try:
+    with Timer() as build_timer:
+      inverted.get_index()
+    rows = []
+    for terms in TERMS:
+      row = [terms]
+      for _, backend in backends:
+        duration, count = time_search(backend, terms)
+        row.append("{:.2f} ({})".format(duration * 1000, count))
+      rows.append(row)
+  finally:
+    db.session.query(mysql.MysqlRecordProperty).filter(
+        mysql.MysqlRecordProperty.type == BENCHMARK_TYPE).delete()
+    db.session.commit()
+
+  print_table(
+      "Search latency ms (matched objects) for {} records".format(
+          RECORD_COUNT),
+      ["terms"] + [name for name, _ in backends],
+      rows,
+  )
+  print "Inverted index built in {:.2f}s".format(build_timer.duration)
+
+
+if __name__ == "__main__":
+  main()
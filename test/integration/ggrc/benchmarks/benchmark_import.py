@@ -0,0 +1,98 @@
+# Copyright (C) 2017 Google Inc.
+# Licensed under http://www.apache.org/licenses/LICENSE-2.0 <see LICENSE file>
+
+"""Compare csv import throughput of per-row and batched flushes.
+
+The benchmark imports ROW_COUNT generated policies once with every row
+flushed on its own, as imports did before flush batches were introduced, and
+once for each size in FLUSH_BATCH_SIZES. Imported policies are removed after
+every run.
+"""
+
+import json
+from StringIO import StringIO
+
+import mock
+
+from ggrc import db
+from ggrc.models import all_models
+from integration.ggrc.api_helper import Api
+from integration.ggrc.benchmarks import Timer
+from integration.ggrc.benchmarks import print_table
+
+
+ROW_COUNT = 2000
+FLUSH_BATCH_SIZES = [1, 10, 100, 500]
+SLUG_PREFIX = "BENCHMARK-POLICY-"
+
+
+def generate_csv(count):
+  """Generate csv content with `count` new policies."""
+  lines = [
+      "Object type,,,,",
+      "policy,code,title,admin,state",
+  ]
+  for index in range(count):
+    lines.append(",{prefix}{index},Benchmark policy {index},"
+                 "user@example.com,Draft".format(prefix=SLUG_PREFIX,
+                                                 index=index))
+  return "\n".join(lines)
+
+
+def run_import(api, csv_content):
+  """Import csv content and return the import response."""
+  data = {"file": (StringIO(csv_content), "benchmark.csv")}
+  headers = {"X-test-only": "false", "X-requested-by": "GGRC"}
+  response = api.client.post("/_service/import_csv", data=data,
+                             headers=headers)
+  return json.loads(response.data)
+
+
+def remove_policies():
+  """Delete imported policies together with their revisions and records."""
+  policy = all_models.Policy
+  ids = [i for i, in db.session.query(policy.id).filter(
+      policy.slug.startswith(SLUG_PREFIX))]
+  if ids:
+    for obj in policy.query.filter(policy.id.in_(ids)):
+      db.session.delete(obj)
+    db.session.query(all_models.Revision).filter(
+        all_models.Revision.resource_type == "Policy",
+        all_models.Revision.resource_id.in_(ids),
+    ).delete(synchronize_session=False)
+  db.session.commit()
+
+
+def time_import(api, csv_content, flush_batch_size):
+  """Return the duration of importing csv content with a flush batch size."""
+  with mock.patch("ggrc.converters.base_block.IMPORT_FLUSH_BATCH_SIZE",
+                  flush_batch_size):
+    try:
+      with Timer() as timer:
+        response = run_import(api, csv_content)
+    finally:
+      remove_policies()
+  assert response[0]["created"] == ROW_COUNT, response[0]
+  return timer.duration
+
+
+def main():
+  """Run the benchmark and print import throughput in rows per second."""
+  api = Api()
+  csv_content = generate_csv(ROW_COUNT)
+  remove_policies()
+  rows = []
+  for flush_batch_size in FLUSH_BATCH_SIZES:
+    duration = time_import(api, csv_content, flush_batch_size)
+    rows.append((flush_batch_size,
+                 "{:.2f}".format(duration),
+                 "{:.1f}".format(ROW_COUNT / duration)))
+  print_table(
+      "Import of {} policies".format(ROW_COUNT),
+      ("flush batch", "seconds", "rows/s"),
+      rows,
+  )
+
+
+if __name__ == "__main__":
+  main()
@@ -0,0 +1,87 @@
+# Copyright (C) 2017 Google Inc.
+# Licensed under http://www.apache.org/licenses/LICENSE-2.0 <see LICENSE file>
+
+"""Compare cold, warm and partially invalidated permission loads.
+
+The benchmark gives a new person ACL_COUNT access control list entries and
+loads the permissions of that person with the in-process cache backend:
+with an empty cache, with all fragments cached, after a change of one of
+the person's ACL entries and after a change of a relationship.
+"""
+
+from ggrc import db
+from ggrc import settings
+from ggrc.app import app  # noqa pylint: disable=unused-import
+from ggrc.models import all_models
+from ggrc.services.common import _get_cache_manager
+from ggrc_basic_permissions import load_permissions_for
+from ggrc_basic_permissions import permissions_cache
+from integration.ggrc.benchmarks import Timer
+from integration.ggrc.benchmarks import print_table
+
+
+ACL_COUNT = 20000
+REPEAT = 5
+
+
+def populate_acl(count):
+  """Create a person with `count` ACL entries and return the person."""
+  person = all_models.Person(email="permissions.benchmark@example.com")
+  role = all_models.AccessControlRole(name="Permissions benchmark",
+                                      object_type="Control")
+  db.session.add_all([person, role])
+  db.session.flush()
+  db.session.execute(all_models.AccessControlList.__table__.insert(), [
+      {"person_id": person.id, "ac_role_id": role.id,
+       "object_type": "Control", "object_id": object_id}
+      for object_id in range(1, count + 1)
+  ])
+  db.session.commit()
+  return person, role
+
+
+def time_load(person, changes=None):
+  """Return the average duration of loading permissions after changes."""
+  cache = _get_cache_manager().cache_object.memcache_client
+  total = 0
+  for _ in range(REPEAT):
+    if changes is None:
+      permissions_cache.invalidate_all(cache)
+    elif changes:
+      permissions_cache.invalidate(cache, changes)
+    with Timer() as timer:
+      load_permissions_for(person)
+    total += timer.duration
+  return total / REPEAT
+
+
+def main():
+  """Run the benchmark and print load times in milliseconds."""
+  settings.MEMCACHE_MECHANISM = True
+  settings.CACHE_BACKEND = "ggrc.cache.backends.InProcessBackend"
+  person, role = populate_acl(ACL_COUNT)
+  try:
+    rows = [
+        ("cold", time_load(person)),
+        ("warm", time_load(person, set())),
+        ("ACL change", time_load(person, {("acl", person.id)})),
+        ("relationship change",
+         time_load(person, {("context_relationships", None),
+                            ("assignees", None)})),
+    ]
+  finally:
+    db.session.query(all_models.AccessControlList).filter_by(
+        person_id=person.id).delete()
+    db.session.delete(role)
+    db.session.delete(person)
+    db.session.commit()
+
+  print_table(
+      "Permission load time for {} ACL entries".format(ACL_COUNT),
+      ("load", "ms"),
+      [(name, "{:.2f}".format(duration * 1000)) for name, duration in rows],
+  )
+
+
+if __name__ == "__main__":
+  main()
@@ -0,0 +1,91 @@
+# Copyright (C) 2017 Google Inc.
+# Licensed under http://www.apache.org/licenses/LICENSE-2.0 <see LICENSE file>
+
+"""Compare per-chunk latency of OFFSET and keyset query chunks.
+
+The benchmark fills the events table with ROW_COUNT rows and reads them back
+with the old `ORDER BY id LIMIT n OFFSET k` chunks and with
+ggrc.utils.generate_query_chunks. The OFFSET latency grows with the position
+of the chunk while the keyset latency should stay flat.
+"""
+
+from ggrc import db
+from ggrc.app import app  # noqa pylint: disable=unused-import
+from ggrc.models import all_models
+from ggrc.utils import generate_query_chunks
+from integration.ggrc.benchmarks import Timer
+from integration.ggrc.benchmarks import print_table
+
+
+ROW_COUNT = 500000
+CHUNK_SIZE = 1000
+REPORT_EVERY = 50
+
+
+def populate_events(count):
+  """Insert `count` events and return the id range of the new rows."""
+  table = all_models.Event.__table__
+  first_id = db.session.query(db.func.max(table.c.id)).scalar() or 0
+  for start in range(0, count, 10000):
+    db.session.execute(table.insert(), [
+        {"action": "BULK", "resource_type": "Benchmark", "resource_id": i}
+        for i in range(start, min(start + 10000, count))
+    ])
+  db.session.commit()
+  last_id = db.session.query(db.func.max(table.c.id)).scalar()
+  return first_id, last_id
+
+
+def offset_chunks(query, chunk_size):
+  """Chunk generator used before keyset pagination was introduced."""
+  count = query.count()
+  for offset in range(0, count, chunk_size):
+    yield query.order_by("id").limit(chunk_size).offset(offset)
+
+
+def time_chunks(chunks):
+  """Return the duration of fetching every chunk."""
+  durations = []
+  while True:
+    with Timer() as timer:
+      chunk = next(chunks, None)
+      if chunk is None:
+        break
+      chunk.all()
+    durations.append(timer.duration)
+  return durations
+
+
+def main():
+  """Run the benchmark and print per-chunk latencies in milliseconds."""
+  first_id, last_id = populate_events(ROW_COUNT)
+  event = all_models.Event
+  query = db.session.query(event.id, event.resource_id).filter(
+      event.id > first_id,
+      event.id <= last_id,
+  )
+  try:
+    offset_times = time_chunks(offset_chunks(query, CHUNK_SIZE))
+    keyset_times = time_chunks(generate_query_chunks(query, CHUNK_SIZE))
+  finally:
+    db.session.query(event).filter(event.id > first_id).delete()
+    db.session.commit()
+
+  rows = [
+      (index * CHUNK_SIZE,
+       "{:.2f}".format(offset_times[index] * 1000),
+       "{:.2f}".format(keyset_times[index] * 1000))
+      for index in range(0, len(keyset_times), REPORT_EVERY)
+  ]
+  print_table(
+      "Chunk latency for {} rows in chunks of {}".format(ROW_COUNT,
+                                                         CHUNK_SIZE),
+      ("offset", "OFFSET ms", "keyset ms"),
+      rows,
+  )
+  print "Total OFFSET: {:.2f}s, keyset: {:.2f}s".format(
+      sum(offset_times), sum(keyset_times))
+
+
+if __name__ == "__main__":
+  main()
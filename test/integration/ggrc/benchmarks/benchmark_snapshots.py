@@ -0,0 +1,163 @@
+# Copyright (C) 2017 Google Inc.
+# Licensed under http://www.apache.org/licenses/LICENSE-2.0 <see LICENSE file>
+
+"""Measure snapshot creation and update of audits with large scopes.
+
+For every count in CONTROL_COUNTS the benchmark maps that many controls with
+REVISION_COUNT revisions each to a program and times:
+
+  * the latest revision lookup scanning the full revision history, as
+    get_revisions did before LatestRevisions, and with LatestRevisions
+  * creating the snapshots of an audit of the program
+  * updating them after a new revision of every tenth control
+
+All populated rows are removed after every count.
+"""
+
+from sqlalchemy import and_
+from sqlalchemy.sql.expression import tuple_
+
+from ggrc import db
+from ggrc.app import app
+from ggrc.models import all_models
+from ggrc.snapshotter import create_snapshots
+from ggrc.snapshotter import upsert_snapshots
+from ggrc.snapshotter.datastructures import Stub
+from ggrc.snapshotter.helpers import LatestRevisions
+from ggrc.snapshotter.helpers import chunks
+from integration.ggrc.benchmarks import Timer
+from integration.ggrc.benchmarks import print_table
+from integration.ggrc.models import factories
+
+
+CONTROL_COUNTS = [10000, 30000]
+REVISION_COUNT = 3
+SLUG_PREFIX = "BENCHMARK-SNAPSHOT-"
+
+
+def populate_scope(program, count):
+  """Map `count` new controls with revisions to the program."""
+  db.session.execute(all_models.Control.__table__.insert(), [
+      {"title": "Benchmark control {}".format(index),
+       "slug": "{}{}".format(SLUG_PREFIX, index)}
+      for index in range(count)
+  ])
+  ids = [id_ for id_, in db.session.query(all_models.Control.id).filter(
+      all_models.Control.slug.startswith(SLUG_PREFIX))]
+  event = all_models.Event(action="BULK", resource_type="Control")
+  db.session.add(event)
+  db.session.flush()
+  for chunk in chunks(ids):
+    db.session.execute(all_models.Relationship.__table__.insert(), [
+        {"source_type": "Program", "source_id": program.id,
+         "destination_type": "Control", "destination_id": id_}
+        for id_ in chunk
+    ])
+    for _ in range(REVISION_COUNT):
+      add_revisions(event, chunk)
+  db.session.commit()
+  return event, ids
+
+
+def add_revisions(event, control_ids):
+  """Add a modified revision of every control."""
+  db.session.execute(all_models.Revision.__table__.insert(), [
+      {"resource_type": "Control", "resource_id": id_, "event_id": event.id,
+       "action": "modified",
+       "content": {"id": id_, "title": "Benchmark control"}}
+      for id_ in control_ids
+  ])
+
+
+def scan_history(stubs):
+  """Find latest revisions by reading every revision of the objects."""
+  latest = {}
+  for chunk in chunks(stubs):
+    query = db.session.query(
+        all_models.Revision.id,
+        all_models.Revision.resource_type,
+        all_models.Revision.resource_id,
+    ).filter(tuple_(
+        all_models.Revision.resource_type,
+        all_models.Revision.resource_id,
+    ).in_(chunk)).order_by(all_models.Revision.id.desc())
+    for revid, restype, resid in query:
+      latest.setdefault(Stub(restype, resid), revid)
+  return latest
+
+
+def remove_scope(program, audit, event, ids):
+  """Remove snapshots, relationships, revisions and controls."""
+  snapshot_ids = [id_ for id_, in db.session.query(
+      all_models.Snapshot.id).filter_by(parent_type="Audit",
+                                        parent_id=audit.id)]
+  for chunk in chunks(snapshot_ids):
+    all_models.Revision.query.filter(
+        all_models.Revision.resource_type == "Snapshot",
+        all_models.Revision.resource_id.in_(chunk),
+    ).delete(synchronize_session=False)
+    all_models.Snapshot.query.filter(
+        all_models.Snapshot.id.in_(chunk)).delete(synchronize_session=False)
+  relationships = all_models.Relationship.query.filter(and_(
+      all_models.Relationship.source_type.in_(["Program", "Audit"]),
+      all_models.Relationship.source_id.in_([program.id, audit.id]),
+      all_models.Relationship.destination_type == "Control",
+  ))
+  relationship_ids = [rel.id for rel in relationships]
+  for chunk in chunks(relationship_ids):
+    all_models.Revision.query.filter(
+        all_models.Revision.resource_type == "Relationship",
+        all_models.Revision.resource_id.in_(chunk),
+    ).delete(synchronize_session=False)
+    all_models.Relationship.query.filter(
+        all_models.Relationship.id.in_(chunk)).delete(
+            synchronize_session=False)
+  for chunk in chunks(ids):
+    all_models.Revision.query.filter(
+        all_models.Revision.resource_type == "Control",
+        all_models.Revision.resource_id.in_(chunk),
+    ).delete(synchronize_session=False)
+    all_models.Control.query.filter(
+        all_models.Control.id.in_(chunk)).delete(synchronize_session=False)
+  db.session.delete(event)
+  db.session.commit()
+
+
+def run(count):
+  """Return timings in seconds for a scope of `count` controls."""
+  program = factories.ProgramFactory()
+  audit = factories.AuditFactory(program=program)
+  event, ids = populate_scope(program, count)
+  try:
+    stubs = [Stub("Control", id_) for id_ in ids]
+    with Timer() as scan_timer:
+      scan_history(stubs)
+    with Timer() as lookup_timer:
+      LatestRevisions().load(stubs)
+    with Timer() as create_timer:
+      create_snapshots(audit, event)
+    add_revisions(event, ids[::10])
+    db.session.commit()
+    with Timer() as update_timer:
+      upsert_snapshots(audit, event)
+  finally:
+    remove_scope(program, audit, event, ids)
+  return (count, scan_timer.duration, lookup_timer.duration,
+          create_timer.duration, update_timer.duration)
+
+
+def main():
+  """Run the benchmark and print durations in seconds."""
+  with app.test_request_context():
+    rows = [run(count) for count in CONTROL_COUNTS]
+  print_table(
+      "Snapshots of audits with {} revisions per control".format(
+          REVISION_COUNT),
+      ("controls", "history scan", "latest lookup", "create", "update"),
+      [(row[0],) + tuple("{:.2f}".format(value) for value in row[1:])
+       for row in rows],
+  )
+
+
+if __name__ == "__main__":
+  main()
@@ -1,13 +1,17 @@
 # Copyright (C) 2017 Google Inc.
 # Licensed under http://www.apache.org/licenses/LICENSE-2.0 <see LICENSE file>
 
+import mock
 from mock import MagicMock
 
 import ggrc.builder
 import ggrc.models
+import ggrc.utils
 from ggrc.builder.json import publish
+from ggrc.builder.json import publish_representation
 from ggrc.services.common import Resource
 from integration.ggrc import TestCase
+from integration.ggrc.models import factories
 
 
 class TestBuilder(TestCase):
@@ -104,3 +108,63 @@ class TestBuilder(TestCase):
     self.assertDictContainsSubset(
         {'prop_b': 'prop_b', 'mixin': 'mixin_b'},
         json_obj)
+
+  def test_compiled_serializer(self):
+    """Serializers are compiled once per model, inclusions and whitelist."""
+    self.mock_service('MockCompiledModel')
+    model = self.mock_model(
+        'MockCompiledModel',
+        foo='bar',
+        boo='far',
+        id=1,
+        _publish_attrs=['foo', 'boo'],
+    )
+    publish(model)
+    model.foo = 'baz'
+    json_obj = publish(model)
+    self.assertEqual(('baz', 'far'), (json_obj['foo'], json_obj['boo']))
+    json_obj = publish(model, attribute_whitelist=['boo'])
+    self.assertNotIn('foo', json_obj)
+    builder = getattr(ggrc.builder, 'MockCompiledModel')
+    self.assertEqual(2, len(builder._serializers))
+
+    with mock.patch("ggrc.builder.json.SERIALIZER_CACHE_SIZE", 2):
+      publish(model, attribute_whitelist=['foo'])
+      publish(model)
+      self.assertEqual(2, len(builder._serializers))
+      self.assertEqual([frozenset(['foo']), None],
+                       [key[2] for key in builder._serializers])
+
+  def test_registered_stubs(self):
+    """Stubs are resolved from where they were placed when published."""
+    source = factories.ControlFactory()
+    destination = factories.ObjectiveFactory()
+    relationship = factories.RelationshipFactory(source=source,
+                                                 destination=destination)
+    json_objs = [publish(relationship), publish(relationship)]
+    # Published objects that are never represented don't keep stubs around.
+    publish(relationship)
+    self.assertFalse(hasattr(ggrc.builder.json.g, "_lazy_stubs"))
+    self.assertTrue(all(json_obj.lazy_stubs.complete
+                        for json_obj in json_objs))
+    with mock.patch("ggrc.builder.json.gather_queries") as gather_queries:
+      self.assertIs(json_objs, publish_representation(json_objs))
+    self.assertFalse(gather_queries.called)
+    for json_obj in json_objs:
+      self.assertEqual(
+          ("Control", source.id, "Objective", destination.id),
+          (json_obj["source"]["type"], json_obj["source"]["id"],
+           json_obj["destination"]["type"], json_obj["destination"]["id"]))
+      self.assertEqual({}, json_obj.lazy_stubs.placements)
+    ggrc.utils.as_json(json_objs)
+
+  def test_unregistered_stubs(self):
+    """Representations with unregistered stubs are walked."""
+    control = factories.ControlFactory()
+    json_obj = publish(control)
+    json_obj["extra"] = ggrc.builder.json.LazyStubRepresentation(
+        "Control", control.id)
+    json_obj.lazy_stubs.created += 1
+    publish_representation(json_obj)
+    self.assertEqual(("Control", control.id),
+                     (json_obj["extra"]["type"], json_obj["extra"]["id"]))
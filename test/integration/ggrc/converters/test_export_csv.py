@@ -4,6 +4,8 @@
 from os.path import abspath, dirname, join
 from flask.json import dumps
 
+import mock
+
 from ggrc.converters import get_importables
 from ggrc.models.reflection import AttributeInfo
 from integration.ggrc import TestCase
@@ -400,6 +402,27 @@ class TestExportMultipleObjects(TestCase):
         self.assertNotIn(programs[i], response.data)
         self.assertNotIn(regulations[i], response.data)
 
+  def test_streamed_multi_export(self):
+    """Test streamed export with objects split over multiple chunks."""
+    with factories.single_commit():
+      programs = [factories.ProgramFactory().title for _ in range(5)]
+      regulations = [factories.RegulationFactory().title for _ in range(2)]
+    data = [
+        {"object_name": "Program", "fields": ["slug", "title"]},
+        {"object_name": "Regulation", "fields": ["slug", "title"]},
+    ]
+    full_response = self.export_csv(data)
+    self.headers["X-export-stream"] = "true"
+    with mock.patch("ggrc.converters.base_block.EXPORT_CHUNK_SIZE", 2):
+      response = self.export_csv(data)
+    self.assert200(response)
+    for title in programs + regulations:
+      self.assertIn(",{},".format(title), response.data)
+    self.assertEqual(
+        [line.rstrip(",") for line in response.data.splitlines()],
+        [line.rstrip(",") for line in full_response.data.splitlines()],
+    )
+
   def test_relevant_to_previous_export(self):
     res = self._import_file("data_for_export_testing_relevant_previous.csv")
     self._check_csv_response(res, {})
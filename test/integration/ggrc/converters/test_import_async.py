@@ -0,0 +1,58 @@
+# Copyright (C) 2017 Google Inc.
+# Licensed under http://www.apache.org/licenses/LICENSE-2.0 <see LICENSE file>
+
+"""Tests for csv imports running as background tasks."""
+
+import json
+import os
+
+import mock
+
+from ggrc import models
+from integration.ggrc import TestCase
+
+
+class TestAsyncImport(TestCase):
+  """Test csv imports in background tasks with batched commits."""
+
+  def setUp(self):
+    super(TestAsyncImport, self).setUp()
+    self.client.get("/login")
+
+  def _import_async(self, filename, dry_run=False):
+    """Post a csv file for asynchronous import."""
+    data = {"file": (open(os.path.join(self.CSV_DIR, filename)), filename)}
+    headers = {
+        "X-test-only": "true" if dry_run else "false",
+        "X-requested-by": "GGRC",
+        "X-import-async": "true",
+    }
+    return self.client.post("/_service/import_csv", data=data,
+                            headers=headers)
+
+  @mock.patch("ggrc.settings.IMPORT_BATCH_SIZE", 1)
+  def test_async_import(self):
+    """Import result is available on the background task."""
+    with mock.patch("ggrc.models.background_task.BackgroundTask."
+                    "set_progress") as set_progress:
+      response = self._import_async("policy_basic_import.csv")
+    self.assertEqual(response.status_code, 202)
+    task_link = response.json["href"]
+
+    response = self.client.get(task_link)
+    self.assert200(response)
+    info = {block["name"]: block for block in json.loads(response.data)}
+    self.assertEqual(info["Policy"]["created"], 3)
+    self.assertEqual(models.Policy.query.count(), 3)
+    progress = [call[0][0] for call in set_progress.call_args_list]
+    self.assertEqual([p["processed_rows"] for p in progress],
+                     [1, 2, 3, 4, 5])
+    self.assertEqual({p["rows"] for p in progress}, {5})
+
+  def test_dry_run(self):
+    """Asynchronous dry run does not import any objects."""
+    response = self._import_async("policy_basic_import.csv", dry_run=True)
+    response = self.client.get(response.json["href"])
+    info = {block["name"]: block for block in json.loads(response.data)}
+    self.assertEqual(info["Policy"]["created"], 3)
+    self.assertEqual(models.Policy.query.count(), 0)
@@ -4,6 +4,9 @@
 
 from collections import OrderedDict
 
+import mock
+from sqlalchemy import event
+
 from ggrc import models
 from ggrc.converters import errors
 from integration.ggrc import TestCase
@@ -42,6 +45,42 @@ class TestBasicCsvImport(TestCase):
     policy = models.Policy.eager_query().first()
     self.assertEqual(policy.modified_by.email, "user@example.com")
 
+  @mock.patch("ggrc.converters.base_block.IMPORT_FLUSH_BATCH_SIZE", 2)
+  def test_policy_import_flush_batches(self):
+    """Test policy import with rows flushed in batches."""
+    response = self.import_file("policy_basic_import.csv")
+    self.assertEqual(response[0]["created"], 3)
+    self.assertEqual(models.Policy.query.count(), 3)
+    self.assertEqual(models.Revision.query.filter(
+        models.Revision.resource_type == "Policy"
+    ).count(), 6)
+
+  def test_policy_import_failed_flush_batch(self):
+    """Test rows of a failed flush batch are inserted one by one."""
+    def break_context(mapper, connection, target):
+      """Make the insert of one policy violate the context foreign key."""
+      # pylint: disable=unused-argument
+      if target.title == "Who let the dogs out":
+        target.context_id = 999999
+
+    event.listen(models.Policy, "before_insert", break_context)
+    try:
+      response = self._import_file("policy_basic_import.csv")
+    finally:
+      event.remove(models.Policy, "before_insert", break_context)
+    self.assertEqual(response[0]["created"], 2)
+    self.assertEqual(response[0]["row_errors"], [
+        errors.UNKNOWN_ERROR.format(line=5),
+    ])
+    policies = models.Policy.query.all()
+    self.assertEqual({policy.title for policy in policies},
+                     {"some weird policy", "another weird policy"})
+    for policy in policies:
+      self.assertEqual(len(policy.access_control_list), 1)
+    self.assertEqual(models.Revision.query.filter(
+        models.Revision.resource_type == "Policy"
+    ).count(), 4)
+
   def test_policy_import_working_with_warnings(self):
     """Test Policy import with warnings."""
     def test_owners(policy):
@@ -3,11 +3,20 @@
 
 """Integration tests for custom attribute definitions model."""
 
+import datetime
+import operator
+
+import mock
 import sqlalchemy.exc
 
 from ggrc import db
+from ggrc import settings
 from ggrc import views
+from ggrc import fulltext
 from ggrc.fulltext import mysql
+from ggrc.fulltext import search_backends
+from ggrc.fulltext import typed_properties
+from ggrc.models import all_models
 from integration.ggrc import TestCase
 from integration.ggrc.models import factories
 
@@ -73,3 +82,190 @@ class TestCAD(TestCase):
           property=u"\u5555" * 240 + u"2",
       ))
       db.session.commit()
+
+
+class TestIncrementalUpdate(TestCase):
+  """Tests for diff based full text record updates."""
+
+  @staticmethod
+  def _get_records(obj):
+    """Get full text record ids and contents of an object."""
+    records = mysql.MysqlRecordProperty.query.filter(
+        mysql.MysqlRecordProperty.type == obj.type,
+        mysql.MysqlRecordProperty.key == obj.id,
+    )
+    return {r.property: (r.id, r.content) for r in records}
+
+  def test_changed_record_updated(self):
+    """Only records of changed properties are written."""
+    market = factories.MarketFactory(title="old title")
+    market_id = market.id
+    views.do_reindex()
+    market = all_models.Market.query.get(market_id)
+    before = self._get_records(market)
+
+    all_models.Market.query.filter_by(id=market_id).update(
+        {"title": "new title"})
+    all_models.Market.bulk_record_update_for([market_id])
+    db.session.commit()
+
+    after = self._get_records(market)
+    self.assertEqual(after["title"], (before["title"][0], "new title"))
+    del before["title"], after["title"]
+    self.assertEqual(before, after)
+
+  def test_obsolete_record_deleted(self):
+    """Records of properties that are no longer indexed are removed."""
+    market = factories.MarketFactory()
+    market_id = market.id
+    all_models.Market.bulk_record_update_for([market_id])
+    db.session.add(mysql.MysqlRecordProperty(
+        key=market_id,
+        type="Market",
+        property="obsolete",
+        content="value",
+    ))
+    db.session.commit()
+
+    all_models.Market.bulk_record_update_for([market_id])
+    db.session.commit()
+
+    market = all_models.Market.query.get(market_id)
+    self.assertNotIn("obsolete", self._get_records(market))
+    self.assertIn("title", self._get_records(market))
+
+
+class TestSearchBackends(TestCase):
+  """Tests for full text search backends."""
+
+  @staticmethod
+  def _search(backend, terms):
+    """Get keys of Markets with a searched property matching terms."""
+    query = db.session.query(mysql.MysqlRecordProperty.key).filter(
+        mysql.MysqlRecordProperty.type == "Market",
+        mysql.MysqlRecordProperty.property.in_(mysql.SEARCHED_PROPERTIES),
+        backend.get_filter(terms),
+    )
+    return {key for key, in query}
+
+  def test_inverted_index_matches_like(self):
+    """Inverted index backend returns the same objects as LIKE."""
+    market_ids = [factories.MarketFactory(title=title).id
+                  for title in ("Alpha market", "beta MARKET", "Gamma")]
+    views.do_reindex()
+    like = search_backends.LikeSearchBackend(settings)
+    inverted = search_backends.InvertedIndexSearchBackend(settings)
+    for terms in ("market", "a m", "gam", "a", "delta"):
+      self.assertEqual(self._search(inverted, terms),
+                       self._search(like, terms))
+
+    with mock.patch.object(mysql.MysqlIndexer, "search_backend", inverted):
+      all_models.Market.query.filter_by(id=market_ids[2]).update(
+          {"title": "Gamma market"})
+      all_models.Market.bulk_record_update_for([market_ids[2]])
+      self.assertEqual(self._search(inverted, "market"), set(market_ids[:2]))
+      db.session.commit()
+      self.assertEqual(self._search(inverted, "market"), set(market_ids))
+
+      all_models.Market.query.filter_by(id=market_ids[2]).update(
+          {"title": "Gamma"})
+      all_models.Market.bulk_record_update_for([market_ids[2]])
+      db.session.rollback()
+      self.assertEqual(self._search(inverted, "market"), set(market_ids))
+
+  def test_inverted_index_record_writes(self):
+    """Records written with create_record and delete_record are applied."""
+    market_id = factories.MarketFactory(title="Alpha market").id
+    views.do_reindex()
+    inverted = search_backends.InvertedIndexSearchBackend(settings)
+    self.assertEqual(self._search(inverted, "market"), {market_id})
+    indexer = fulltext.get_indexer()
+    with mock.patch.object(mysql.MysqlIndexer, "search_backend", inverted):
+      indexer.delete_record(market_id, "Market", commit=False)
+      db.session.commit()
+      self.assertEqual(self._search(inverted, "market"), set())
+      market = all_models.Market.query.get(market_id)
+      indexer.create_record(indexer.fts_record_for(market), commit=False)
+      db.session.commit()
+      self.assertEqual(self._search(inverted, "market"), {market_id})
+
+  def test_inverted_index_bounds_filter(self):
+    """Short terms and searches matching many objects fall back to LIKE."""
+    factories.MarketFactory(title="Alpha market")
+    views.do_reindex()
+    inverted = search_backends.InvertedIndexSearchBackend(settings)
+    like = mysql.MysqlRecordProperty.content.contains("a")
+    self.assertEqual(str(inverted.get_filter("a")), str(like))
+    with mock.patch.object(inverted, "MAX_FILTER_KEYS", 0):
+      self.assertEqual(self._search(inverted, "market"),
+                       self._search(search_backends.LikeSearchBackend(
+                           settings), "market"))
+
+
+class TestTypedProperties(TestCase):
+  """Tests for typed custom attribute value tables."""
+
+  def setUp(self):
+    super(TestTypedProperties, self).setUp()
+    text_cad = CAD(title="text ca", definition_type="market")
+    date_cad = CAD(title="date ca", definition_type="market",
+                   attribute_type="Date")
+    self.market_ids = []
+    for text, date in [("alpha", "2017-01-15"), ("beta", "2017-03-01"),
+                       ("", "")]:
+      market = factories.MarketFactory()
+      CAV(custom_attribute=text_cad, attributable=market,
+          attribute_value=text)
+      CAV(custom_attribute=date_cad, attributable=market,
+          attribute_value=date)
+      self.market_ids.append(market.id)
+    views.do_reindex()
+
+  @staticmethod
+  def _filter(key, predicate, value):
+    """Get ids of Markets matching a typed filter."""
+    model = all_models.Market
+    return {id_ for id_, in db.session.query(model.id).filter(
+        typed_properties.get_filter(model, key, predicate, value))}
+
+  def test_values_indexed(self):
+    """Non-empty values are stored in the text and date tables."""
+    texts = typed_properties.TextRecordProperty.query.filter_by(
+        type="Market", property="text ca")
+    self.assertEqual({(r.key, r.content) for r in texts}, {
+        (self.market_ids[0], "alpha"),
+        (self.market_ids[1], "beta"),
+    })
+    dates = typed_properties.DateRecordProperty.query.filter_by(
+        type="Market", property="date ca")
+    self.assertEqual({(r.key, r.content) for r in dates}, {
+        (self.market_ids[0], datetime.date(2017, 1, 15)),
+        (self.market_ids[1], datetime.date(2017, 3, 1)),
+    })
+
+  def test_filters(self):
+    """Comparisons are answered from the typed tables."""
+    self.assertEqual(self._filter("text ca", operator.eq, "beta"),
+                     {self.market_ids[1]})
+    self.assertEqual(
+        self._filter("date ca", operator.lt, datetime.date(2017, 2, 1)),
+        {self.market_ids[0]})
+    self.assertIsNone(typed_properties.get_filter(
+        all_models.Market, "title", operator.eq, "beta"))
+    empty = db.session.query(all_models.Market.id).filter(
+        typed_properties.get_empty_filter(all_models.Market, "text ca"))
+    self.assertEqual({id_ for id_, in empty}, {self.market_ids[2]})
+
+  def test_values_refreshed(self):
+    """Typed values follow updates of full text records."""
+    cav = all_models.CustomAttributeValue.query.filter_by(
+        attributable_id=self.market_ids[0],
+        attribute_value="alpha",
+    ).one()
+    cav.attribute_value = "gamma"
+    db.session.commit()
+    all_models.Market.bulk_record_update_for([self.market_ids[0]])
+    db.session.commit()
+    self.assertEqual(self._filter("text ca", operator.eq, "gamma"),
+                     {self.market_ids[0]})
+    self.assertEqual(self._filter("text ca", operator.eq, "alpha"), set())
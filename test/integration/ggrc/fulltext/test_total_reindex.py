@@ -3,9 +3,15 @@
 
 """Test for total reindex procedure"""
 
-from ggrc import fulltext
+import datetime
+
+import mock
 
+from ggrc import db
+from ggrc import fulltext
 from ggrc import views
+from ggrc.fulltext import reindex
+from ggrc.models import all_models
 from integration.ggrc import TestCase
 from integration.ggrc.models import factories as ggrc_factories
 from integration.ggrc_workflows.models import factories as wf_factories
@@ -54,3 +60,95 @@ class TestTotalTeindex(TestCase):
     count = indexer.record_type.query.count()
     views.do_reindex()
     self.assertEqual(count, indexer.record_type.query.count())
+
+  @mock.patch("ggrc.settings.REINDEX_PARTITION_SIZE", 2)
+  def test_partitioned_reindex(self):
+    """Test that reindex is split into partitions of a single model."""
+    with ggrc_factories.single_commit():
+      for _ in range(5):
+        ggrc_factories.ControlFactory()
+    throughput = views.do_reindex()
+    partitions = all_models.ReindexPartition.query.filter_by(
+        model_name="Control").all()
+    self.assertEqual(len(partitions), 3)
+    self.assertEqual({p.status for p in partitions}, {"Success"})
+    self.assertEqual(sum(p.object_count for p in partitions), 5)
+    self.assertEqual(throughput["Control"]["objects"], 5)
+
+  @mock.patch("ggrc.settings.REINDEX_PARTITION_SIZE", 2)
+  def test_resume_reindex(self):
+    """Test that an interrupted reindex only processes unfinished parts."""
+    with ggrc_factories.single_commit():
+      controls = [ggrc_factories.ControlFactory() for _ in range(5)]
+    control_id = controls[-1].id
+    views.do_reindex()
+    partition_count = all_models.ReindexPartition.query.count()
+    indexer = fulltext.get_indexer()
+    count = indexer.record_type.query.count()
+
+    # simulate a reindex that died while processing the last control
+    partition = all_models.ReindexPartition
+    unfinished = partition.query.filter(
+        partition.model_name == "Control",
+        partition.first_id <= control_id,
+        partition.last_id >= control_id,
+    ).one()
+    unfinished.status = "Running"
+    unfinished.updated_at = datetime.datetime.now() - datetime.timedelta(1)
+    object_count = unfinished.object_count
+    indexer.record_type.query.filter(
+        indexer.record_type.type == "Control",
+        indexer.record_type.key == control_id,
+    ).delete()
+    db.session.commit()
+
+    throughput = views.do_reindex()
+    self.assertEqual(throughput.keys(), ["Control"])
+    self.assertEqual(throughput["Control"]["objects"], object_count)
+    self.assertEqual(all_models.ReindexPartition.query.count(),
+                     partition_count)
+    self.assertEqual(count, indexer.record_type.query.count())
+
+  @mock.patch("ggrc.settings.REINDEX_PARTITION_SIZE", 2)
+  def test_running_partitions_not_resumed(self):
+    """Test that partitions of a running reindex are left to it."""
+    with ggrc_factories.single_commit():
+      for _ in range(3):
+        ggrc_factories.ControlFactory()
+    views.do_reindex()
+    partition = all_models.ReindexPartition
+    partition.query.filter_by(model_name="Control").update(
+        {"status": "Running"})
+    db.session.commit()
+
+    self.assertEqual(views.do_reindex(), {})
+    self.assertEqual(
+        {p.status for p in partition.query.filter_by(model_name="Control")},
+        {"Running"})
+
+  @mock.patch("ggrc.settings.REINDEX_PARTITION_SIZE", 2)
+  def test_failed_reindex(self):
+    """Test that failed partitions fail the reindex and are not resumed."""
+    with ggrc_factories.single_commit():
+      for _ in range(3):
+        ggrc_factories.ControlFactory()
+    original = reindex._reindex_indexed_model
+
+    def fail_controls(model, ids_query):
+      if model.__name__ == "Control":
+        raise Exception("Reindex failure")
+      original(model, ids_query)
+
+    with mock.patch("ggrc.fulltext.reindex._reindex_indexed_model",
+                    side_effect=fail_controls):
+      with self.assertRaises(reindex.ReindexError):
+        views.do_reindex()
+    partition = all_models.ReindexPartition
+    self.assertEqual(
+        {p.status for p in partition.query.filter_by(model_name="Control")},
+        {"Failure"})
+
+    throughput = views.do_reindex()
+    self.assertEqual(throughput["Control"]["objects"], 3)
+    self.assertEqual(throughput["Control"]["failed_partitions"], 0)
+    self.assertEqual({p.status for p in partition.query}, {"Success"})
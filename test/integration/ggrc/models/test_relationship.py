@@ -5,6 +5,11 @@
 
 import json
 
+from ggrc import db
+from ggrc.migrations import utils as migration_utils
+from ggrc.models import all_models
+from ggrc.models import relationship_helper
+from ggrc.models.relationship import RelationshipNeighbor
 from integration.ggrc import TestCase
 from integration.ggrc.models import factories
 
@@ -50,3 +55,78 @@ class TestRelationship(TestCase):
     """Can not create a Relationship with invalid attr value."""
     response = self._post_relationship("AssigneeType", "Monkey")
     self.assert400(response)
+
+
+class TestRelationshipNeighbors(TestCase):
+  """Test the undirected adjacency index of relationships."""
+
+  @staticmethod
+  def _get_neighbors():
+    """Get all stored neighbor rows without relationship ids."""
+    return set(db.session.query(
+        RelationshipNeighbor.object_type,
+        RelationshipNeighbor.object_id,
+        RelationshipNeighbor.related_type,
+        RelationshipNeighbor.related_id,
+    ))
+
+  def test_neighbors_follow_relationships(self):
+    """Neighbors are added and removed together with relationships."""
+    market = factories.MarketFactory()
+    org_group = factories.OrgGroupFactory()
+    relationship = factories.RelationshipFactory(source=market,
+                                                 destination=org_group)
+    self.assertEqual(self._get_neighbors(), {
+        ("Market", market.id, "OrgGroup", org_group.id),
+        ("OrgGroup", org_group.id, "Market", market.id),
+    })
+
+    db.session.delete(relationship)
+    db.session.commit()
+    self.assertEqual(self._get_neighbors(), set())
+
+  def test_get_ids_related_to(self):
+    """Related ids are found from both sides of relationships."""
+    market = factories.MarketFactory()
+    org_groups = [factories.OrgGroupFactory() for _ in range(3)]
+    factories.RelationshipFactory(source=market, destination=org_groups[0])
+    factories.RelationshipFactory(source=org_groups[1], destination=market)
+
+    org_group_ids = relationship_helper.get_ids_related_to(
+        "OrgGroup", "Market", [market.id])
+    self.assertEqual({i for i, in org_group_ids},
+                     {org_groups[0].id, org_groups[1].id})
+    market_ids = relationship_helper.get_ids_related_to(
+        "Market", "OrgGroup", [f.id for f in org_groups])
+    self.assertEqual({i for i, in market_ids}, {market.id})
+
+  def test_migration_insert_payloads(self):
+    """Relationships inserted by migration helpers get neighbors."""
+    market = factories.MarketFactory()
+    org_group = factories.OrgGroupFactory()
+    migration_utils.insert_payloads(db.session.connection(), relationships=[{
+        "source_id": market.id,
+        "source_type": "Market",
+        "destination_id": org_group.id,
+        "destination_type": "OrgGroup",
+        "modified_by_id": "NULL",
+        "context_id": "NULL",
+    }])
+    db.session.commit()
+    self.assertEqual(self._get_neighbors(), {
+        ("Market", market.id, "OrgGroup", org_group.id),
+        ("OrgGroup", org_group.id, "Market", market.id),
+    })
+
+  def test_bulk_update_endpoints(self):
+    """Bulk updates of relationship endpoints are rejected."""
+    market = factories.MarketFactory()
+    org_group = factories.OrgGroupFactory()
+    relationship = factories.RelationshipFactory(source=market,
+                                                 destination=org_group)
+    query = all_models.Relationship.query.filter_by(id=relationship.id)
+    query.update({"context_id": None}, synchronize_session=False)
+    with self.assertRaises(ValueError):
+      query.update({all_models.Relationship.source_id: org_group.id},
+                   synchronize_session=False)
+    db.session.rollback()
@@ -0,0 +1,114 @@
+# Copyright (C) 2017 Google Inc.
+# Licensed under http://www.apache.org/licenses/LICENSE-2.0 <see LICENSE file>
+
+"""Tests for materialized permitted objects."""
+
+import mock
+
+from ggrc import db
+from ggrc import settings
+from ggrc.models import all_models
+from ggrc.rbac import permitted_objects
+from integration.ggrc import TestCase
+from integration.ggrc.api_helper import Api
+from integration.ggrc.generator import ObjectGenerator
+from integration.ggrc.models import factories
+
+
+class TestPermittedObjects(TestCase):
+  """Tests for storing and refreshing permitted objects of a user."""
+
+  @staticmethod
+  def _get_stored(person_id):
+    """Get stored (type, id) pairs of a user."""
+    return {
+        (row.object_type, row.object_id)
+        for row in permitted_objects.PermittedObject.query.filter_by(
+            person_id=person_id)
+    }
+
+  def test_refresh(self):
+    """Stored objects are used only once they match the resources."""
+    resources = {("Control", 1), ("Control", 2), ("Market", 1)}
+    self.assertFalse(permitted_objects.refresh(1, resources))
+    db.session.rollback()
+    self.assertEqual(self._get_stored(1), resources)
+    self.assertTrue(permitted_objects.refresh(1, resources))
+
+  def test_refresh_changes(self):
+    """Only the difference of changed resources is written."""
+    permitted_objects.refresh(1, {("Control", 1), ("Control", 2)})
+    permitted_objects.refresh(2, {("Control", 1)})
+    new_resources = {("Control", 2), ("Market", 3)}
+    self.assertFalse(permitted_objects.refresh(1, new_resources))
+    db.session.rollback()
+    self.assertEqual(self._get_stored(1), new_resources)
+    self.assertEqual(self._get_stored(2), {("Control", 1)})
+    self.assertTrue(permitted_objects.refresh(1, new_resources))
+
+  def test_refresh_with_fingerprint(self):
+    """Resources are not collected while the permissions version matches."""
+    resources = {("Control", 1)}
+    permitted_objects.refresh(1, resources, "version")
+    db.session.rollback()
+    self.assertTrue(permitted_objects.refresh(1, resources, "version"))
+    user = mock.Mock(id=1)
+    user.is_anonymous.return_value = False
+    with mock.patch.object(permitted_objects.permissions, "get_user",
+                           return_value=user), \
+        mock.patch.object(permitted_objects.permissions,
+                          "permissions_version", return_value="version"), \
+        mock.patch.object(permitted_objects,
+                          "get_read_resources") as get_read_resources:
+      self.assertTrue(permitted_objects._is_materialized())
+    self.assertFalse(get_read_resources.called)
+
+
+class TestPermittedObjectFilters(TestCase):
+  """Tests that filtering stored permitted objects matches id lists."""
+
+  def setUp(self):
+    super(TestPermittedObjectFilters, self).setUp()
+    self.api = Api()
+    object_generator = ObjectGenerator()
+    _, self.creator = object_generator.generate_person(
+        data={"name": "Creator"}, user_role="Creator")
+    controls = [object_generator.generate_object(all_models.Control)[1]
+                for _ in xrange(4)]
+    acr = factories.AccessControlRoleFactory(object_type="Control",
+                                             read=True)
+    for control in controls[:3]:
+      factories.AccessControlListFactory(object=control, ac_role_id=acr.id,
+                                         person=self.creator)
+    self.readable_ids = sorted(control.id for control in controls[:3])
+    self.api.set_user(self.creator)
+
+  def _search_ids(self):
+    response, _ = self.api.search("Control")
+    return sorted(entry["id"] for entry in response.json["results"]["entries"])
+
+  def _query_ids(self):
+    response = self.api.send_request(self.api.client.post, data=[{
+        "object_name": "Control",
+        "filters": {"expression": {}},
+        "type": "ids",
+    }], api_link="/query")
+    return sorted(response.json[0]["Control"]["ids"])
+
+  @mock.patch.object(settings, "PERMITTED_OBJECTS_MIN_RESOURCES", 1)
+  def test_exists_filter(self):
+    """Search and query return the same objects with EXISTS and IN."""
+    # The first request stores the permitted objects of the user.
+    self._search_ids()
+    self.assertEqual(
+        sorted(object_id for object_id, in db.session.query(
+            permitted_objects.PermittedObject.object_id).filter_by(
+                person_id=self.creator.id, object_type="Control")),
+        self.readable_ids)
+    results = {}
+    for materialized in (True, False):
+      with mock.patch.object(permitted_objects, "is_materialized",
+                             return_value=materialized):
+        results[materialized] = (self._search_ids(), self._query_ids())
+    self.assertEqual(results[True], results[False])
+    self.assertEqual(results[True], (self.readable_ids, self.readable_ids))
@@ -15,6 +15,8 @@ from flask import json
 
 from ggrc import app
 from ggrc import db
+from ggrc.converters import plan_cache
+from ggrc.converters import query_helper
 from ggrc.models import CustomAttributeDefinition as CAD
 
 from integration.ggrc import TestCase
@@ -602,6 +604,75 @@ class TestAdvancedQueryAPI(BaseQueryAPITestCase):
                      set([program["title"] for program
                           in programs["values"]]))
 
+  def test_query_plan_cache(self):
+    """Filters of repeated expression shapes are served from the cache."""
+    plan_cache.PLAN_CACHE.clear()
+    for title, count in [("Cat ipsum 1", 1), ("Cat ipsum 2", 1),
+                         ("Not a title", 0)]:
+      programs = self._get_first_result_set(
+          self._make_query_dict("Program", expression=["title", "=", title]),
+          "Program",
+      )
+      self.assertEqual(programs["count"], count)
+      self.assertEqual([p["title"] for p in programs["values"]],
+                       [title] * count)
+    stats = plan_cache.get_stats()
+    self.assertEqual((stats["misses"], stats["hits"]), (1, 2))
+
+    response = self.client.get("/query/plan_cache")
+    self.assert200(response)
+    self.assertEqual(json.loads(response.data)["hits"], 2)
+
+  def test_query_keyset_paging(self):
+    """Pages read after the last id match pages read with offsets."""
+    all_programs = self._get_first_result_set(
+        self._make_query_dict("Program", type_="ids"),
+        "Program",
+    )
+    ids = sorted(all_programs["ids"])
+    query = self._make_query_dict("Program", type_="ids", limit=[5, 10])
+    query["after"] = ids[4]
+    programs = self._get_first_result_set(query, "Program")
+    self.assertEqual(programs["ids"], ids[5:10])
+    self.assertEqual(programs["total"], len(ids))
+
+    query["order_by"] = [{"name": "title"}]
+    response = self._post([query])
+    self.assert400(response)
+    self.assertEqual(response.json["message"],
+                     "`after` can not be combined with `order_by`.")
+
+  def test_query_keyset_paging_total(self):
+    """Keyset pages count the unpaged query and share its cached total."""
+    query_helper.TOTAL_CACHE.clear()
+    query = self._make_query_dict("Program", type_="ids", limit=[0, 5])
+    programs = self._get_first_result_set(query, "Program")
+    total = programs["total"]
+    # `from` of keyset pages does not affect the total.
+    query["limit"] = [100, 105]
+    query["after"] = max(programs["ids"])
+    self.assertEqual(self._get_first_result_set(query, "Program", "total"),
+                     total)
+    self.assertEqual(len(query_helper.TOTAL_CACHE.totals), 1)
+    query_helper.TOTAL_CACHE.clear()
+    self.assertEqual(self._get_first_result_set(query, "Program", "total"),
+                     total)
+
+  def test_query_total_cache(self):
+    """Totals reused for later pages are dropped after a flush."""
+    query = self._make_query_dict("Program", type_="ids", limit=[0, 2])
+    total = self._get_first_result_set(query, "Program", "total")
+    query["limit"] = [2, 4]
+    self.assertEqual(self._get_first_result_set(query, "Program", "total"),
+                     total)
+    program = factories.ProgramFactory()
+    try:
+      self.assertEqual(self._get_first_result_set(query, "Program", "total"),
+                       total + 1)
+    finally:
+      db.session.delete(program)
+      db.session.commit()
+
 
 class TestQueryAssessmentCA(BaseQueryAPITestCase):
   """Test filtering assessments by CAs"""
@@ -5,6 +5,7 @@
 Test /search REST API
 """
 
+from ggrc import db
 from ggrc.models import Control
 from integration.ggrc import TestCase
 from integration.ggrc.api_helper import Api
@@ -78,3 +79,19 @@ class TestResource(TestCase):
     self.assert400(response)
     self.assertEqual(response.json['message'], 'Query parameter "q" '
                      'specifying search terms must be provided.')
+
+  def test_search_counts_extra_columns(self):
+    """Test counts with extra columns filtered by extra params."""
+    Control.query.filter_by(id=self.objects[0].id).update(
+        {"status": "Deprecated"})
+    db.session.commit()
+    response = self.api.client.get(
+        "/search?q=&types=Control,Market&counts_only=true"
+        "&extra_columns=Control_Draft=Control,Control_All=Control"
+        "&extra_params=Control_Draft:status=Draft"
+    )
+    self.assertEqual(response.json["results"]["counts"], {
+        "Control": 5,
+        "Control_All": 5,
+        "Control_Draft": 4,
+    })
@@ -4,6 +4,7 @@
 """Test for indexing of snapshotted objects"""
 
 import ddt
+import mock
 
 from sqlalchemy.sql.expression import tuple_
 
@@ -13,6 +14,7 @@ from ggrc.models import all_models
 from ggrc.views import do_reindex
 from ggrc.fulltext.mysql import MysqlRecordProperty as Record
 from ggrc.snapshotter.indexer import delete_records
+from ggrc.snapshotter.indexer import reindex_snapshots
 
 from integration.ggrc.snapshotter import SnapshotterBaseTestCase
 from integration.ggrc.models import factories
@@ -389,3 +391,32 @@ class TestSnapshotIndexing(SnapshotterBaseTestCase):
                      all_found_records["{}-name".format(person.id)])
     self.assertEqual(person.user_name,
                      all_found_records["{}-user_name".format(person.id)])
+
+  @mock.patch("ggrc.snapshotter.indexer.INSERT_BATCH_SIZE", 2)
+  def test_shared_revision_reindex(self):
+    """Test reindex of snapshots sharing a revision in small batches."""
+    with factories.single_commit():
+      control = factories.ControlFactory(title="Shared control")
+    revision = all_models.Revision.query.filter(
+        all_models.Revision.resource_id == control.id,
+        all_models.Revision.resource_type == control.type,
+    ).one()
+    with factories.single_commit():
+      snapshots = [
+          factories.SnapshotFactory(child_id=control.id,
+                                    child_type=control.type,
+                                    revision=revision)
+          for _ in range(3)
+      ]
+    snapshot_ids = [snapshot.id for snapshot in snapshots]
+    delete_records(snapshot_ids)
+
+    reindex_snapshots(snapshot_ids)
+
+    titles = Record.query.filter(
+        Record.type == "Snapshot",
+        Record.key.in_(snapshot_ids),
+        Record.property == "title",
+    )
+    self.assertEqual({(r.key, r.content) for r in titles},
+                     {(i, "Shared control") for i in snapshot_ids})
@@ -9,6 +9,9 @@ import sqlalchemy as sa
 
 from ggrc import db
 import ggrc.models as models
+from ggrc.snapshotter import create_snapshots
+from ggrc.snapshotter.datastructures import Stub
+from ggrc.snapshotter.helpers import NeighborhoodCache
 from ggrc.snapshotter.rules import Types
 
 from integration.ggrc.models import factories
@@ -346,7 +349,32 @@ class TestSnapshoting(SnapshotterBaseTestCase):
     self.assertEqual(control_snapshot_revisions.count(), 2)
 
   def test_creation_of_snapshots_for_multiple_parent_objects(self):
-    pass
+    """Test snapshot creation for audits sharing a neighborhood cache"""
+    program = self.create_object(models.Program, {
+        "title": "Test Program Snapshot Multiple Parents"
+    })
+    control = self.create_object(models.Control, {
+        "title": "Test Control Snapshot Multiple Parents"
+    })
+    self.create_mapping(program, control)
+    audits = {factories.AuditFactory(program=program) for _ in range(2)}
+    event = factories.EventFactory(action="BULK", resource_type="Audit")
+    neighborhood_cache = NeighborhoodCache()
+
+    create_snapshots(set(audits), event,
+                     neighborhood_cache=neighborhood_cache)
+
+    for audit in audits:
+      snapshot = db.session.query(models.Snapshot).filter(
+          models.Snapshot.child_type == "Control",
+          models.Snapshot.child_id == control.id,
+          models.Snapshot.parent_type == "Audit",
+          models.Snapshot.parent_id == audit.id,
+      )
+      self.assertEqual(snapshot.count(), 1)
+    self.assertEqual(
+        neighborhood_cache.get({Stub("Program", program.id)}, {"Control"}),
+        {Stub("Control", control.id)})
 
   def test_individual_update(self):
     """Test update of individual snapshot
@@ -790,3 +818,49 @@ class TestSnapshoting(SnapshotterBaseTestCase):
 
     self.assertIsNotNone(models.Relationship.find_related(program, objective))
     self.assertIsNotNone(models.Relationship.find_related(program, control))
+
+  def test_created_revisions_match_rows(self):
+    """Revisions of created snapshots and relationships match their rows"""
+    program = self.create_object(models.Program, {
+        "title": "Test Program Snapshot Revisions"
+    })
+    control = self.create_object(models.Control, {
+        "title": "Test Control Snapshot Revisions"
+    })
+    self.create_mapping(program, control)
+    self.create_audit(program)
+
+    audit = db.session.query(models.Audit).filter(
+        models.Audit.title.like("%Snapshotable audit%")).one()
+    snapshot = db.session.query(models.Snapshot).filter(
+        models.Snapshot.child_type == "Control",
+        models.Snapshot.child_id == control.id,
+        models.Snapshot.parent_type == "Audit",
+        models.Snapshot.parent_id == audit.id,
+    ).one()
+    relationship = db.session.query(models.Relationship).filter(
+        models.Relationship.source_type == "Audit",
+        models.Relationship.source_id == audit.id,
+        models.Relationship.destination_type == "Control",
+        models.Relationship.destination_id == control.id,
+    ).one()
+
+    snapshot_revision = db.session.query(models.Revision).filter(
+        models.Revision.resource_type == "Snapshot",
+        models.Revision.resource_id == snapshot.id,
+    ).one()
+    self.assertEqual(snapshot_revision.action, "created")
+    self.assertEqual(snapshot_revision.content["revision_id"],
+                     snapshot.revision_id)
+    self.assertEqual(snapshot_revision.content["context_id"],
+                     snapshot.context_id)
+    self.assertEqual(snapshot_revision.content["updated_at"],
+                     snapshot.updated_at.isoformat())
+
+    relationship_revision = db.session.query(models.Revision).filter(
+        models.Revision.resource_type == "Relationship",
+        models.Revision.resource_id == relationship.id,
+    ).one()
+    self.assertEqual(relationship_revision.content["id"], relationship.id)
+    self.assertEqual(relationship_revision.content["created_at"],
+                     relationship.created_at.isoformat())
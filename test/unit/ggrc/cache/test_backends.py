@@ -0,0 +1,122 @@
+# Copyright (C) 2017 Google Inc.
+# Licensed under http://www.apache.org/licenses/LICENSE-2.0 <see LICENSE file>
+
+"""Tests for the memcache client backends."""
+
+import unittest
+
+import memcache
+import mock
+
+from ggrc.cache import MemCache
+from ggrc.cache.backends import DELETE_ITEM_MISSING
+from ggrc.cache.backends import DELETE_SUCCESSFUL
+from ggrc.cache.backends import InProcessBackend
+from ggrc.cache.backends import MemcachedBackend
+from ggrc.cache.backends import MemcachedClient
+
+
+class TestInProcessClient(unittest.TestCase):
+  """Tests for memcache semantics of the in-process client."""
+
+  def setUp(self):
+    self.backend = InProcessBackend(None)
+    self.client = self.backend.client()
+
+  def test_add_and_cas(self):
+    """Adds skip existing keys and cas needs an unchanged gets value."""
+    self.assertEqual(self.client.add_multi({"a": 1, "b": 2}), [])
+    self.assertEqual(self.client.add_multi({"a": 3}), ["a"])
+    self.assertFalse(self.client.cas("a", 4))
+    self.assertEqual(self.client.gets("a"), 1)
+    other = self.backend.client()
+    self.assertEqual(other.gets("a"), 1)
+    self.assertTrue(other.cas("a", 5))
+    self.assertFalse(self.client.cas("a", 6))
+    self.assertEqual(self.client.get_multi(["a", "b", "c"]),
+                     {"a": 5, "b": 2})
+
+  def test_delete_lock(self):
+    """Deleting with seconds rejects adds to the key until they pass."""
+    self.client.set("a", 1)
+    self.assertEqual(self.client.delete("a", 10), DELETE_SUCCESSFUL)
+    self.assertEqual(self.client.delete("a"), DELETE_ITEM_MISSING)
+    self.assertFalse(self.client.add("a", 2))
+    self.assertTrue(self.client.set("a", 3))
+    self.assertEqual(self.client.get("a"), 3)
+
+  @mock.patch("ggrc.cache.backends.time.time")
+  def test_expiration(self, time_mock):
+    """Entries expire after relative and absolute expiration times."""
+    time_mock.return_value = 3000000
+    self.client.set_multi({"a": 1}, 10)
+    self.client.set("b", 2, 3000005)
+    self.client.set("c", 3)
+    time_mock.return_value = 3000006
+    self.assertEqual(self.client.get_multi(["a", "b", "c"]), {"a": 1, "c": 3})
+    time_mock.return_value = 3000011
+    self.assertEqual(self.client.get_multi(["a", "b", "c"]), {"c": 3})
+
+  def test_memcache(self):
+    """MemCache caches collections with the in-process client."""
+    cache = MemCache()
+    cache.memcache_client = self.client
+    data = {1: {"id": 1, "title": "a"}, 2: {"id": 2, "title": "b"}}
+    self.assertIsNotNone(cache.add("collection", "controls", data))
+    result = cache.get("collection", "controls", {"ids": [2, 1]})
+    self.assertEqual(result.items(), [(2, data[2]), (1, data[1])])
+    self.assertIsNotNone(cache.remove("collection", "controls", {1: None}))
+    self.assertIsNone(cache.get("collection", "controls", {"ids": [2, 1]}))
+    self.assertEqual(self.client.get_stats()["items"], 1)
+
+
+class TestMemcachedClient(unittest.TestCase):
+  """Tests for the client on top of python-memcached."""
+
+  def setUp(self):
+    self.memcached = mock.Mock()
+    self.client = MemcachedClient(self.memcached)
+
+  def test_multi(self):
+    """Multi operations report keys that were not stored."""
+    self.memcached.add.side_effect = lambda key, value, time: key != "b"
+    self.assertEqual(self.client.add_multi({"a": 1, "b": 2}, 5), ["b"])
+    self.memcached.reset_cas.assert_not_called()
+
+  def test_delete(self):
+    """Delete ignores lock seconds which memcached does not support."""
+    self.memcached.delete.return_value = 1
+    self.assertEqual(self.client.delete("a", 5), DELETE_SUCCESSFUL)
+    self.memcached.delete.assert_called_once_with("a")
+
+
+class TestMemcachedBackend(unittest.TestCase):
+  """Tests for the backend creating python-memcached clients."""
+
+  def setUp(self):
+    settings = mock.Mock(MEMCACHED_SERVERS=["127.0.0.1:11211"])
+    self.backend = MemcachedBackend(settings)
+
+  def test_client(self):
+    """The backend wraps a python-memcached client."""
+    self.assertIsInstance(self.backend.memcache_client, memcache.Client)
+    client = self.backend.client()
+    self.assertIsInstance(client, MemcachedClient)
+    self.assertIs(client.client, self.backend.memcache_client)
+
+  def test_gets_multi(self):
+    """Values read for cas come from one gets command per server."""
+    server = mock.Mock()
+    server.readline.side_effect = [
+        b"VALUE p:a 0 1 7", b"VALUE p:c 0 1 9", b"END",
+    ]
+    memcache_client = self.backend.memcache_client
+    with mock.patch.object(memcache_client, "_get_server",
+                           side_effect=lambda key: (server, key)), \
+        mock.patch.object(memcache_client, "_recv_value",
+                          side_effect=[1, 3]):
+      result = self.backend.client().get_multi(["a", "b", "c"], "p:",
+                                               for_cas=True)
+    self.assertEqual(result, {"a": 1, "c": 3})
+    server.send_cmd.assert_called_once_with(b"gets p:a p:b p:c")
+    self.assertEqual(memcache_client.cas_ids, {b"p:a": 7, b"p:c": 9})
@@ -0,0 +1,78 @@
+# Copyright (C) 2017 Google Inc.
+# Licensed under http://www.apache.org/licenses/LICENSE-2.0 <see LICENSE file>
+
+"""Tests for the batched memcache client."""
+
+import unittest
+
+import mock
+from google.appengine.api import memcache
+
+from ggrc.cache.batching import BatchedClient
+
+
+class FakeClient(object):
+  """Memcache client storing values in a dict."""
+
+  def __init__(self):
+    self.values = {}
+    self.calls = []
+
+  def get_multi(self, keys):
+    self.calls.append(("get_multi", sorted(keys)))
+    return {key: self.values[key] for key in keys if key in self.values}
+
+  def add_multi(self, mapping, time=0):
+    # pylint: disable=redefined-outer-name,unused-argument
+    self.calls.append(("add_multi", sorted(mapping)))
+    not_added = [key for key in mapping if key in self.values]
+    for key, value in mapping.iteritems():
+      self.values.setdefault(key, value)
+    return not_added
+
+
+class FakeAsyncClient(FakeClient):
+  """Memcache client with asynchronous multi operations."""
+
+  def get_multi_async(self, keys):
+    return mock.Mock(get_result=mock.Mock(return_value=self.get_multi(keys)))
+
+  def add_multi_async(self, mapping, time=0):
+    # pylint: disable=redefined-outer-name
+    not_added = self.add_multi(mapping, time)
+    statuses = {key: memcache.EXISTS if key in not_added else memcache.STORED
+                for key in mapping}
+    return mock.Mock(get_result=mock.Mock(return_value=statuses))
+
+
+class TestBatchedClient(unittest.TestCase):
+  """Tests for splitting multi operations into batches."""
+
+  def test_batches(self):
+    """Keys are sent in batches of the configured size."""
+    for client in (FakeClient(), FakeAsyncClient()):
+      batched = BatchedClient(client, 2)
+      keys = ["a", "b", "c", "d", "e"]
+      self.assertEqual(batched.add_multi({"a": 1, "c": 3}), [])
+      self.assertEqual(batched.add_multi({"a": 2, "e": 5}), ["a"])
+      self.assertEqual(batched.get_multi(keys), {"a": 1, "c": 3, "e": 5})
+      get_calls = [call_keys for name, call_keys in client.calls
+                   if name == "get_multi"]
+      self.assertEqual(len(get_calls), 3)
+      self.assertEqual(sorted(sum(get_calls, [])), keys)
+
+  def test_async_network_error(self):
+    """Keys of failed asynchronous adds are reported as not added."""
+    client = FakeAsyncClient()
+    client.add_multi_async = mock.Mock(return_value=mock.Mock(
+        get_result=mock.Mock(return_value=None)))
+    batched = BatchedClient(client, 10)
+    self.assertEqual(sorted(batched.add_multi({"a": 1, "b": 2})), ["a", "b"])
+
+  def test_empty(self):
+    """Empty operations do not call the client."""
+    client = FakeClient()
+    batched = BatchedClient(client, 10)
+    self.assertEqual(batched.get_multi([]), {})
+    self.assertEqual(batched.add_multi({}), [])
+    self.assertEqual(client.calls, [])
@@ -0,0 +1,91 @@
+# Copyright (C) 2017 Google Inc.
+# Licensed under http://www.apache.org/licenses/LICENSE-2.0 <see LICENSE file>
+
+"""Tests for the in-process LRU cache and the tiered cache."""
+
+import unittest
+
+import mock
+
+from ggrc.cache import LRUCache
+from ggrc.cache import MemCache
+from ggrc.cache import TieredCache
+
+
+class TestLRUCache(unittest.TestCase):
+  """Tests for bounds, expiration and stats of LRUCache."""
+
+  def test_lru_eviction(self):
+    """The least recently used entry is evicted first."""
+    cache = LRUCache(2)
+    cache.set_multi({"a": 1, "b": 2})
+    cache.get_multi(["a"])
+    cache.set_multi({"c": 3})
+    self.assertEqual(cache.get_multi(["a", "b", "c"]), {"a": 1, "c": 3})
+    self.assertEqual(cache.get_stats()["evictions"], 1)
+
+  def test_byte_bound(self):
+    """Entries are evicted to keep pickled values within max_bytes."""
+    cache = LRUCache(100, max_bytes=100)
+    cache.set_multi({"a": "x" * 40})
+    cache.set_multi({"b": "y" * 40})
+    cache.set_multi({"c": "z" * 40})
+    self.assertEqual(sorted(cache.get_multi(["a", "b", "c"])), ["b", "c"])
+    self.assertEqual(cache.set_multi({"d": "w" * 200}), ["d"])
+    self.assertLessEqual(cache.get_stats()["bytes"], 100)
+
+  @mock.patch("ggrc.cache.lrucache.time.time")
+  def test_ttl(self, time_mock):
+    """Entries expire after the ttl or the given expiration time."""
+    time_mock.return_value = 1000
+    cache = LRUCache(10, ttl=10)
+    cache.set_multi({"a": 1})
+    cache.set_multi({"b": 2}, expiration_time=5)
+    time_mock.return_value = 1006
+    self.assertEqual(cache.get_multi(["a", "b"]), {"a": 1})
+    time_mock.return_value = 1011
+    self.assertEqual(cache.get_multi(["a"]), {})
+    self.assertEqual(cache.get_stats()["expirations"], 2)
+
+  def test_copies(self):
+    """Changing a returned value does not change the cached one."""
+    cache = LRUCache(10)
+    cache.set_multi({"a": {"title": "x"}})
+    cache.get_multi(["a"])["a"]["title"] = "y"
+    self.assertEqual(cache.get_multi(["a"])["a"], {"title": "x"})
+    self.assertEqual(cache.get_stats()["hits"], 2)
+
+
+class TestTieredCache(unittest.TestCase):
+  """Tests for reading through the local tier."""
+
+  def setUp(self):
+    self.remote = MemCache()
+    self.remote.memcache_client = mock.Mock()
+    self.remote.memcache_client.get_multi.return_value = {
+        "collection:controls:1": {"id": 1},
+        "collection:controls:2": {"id": 2},
+    }
+    self.local = LRUCache(10)
+    self.cache = TieredCache(self.local, self.remote)
+
+  def test_read_through(self):
+    """Items read from the remote tier are served locally afterwards."""
+    data, missing = self.cache.get_partial(
+        "collection", "controls", {"ids": [1, 2, 3]})
+    self.assertEqual(data.keys(), [1, 2])
+    self.assertEqual(missing, [3])
+    self.remote.memcache_client.get_multi.return_value = {}
+    data, missing = self.cache.get_partial(
+        "collection", "controls", {"ids": [2, 1]})
+    self.assertEqual(data.keys(), [2, 1])
+    self.assertEqual(missing, [])
+    self.assertEqual(self.remote.memcache_client.get_multi.call_count, 1)
+
+  def test_remove(self):
+    """Removed keys are dropped from both tiers."""
+    self.cache.get_multi(["collection:controls:1"])
+    self.cache.remove_multi(["collection:controls:1"], 0)
+    self.assertEqual(self.local.get_multi(["collection:controls:1"]), {})
+    self.remote.memcache_client.delete_multi.assert_called_once_with(
+        ["collection:controls:1"], 0)
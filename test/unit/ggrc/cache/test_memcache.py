@@ -0,0 +1,55 @@
+# Copyright (C) 2017 Google Inc.
+# Licensed under http://www.apache.org/licenses/LICENSE-2.0 <see LICENSE file>
+
+"""Tests for partial cache hits in MemCache and CacheManager."""
+
+import unittest
+
+import mock
+
+from ggrc.cache import CacheManager
+from ggrc.cache import MemCache
+
+
+class TestPartialGet(unittest.TestCase):
+  """Tests for reading collections that are partially cached."""
+
+  def setUp(self):
+    self.cache = MemCache()
+    self.cache.memcache_client = mock.Mock()
+    self.cache.memcache_client.get_multi.return_value = {
+        "collection:controls:1": {"id": 1, "title": "a"},
+        "collection:controls:3": {"id": 3, "title": "c"},
+    }
+    self.manager = CacheManager()
+    self.manager.initialize(self.cache)
+
+  def test_get_partial(self):
+    """Hits and misses are read with a single get_multi call."""
+    data, missing_ids = self.cache.get_partial(
+        "collection", "controls", {"ids": [3, 2, 1], "attrs": ["title"]})
+    self.assertEqual(data.items(), [(3, {"title": "c"}), (1, {"title": "a"})])
+    self.assertEqual(missing_ids, [2])
+    self.assertEqual(self.cache.memcache_client.get_multi.call_count, 1)
+
+  def test_get_all_or_none(self):
+    """Plain get returns nothing if any item is missing."""
+    self.assertIsNone(
+        self.cache.get("collection", "controls", {"ids": [1, 2]}))
+    self.assertEqual(
+        self.cache.get("collection", "controls", {"ids": [1, 3]}).keys(),
+        [1, 3])
+
+  def test_load_missing(self):
+    """Only missing ids are loaded and added to cache."""
+    self.cache.memcache_client.get.return_value = None
+    self.cache.memcache_client.gets.return_value = None
+    load_missing = mock.Mock(return_value={2: {"id": 2, "title": "b"}})
+    data = self.manager.get_collection(
+        "collection", "controls", {"ids": [1, 2, 3]},
+        load_missing=load_missing)
+    load_missing.assert_called_once_with([2])
+    self.assertEqual([item["title"] for item in data.values()],
+                     ["a", "b", "c"])
+    self.cache.memcache_client.add.assert_called_once_with(
+        "collection:controls:2", {"id": 2, "title": "b"}, 0)
@@ -186,3 +186,30 @@ class TestModelColumntHandler(unittest.TestCase):
       self.assertEqual(
           {"col_a": test_custom_handler, "col_b": test_handler},
           model_column_handlers(test_custom_class))
+
+
+class TestGenerateCsvChunks(unittest.TestCase):
+
+  """Tests for streamed csv file generation."""
+
+  def test_same_content_as_csv_string(self):
+    """Test that joined chunks match the full csv string."""
+    lines = [
+        [u"Object type", u"title", u"code"],
+        [u"Program", u"Title \u010d", u"PROGRAM-1"],
+        [u"", u"with, comma", u"PROGRAM-2"],
+    ]
+    expected = import_helper.generate_csv_string(copy.deepcopy(lines))
+    chunks = list(import_helper.generate_csv_chunks(iter(lines)))
+    self.assertEqual(len(chunks), 1)
+    self.assertEqual("".join(chunks), expected)
+
+  def test_buffer_size(self):
+    """Test that output is split into parts of at least buffer size."""
+    lines = [[u"a" * 10] for _ in range(10)]
+    chunks = list(import_helper.generate_csv_chunks(lines, buffer_size=25))
+    self.assertEqual(chunks, ["aaaaaaaaaa\r\n" * 3] * 3 + ["aaaaaaaaaa\r\n"])
+
+  def test_empty_input(self):
+    """Test that no empty parts are generated."""
+    self.assertEqual(list(import_helper.generate_csv_chunks([])), [])
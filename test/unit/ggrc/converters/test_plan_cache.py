@@ -0,0 +1,144 @@
+# Copyright (C) 2017 Google Inc.
+# Licensed under http://www.apache.org/licenses/LICENSE-2.0 <see LICENSE file>
+
+"""Tests for the /query API plan cache."""
+
+import unittest
+
+import mock
+import sqlalchemy as sa
+
+from ggrc.converters import plan_cache
+
+
+TABLE = sa.sql.table(
+    "records",
+    sa.sql.column("id"),
+    sa.sql.column("title"),
+    sa.sql.column("key"),
+)
+
+
+def build_expression(exp, object_class, target_class, query):
+  """Simple filter builder standing in for custom_operators."""
+  # pylint: disable=unused-argument
+  operator = exp["op"]["name"]
+  if operator == "AND":
+    return sa.and_(
+        build_expression(exp["left"], object_class, target_class, query),
+        build_expression(exp["right"], object_class, target_class, query))
+  if operator == "~":
+    return TABLE.c.title.ilike(u"%{}%".format(exp["right"]))
+  if operator == "=":
+    return TABLE.c[exp["left"]] == exp["right"]
+  if operator == "relevant":
+    return TABLE.c.id.in_(exp["ids"])
+  return sa.sql.false()
+
+
+def title_filter(value):
+  return {"op": {"name": "~"}, "left": "title", "right": value,
+          "is_autocasted": True}
+
+
+def relevant_filter(ids):
+  return {"op": {"name": "relevant"}, "object_name": "Market", "ids": ids}
+
+
+def compile_filter(clause):
+  compiled = clause.compile()
+  return unicode(compiled), compiled.params
+
+
+@mock.patch("ggrc.converters.custom_operators.build_expression",
+            side_effect=build_expression)
+class TestPlanCache(unittest.TestCase):
+  """Tests for building filters with the plan cache."""
+
+  def setUp(self):
+    self.cache = plan_cache.PlanCache(10)
+    self.model = mock.Mock(__name__="Market")
+    self.model.attributes_map.return_value = {}
+    patcher = mock.patch("ggrc.fulltext.typed_properties.is_indexed",
+                         return_value=False)
+    self.is_indexed = patcher.start()
+    self.addCleanup(patcher.stop)
+
+  def build(self, exp):
+    return self.cache.build_expression(exp, self.model, self.model, [])
+
+  def test_rebind_values(self, builder):
+    """Expressions with the same shape reuse the cached filter."""
+    first = self.build({
+        "op": {"name": "AND"},
+        "left": title_filter(u"audit"),
+        "right": relevant_filter([1, 2]),
+    })
+    second = self.build({
+        "op": {"name": "AND"},
+        "left": title_filter(u"risk"),
+        "right": relevant_filter([3, 4]),
+    })
+    self.assertEqual(self.cache.get_stats(),
+                     {"hits": 1, "misses": 1, "bypassed": 0, "size": 1})
+    # The filter and its template are built on the miss only.
+    self.assertEqual(builder.call_count, 2)
+    self.assertEqual(compile_filter(first)[0], compile_filter(second)[0])
+    self.assertEqual(sorted(compile_filter(second)[1].values()),
+                     [3, 4, u"%risk%"])
+
+  def test_different_shapes(self, _):
+    """Different operators, attributes and id counts are separate plans."""
+    self.build(relevant_filter([1, 2]))
+    self.build(relevant_filter([1, 2, 3]))
+    self.build({"op": {"name": "="}, "left": "title", "right": u"a",
+                "is_autocasted": True})
+    self.build({"op": {"name": "="}, "left": "key", "right": u"a",
+                "is_autocasted": True})
+    self.assertEqual(self.cache.get_stats()["misses"], 4)
+
+  def test_uncacheable_operators(self, builder):
+    """Operators that run queries are always built from scratch."""
+    exp = {"op": {"name": "owned"}, "ids": [1]}
+    self.build(exp)
+    self.build(exp)
+    self.assertEqual(self.cache.get_stats(),
+                     {"hits": 0, "misses": 0, "bypassed": 2, "size": 0})
+    self.assertEqual(builder.call_count, 2)
+
+  def test_value_dependent_filter(self, builder):
+    """Filters that do not keep the values are not cached."""
+    builder.side_effect = lambda exp, *args: TABLE.c.id.in_([5])
+    self.build(relevant_filter([1]))
+    clause = self.build(relevant_filter([2]))
+    self.assertEqual(self.cache.get_stats()["bypassed"], 1)
+    self.assertEqual(compile_filter(clause)[1].values(), [5])
+
+  def test_lru_eviction(self, _):
+    """The least recently used plan is evicted when the cache is full."""
+    self.cache.size = 2
+    self.build(relevant_filter([1]))
+    self.build(relevant_filter([1, 2]))
+    self.build(relevant_filter([1]))
+    self.build(relevant_filter([1, 2, 3]))
+    self.assertEqual(len(self.cache.plans), 2)
+    self.build(relevant_filter([5]))
+    self.assertEqual(self.cache.get_stats()["hits"], 2)
+
+  def test_custom_attribute_index(self, _):
+    """Plans depend on whether compared properties are typed values."""
+    exp = {"op": {"name": "="}, "left": "title", "right": u"a",
+           "is_autocasted": True}
+    self.build(exp)
+    self.is_indexed.return_value = True
+    self.build(exp)
+    self.build(exp)
+    self.assertEqual(self.cache.get_stats()["misses"], 2)
+    self.assertEqual(self.cache.get_stats()["hits"], 1)
+    self.is_indexed.assert_called_with(self.model, "title")
+
+  def test_value_types(self, _):
+    """Ids of different types are separate plans."""
+    self.build(relevant_filter([1, 2]))
+    self.build(relevant_filter([1, u"2"]))
+    self.assertEqual(self.cache.get_stats()["misses"], 2)
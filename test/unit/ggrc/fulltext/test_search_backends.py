@@ -0,0 +1,99 @@
+# Copyright (C) 2017 Google Inc.
+# Licensed under http://www.apache.org/licenses/LICENSE-2.0 <see LICENSE file>
+
+"""Tests for full text search backends."""
+
+import threading
+import unittest
+
+import flask
+import mock
+
+import ggrc.app  # noqa pylint: disable=unused-import
+from ggrc.fulltext.search_backends import InvertedIndex
+from ggrc.fulltext.search_backends import InvertedIndexSearchBackend
+
+
+class TestInvertedIndex(unittest.TestCase):
+  """Tests for the in-process inverted index."""
+
+  def setUp(self):
+    self.index = InvertedIndex()
+    self.index.add(("Control", 1), [u"Access Control", u"ctrl-1"])
+    self.index.add(("Market", 2), [u"Control market"])
+    self.index.add(("Person", 3), [u"John", u"john@example.com"])
+
+  def test_substring_match(self):
+    """Terms match anywhere in the content regardless of case."""
+    self.assertEqual(self.index.search(u"CONTROL"),
+                     {("Control", 1), ("Market", 2)})
+    self.assertEqual(self.index.search(u"ess con"), {("Control", 1)})
+    self.assertEqual(self.index.search(u"example.c"), {("Person", 3)})
+
+  def test_trigrams_out_of_order(self):
+    """Documents with all trigrams of the terms in a different order."""
+    self.index.add(("Market", 4), [u"rolcont"])
+    self.assertEqual(self.index.search(u"control"),
+                     {("Control", 1), ("Market", 2)})
+
+  def test_short_terms(self):
+    """Terms shorter than a trigram are matched against all documents."""
+    self.assertEqual(self.index.search(u"jo"), {("Person", 3)})
+    self.assertEqual(self.index.search(u"-"), {("Control", 1)})
+
+  def test_no_match_across_properties(self):
+    """A match can not span contents of two properties."""
+    self.assertEqual(self.index.search(u"controlctrl"), set())
+    self.assertEqual(self.index.search(u"johnjohn"), set())
+
+  def test_update_and_remove(self):
+    """Updated and removed documents are matched by their new content."""
+    self.index.add(("Market", 2), [u"Retail market"])
+    self.index.remove(("Control", 1))
+    self.index.remove(("Control", 100))
+    self.assertEqual(self.index.search(u"control"), set())
+    self.assertEqual(self.index.search(u"retail"), {("Market", 2)})
+    self.assertNotIn(u"con", self.index.postings)
+
+
+class TestInvertedIndexSearchBackend(unittest.TestCase):
+  """Tests for rebuilding the inverted index."""
+  # pylint: disable=protected-access
+
+  def setUp(self):
+    self.backend = InvertedIndexSearchBackend(
+        mock.Mock(FULLTEXT_INVERTED_INDEX_TTL=0))
+    self.app = flask.Flask(__name__)
+
+  def test_background_rebuild(self):
+    """Expired index is used while the new one is built."""
+    old_index = InvertedIndex()
+    old_index.add(("Control", 1), [u"old control"])
+    new_index = InvertedIndex()
+    new_index.add(("Control", 1), [u"new control"])
+    reading = threading.Event()
+    release = threading.Event()
+
+    def build_new_index():
+      reading.set()
+      release.wait()
+      return new_index
+
+    builds = [lambda: old_index, build_new_index]
+    with self.app.app_context(), \
+        mock.patch.object(self.backend, "_build_index",
+                          side_effect=lambda: builds.pop(0)()):
+      self.assertIs(self.backend.get_index(), old_index)
+      self.backend.built_at = 0
+      self.assertIs(self.backend.get_index(), old_index)
+      reading.wait()
+      self.assertIs(self.backend.get_index(), old_index)
+      self.backend._apply("Market", [2], {("Market", 2): [u"market"]})
+      rebuild, = [thread for thread in threading.enumerate()
+                  if thread.name == "inverted-index-rebuild"]
+      release.set()
+      rebuild.join()
+    self.assertIs(self.backend.index, new_index)
+    self.assertIsNone(self.backend.rebuild_updates)
+    self.assertEqual(new_index.search(u"market"), {("Market", 2)})
+    self.assertEqual(old_index.search(u"market"), {("Market", 2)})
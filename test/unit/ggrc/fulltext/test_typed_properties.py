@@ -0,0 +1,49 @@
+# Copyright (C) 2017 Google Inc.
+# Licensed under http://www.apache.org/licenses/LICENSE-2.0 <see LICENSE file>
+
+"""Tests for typed custom attribute value tables."""
+
+import unittest
+
+import mock
+
+import ggrc.app  # noqa pylint: disable=unused-import
+from ggrc.fulltext import typed_properties
+from ggrc.models import all_models
+
+
+class TestIsIndexed(unittest.TestCase):
+  """Tests for caching whether properties are in the typed tables."""
+
+  def setUp(self):
+    typed_properties.INDEXED_CACHE.clear()
+    patcher = mock.patch.object(typed_properties, "_query_is_indexed",
+                                return_value=True)
+    self.query_is_indexed = patcher.start()
+    self.addCleanup(patcher.stop)
+
+  def test_cached(self):
+    """Definitions are queried once until they change."""
+    for _ in range(3):
+      self.assertTrue(typed_properties.is_indexed(all_models.Market, "ca"))
+    self.assertEqual(self.query_is_indexed.call_count, 1)
+    typed_properties.clear_indexed_cache(None, None, None)
+    self.assertTrue(typed_properties.is_indexed(all_models.Market, "ca"))
+    self.assertEqual(self.query_is_indexed.call_count, 2)
+
+  def test_cleared_while_querying(self):
+    """Flags read before definitions changed are not stored."""
+    def query_is_indexed(object_class, key):
+      # pylint: disable=unused-argument
+      typed_properties.INDEXED_CACHE.clear()
+      return True
+    self.query_is_indexed.side_effect = query_is_indexed
+    typed_properties.is_indexed(all_models.Market, "ca")
+    typed_properties.is_indexed(all_models.Market, "ca")
+    self.assertEqual(self.query_is_indexed.call_count, 2)
+
+  def test_not_custom_attributable(self):
+    """Models without custom attributes are never queried."""
+    self.assertFalse(typed_properties.is_indexed(all_models.Relationship,
+                                                 "ca"))
+    self.assertFalse(self.query_is_indexed.called)
@@ -0,0 +1,74 @@
+# Copyright (C) 2017 Google Inc.
+# Licensed under http://www.apache.org/licenses/LICENSE-2.0 <see LICENSE file>
+
+"""Tests for permissions compiled into sets."""
+
+import unittest
+
+import ggrc.app  # noqa pylint: disable=unused-import
+from ggrc.rbac.permissions_provider import CompiledPermissions
+from ggrc.services.common import filter_resources
+
+
+class TestCompiledPermissions(unittest.TestCase):
+  """Tests for membership checks of compiled permissions."""
+
+  def setUp(self):
+    self.compiled = CompiledPermissions({
+        "read": {
+            "Control": {"contexts": [2], "resources": [10]},
+            "__GGRC_ALL__": {"contexts": [3]},
+        },
+        "__GGRC_ADMIN__": {"__GGRC_ALL__": {"contexts": [4]}},
+    })
+
+  def test_is_allowed(self):
+    """Resources, type contexts and admin contexts allow an action."""
+    allowed = [(10, 1), (11, 2), (12, 3), (13, 4)]
+    for resource_id, context_id in allowed:
+      self.assertTrue(self.compiled.is_allowed(
+          "read", "Control", resource_id, context_id))
+    self.assertFalse(self.compiled.is_allowed("read", "Control", 11, 1))
+    self.assertFalse(self.compiled.is_allowed("update", "Control", 10, 2))
+
+  def test_filter_allowed(self):
+    """Allowed keys are filtered at once."""
+    keys = {(10, 1), (11, 2), (11, 1), (12, None)}
+    self.assertEqual(self.compiled.filter_allowed("read", "Control", keys),
+                     {(10, 1), (11, 2)})
+
+  def test_global_admin(self):
+    """Admins in all contexts may do anything."""
+    compiled = CompiledPermissions(
+        {"__GGRC_ADMIN__": {"__GGRC_ALL__": {"contexts": [0]}}})
+    self.assertTrue(compiled.is_allowed("delete", "Control", 1, 1))
+    self.assertEqual(compiled.filter_allowed("read", "Audit", [(1, 5)]),
+                     {(1, 5)})
+
+
+class TestFilterResources(unittest.TestCase):
+  """Tests for filtering collections with one check per type."""
+
+  def test_filter_resources(self):
+    """Unreadable resources and sub-resources are removed."""
+
+    class Permissions(object):
+      """Permissions allowing reads in context 1."""
+      # pylint: disable=too-few-public-methods
+      calls = []
+
+      def filter_allowed_read(self, resource_type, keys):
+        self.calls.append(resource_type)
+        return {key for key in keys if key[1] == 1}
+
+    user_permissions = Permissions()
+    resources = [
+        {"type": "Control", "id": 1, "context_id": 1,
+         "owner": {"type": "Person", "id": 5, "context_id": 2}},
+        {"type": "Control", "id": 2, "context": None},
+        {"type": "Control", "id": 3, "context": {"id": 1}},
+    ]
+    filtered = filter_resources(resources, user_permissions=user_permissions)
+    self.assertEqual([resource["id"] for resource in filtered], [1, 3])
+    self.assertIsNone(filtered[0]["owner"])
+    self.assertEqual(sorted(user_permissions.calls), ["Control", "Person"])
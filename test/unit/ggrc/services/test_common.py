@@ -4,6 +4,7 @@
 
 import collections
 import itertools
+import json
 from contextlib import contextmanager
 from unittest import TestCase
 import mock
@@ -173,3 +174,29 @@ class TestGetRevisionsList(TestCase):
       self.assertEqual(
           expected_results,
           [r.action for r in self.get_log_revisions(dirty[0])])
+
+
+@ddt
+class TestIterCollectionJson(TestCase):
+  """Tests for collection JSON generated in parts."""
+
+  def setUp(self):
+    self.resource = mock.Mock()
+    self.resource.model._inflector.table_plural = "controls"
+
+  def _iter_json(self, collection):
+    return common.Resource.iter_collection_json.__func__(self.resource,
+                                                         collection)
+
+  @data([], [{"id": 1}], [{"id": 1, "title": u"\u0161"}, {"id": 2}])
+  def test_iter_collection_json(self, objs):
+    """Joined parts decode to the collection representation."""
+    collection = {"controls_collection": {
+        "selfLink": "/api/controls",
+        "controls": objs,
+        "paging": {"count": 1},
+    }}
+    chunks = list(self._iter_json(collection))
+    self.assertEqual(json.loads("".join(chunks)), collection)
+    self.assertEqual(common.chunks_etag(chunks),
+                     common.chunks_etag(self._iter_json(collection)))
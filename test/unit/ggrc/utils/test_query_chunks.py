@@ -0,0 +1,91 @@
+# Copyright (C) 2017 Google Inc.
+# Licensed under http://www.apache.org/licenses/LICENSE-2.0 <see LICENSE file>
+
+"""Tests for splitting queries into chunks."""
+
+import unittest
+
+import sqlalchemy as sa
+from sqlalchemy import orm
+from sqlalchemy.ext.declarative import declarative_base
+
+from ggrc.utils import generate_id_ranges
+from ggrc.utils import generate_query_chunks
+
+
+Base = declarative_base()  # pylint: disable=invalid-name
+
+
+class Item(Base):  # pylint: disable=too-few-public-methods
+  """Simple model used for query chunk tests."""
+  __tablename__ = "items"
+  id = sa.Column(sa.Integer, primary_key=True)
+  title = sa.Column(sa.String)
+  description = orm.deferred(sa.Column(sa.String), group="Item_complete")
+
+
+class TestGenerateQueryChunks(unittest.TestCase):
+  """Tests for keyset pagination in generate_query_chunks."""
+
+  def setUp(self):
+    engine = sa.create_engine("sqlite://")
+    Base.metadata.create_all(engine)
+    # ids with gaps and in a different order than titles
+    engine.execute(Item.__table__.insert(), [
+        {"id": i * 3, "title": str(20 - i), "description": "item {}".format(i)}
+        for i in range(1, 11)
+    ])
+    self.session = orm.sessionmaker(bind=engine)()
+
+  def tearDown(self):
+    self.session.close()
+
+  def test_id_query_chunks(self):
+    """Test splitting a query for ids."""
+    chunks = generate_query_chunks(self.session.query(Item.id), chunk_size=3)
+    self.assertEqual(
+        [[row.id for row in chunk] for chunk in chunks],
+        [[3, 6, 9], [12, 15, 18], [21, 24, 27], [30]],
+    )
+
+  def test_exact_chunks(self):
+    """Test that no empty chunk is generated at the end."""
+    chunks = generate_query_chunks(self.session.query(Item.id), chunk_size=5)
+    self.assertEqual(
+        [[row.id for row in chunk] for chunk in chunks],
+        [[3, 6, 9, 12, 15], [18, 21, 24, 27, 30]],
+    )
+
+  def test_filtered_column_query(self):
+    """Test splitting a filtered query without the id column."""
+    query = self.session.query(Item.title).filter(Item.id > 10)
+    chunks = generate_query_chunks(query, chunk_size=4)
+    self.assertEqual(
+        [[row.title for row in chunk] for chunk in chunks],
+        [["16", "15", "14", "13"], ["12", "11", "10"]],
+    )
+
+  def test_ordered_model_query(self):
+    """Test splitting an ordered model query with loader options."""
+    query = self.session.query(Item).options(
+        orm.undefer_group("Item_complete"),
+    ).order_by(Item.title)
+    chunks = generate_query_chunks(query, chunk_size=6)
+    self.assertEqual(
+        [[item.description for item in chunk] for chunk in chunks],
+        [["item {}".format(i) for i in range(1, 7)],
+         ["item {}".format(i) for i in range(7, 11)]],
+    )
+
+  def test_empty_query(self):
+    """Test that no chunks are generated for an empty query."""
+    query = self.session.query(Item).filter(Item.id > 100)
+    self.assertEqual(list(generate_query_chunks(query)), [])
+
+  def test_id_ranges(self):
+    """Test getting id ranges of chunks."""
+    query = self.session.query(Item.title).filter(Item.id > 10)
+    self.assertEqual(
+        list(generate_id_ranges(query, chunk_size=3)),
+        [(12, 18), (21, 27), (30, 30)],
+    )
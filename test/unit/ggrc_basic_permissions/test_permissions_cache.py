@@ -0,0 +1,102 @@
+# Copyright (C) 2017 Google Inc.
+# Licensed under http://www.apache.org/licenses/LICENSE-2.0 <see LICENSE file>
+
+"""Tests for permissions cached as fragments."""
+
+import unittest
+
+import mock
+
+import ggrc.app  # noqa pylint: disable=unused-import
+from ggrc.cache.backends import InProcessBackend
+from ggrc_basic_permissions import permissions_cache
+
+
+class TestPermissionsCache(unittest.TestCase):
+  """Tests for storing and invalidating permission fragments."""
+
+  def setUp(self):
+    self.cache = InProcessBackend(None).client()
+    self.fragments = {
+        fragment.name: {"read": {fragment.name: {"resources": [1]}}}
+        for fragment in permissions_cache.FRAGMENTS
+    }
+
+  def _store(self, user_id):
+    _, tokens = permissions_cache.get_fragments(self.cache, user_id)
+    permissions_cache.store_fragments(self.cache, user_id, self.fragments,
+                                      tokens)
+
+  def _cached(self, user_id):
+    fragments, _ = permissions_cache.get_fragments(self.cache, user_id)
+    return sorted(fragments)
+
+  def test_user_invalidation(self):
+    """Changes of a user only invalidate the fragments of that user."""
+    self._store(1)
+    self._store(2)
+    self.assertEqual(self._cached(1), sorted(self.fragments))
+    permissions_cache.invalidate(self.cache, {("acl", 1)})
+    self.assertNotIn("acl", self._cached(1))
+    self.assertIn("acl", self._cached(2))
+
+  def test_dependent_invalidation(self):
+    """Fragments of all users and the fragments depending on them."""
+    self._store(1)
+    permissions_cache.invalidate(self.cache, {("roles", None)})
+    self.assertEqual(self._cached(1),
+                     ["acl", "assignees", "backlog", "owners",
+                      "personal_context"])
+    permissions_cache.invalidate_all(self.cache)
+    self.assertEqual(self._cached(1), [])
+
+  def test_changes(self):
+    """Changed objects map to fragments of their person or of all users."""
+    acl = mock.Mock(person_id=3)
+    acl.__class__ = type("AccessControlList", (object,), {})
+    relationship = mock.Mock()
+    relationship.__class__ = type("Relationship", (object,), {})
+    control = mock.Mock()
+    control.__class__ = type("Control", (object,), {})
+    self.assertEqual(
+        permissions_cache.get_changes([acl, relationship, control]),
+        {("acl", 3), ("context_relationships", None), ("assignees", None)})
+
+  def test_updated_changes(self):
+    """Updated objects of a person invalidate fragments of all users."""
+    acl = mock.Mock(person_id=3)
+    acl.__class__ = type("AccessControlList", (object,), {})
+    person = mock.Mock(id=4)
+    person.__class__ = type("Person", (object,), {})
+    self.assertEqual(permissions_cache.get_changes([], [acl, person]),
+                     {("acl", None), ("roles", 4)})
+
+  def test_version(self):
+    """The version changes with any invalidated fragment."""
+    _, tokens = permissions_cache.get_fragments(self.cache, 1)
+    version = permissions_cache.get_version(tokens)
+    self.assertIsNotNone(version)
+    _, tokens = permissions_cache.get_fragments(self.cache, 1)
+    self.assertEqual(permissions_cache.get_version(tokens), version)
+    permissions_cache.invalidate(self.cache, {("acl", 1)})
+    _, tokens = permissions_cache.get_fragments(self.cache, 1)
+    self.assertNotEqual(permissions_cache.get_version(tokens), version)
+    del tokens["acl"]
+    self.assertIsNone(permissions_cache.get_version(tokens))
+
+  def test_merge(self):
+    """Merged lists keep the order of the fragments."""
+    permissions = {}
+    permissions_cache.merge_permissions(permissions, {
+        "read": {"Program": {"contexts": [1], "conditions": {1: ["a"]}}},
+        "delete": {},
+    })
+    permissions_cache.merge_permissions(permissions, {
+        "read": {"Program": {"contexts": [2], "resources": [5],
+                             "conditions": {1: ["b"]}}},
+    })
+    self.assertEqual(permissions, {
+        "read": {"Program": {"contexts": [1, 2], "resources": [5],
+                             "conditions": {1: ["a", "b"]}}},
+        "delete": {},
+    })